@@ -0,0 +1,300 @@
+"""
+Admission Control — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+In a mass-casualty event every prediction used to wait synchronously on
+the Open-Meteo fetch and all three models, so a burst of calls queued up
+behind each other with no bound. AdmissionScheduler sits in front of the
+prediction flow:
+
+  - Bounded queue per priority (QUEUE_LIMITS). A request arriving at a full
+    queue is answered straight from the risk lookup, or refused with
+    Overloaded when no lookup has been built.
+  - Every request carries a deadline (REQUEST_DEADLINES_S by priority).
+    Workers serve the closest deadline first, which within one priority
+    is the oldest request.
+  - Under load, requests step down through explicit degraded modes:
+
+        full            live weather + all three models
+        cached_weather  cached weather (or defaults), no network call
+        reduced_models  cached weather + REDUCED_MODELS only
+        lookup          precomputed cell/weekday/hour table (risk_lookup.py)
+
+    The mode is picked per request from queue fill and the remaining
+    slack against each mode's measured service time. Every response
+    records its mode, weather source, queueing and service time.
+
+With a ModelRegistry attached, the full-ensemble modes score through it
+(canary routing, shadow comparisons off the response path); the reduced
+and lookup modes always use production.
+"""
+
+import time, heapq, bisect, itertools, threading
+from collections import Counter
+from concurrent.futures import Future
+
+from config import (REQUEST_DEADLINES_S, QUEUE_LIMITS, SCORING_WORKERS,
+                    REDUCED_MODELS, WEATHER_CACHE_TTL)
+from utils import (get_weather_data, default_weather, prepare_features,
+                   incident_frame, ensemble_predict, WEATHER_TIMEOUT_S)
+from model_registry import incident_key
+
+
+MODES = ('full', 'cached_weather', 'reduced_models', 'lookup')
+
+MODE_DESCRIPTIONS = {
+    'full':           "live weather, full ensemble",
+    'cached_weather': "cached weather, full ensemble",
+    'reduced_models': "cached weather, reduced ensemble",
+    'lookup':         "precomputed location/time risk table",
+}
+
+# Queue fill (fraction of total capacity) above which the richest allowed
+# mode drops to the next one
+DEGRADE_AT = (0.25, 0.50, 0.75)
+
+# Weight of the newest sample in each mode's service-time estimate
+COST_SMOOTHING = 0.2
+
+# Weather is cached per ~1 km cell; Open-Meteo's own grid is coarser
+WEATHER_CACHE_ROUNDING = 2
+
+MODEL_KEYS = ('rf', 'xgboost', 'lgbm')
+PROB_KEYS  = {'rf': 'rf_prob', 'xgboost': 'xgb_prob', 'lgbm': 'lgbm_prob'}
+
+
+class Overloaded(Exception):
+    """Raised by submit() when the priority's queue is full and no lookup exists."""
+
+
+def subset_predict(models, names, features_df, weights, threshold):
+    """
+    ensemble_predict over a subset of the models, with their weights
+    renormalised to sum to one. Skipped models report None.
+    """
+    probs = {n: models[n].predict_proba(features_df)[0][1] for n in names}
+    ensemble_p = sum(weights[n] * p for n, p in probs.items()) / sum(weights[n] for n in names)
+    prediction = 1 if ensemble_p >= threshold else 0
+    return {
+        'prediction':  prediction,
+        'probability': ensemble_p,
+        **{PROB_KEYS[n]: probs.get(n) for n in MODEL_KEYS},
+        'confidence':  ensemble_p * 100 if prediction == 1
+                       else (1 - ensemble_p) * 100,
+    }
+
+
+class AdmissionScheduler:
+    """
+    Deadline-ordered worker pool around the single-incident prediction flow.
+
+    models is the (rf, xgb, lgbm) tuple; fetch_weather(lat, lon, timeout=)
+    defaults to the live Open-Meteo call, given at most weather_timeout
+    seconds (less when the request deadline is closer). Use start() / stop() or a with
+    block; submit() returns a Future, predict() waits for it.
+    """
+
+    def __init__(self, models, feature_names, weights, threshold,
+                 feature_state=None, lookup=None,
+                 fetch_weather=get_weather_data, workers=SCORING_WORKERS,
+                 deadlines=REQUEST_DEADLINES_S, limits=QUEUE_LIMITS,
+                 reduced_models=REDUCED_MODELS, weather_ttl=WEATHER_CACHE_TTL,
+                 weather_timeout=WEATHER_TIMEOUT_S, registry=None):
+        self.models          = dict(zip(MODEL_KEYS, models))
+        self.feature_names   = feature_names
+        self.weights         = weights
+        self.threshold       = threshold
+        self.feature_state   = feature_state
+        self.lookup          = lookup
+        self.fetch_weather   = fetch_weather
+        self.n_workers       = workers
+        self.deadlines       = deadlines
+        self.limits          = limits
+        self.capacity        = sum(limits.values())
+        self.reduced_models  = reduced_models
+        self.weather_ttl     = weather_ttl
+        self.weather_timeout = weather_timeout
+        self.registry        = registry
+
+        self.cost    = dict.fromkeys(MODES, 0.0)    # smoothed service seconds
+        self.counts  = Counter()
+        self._heap   = []                           # (deadline, seq, request)
+        self._depth  = dict.fromkeys(limits, 0)
+        self._seq    = itertools.count()
+        self._cond   = threading.Condition()
+        self._weather = {}                          # rounded lat/lon -> (time, weather)
+        self._threads = []
+        self._running = False
+
+    # ------------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------------
+
+    def start(self):
+        with self._cond:
+            self._running = True
+        self._threads = [threading.Thread(target=self._worker, daemon=True)
+                         for _ in range(self.n_workers)]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        """Stop accepting work once the queue has drained."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        """Responses per mode plus rejected / late counts and queue depth."""
+        with self._cond:
+            return {**{m: self.counts[m] for m in MODES},
+                    'rejected': self.counts['rejected'],
+                    'late':     self.counts['late'],
+                    'queued':   len(self._heap)}
+
+    # ------------------------------------------------------------------------
+    # ADMISSION
+    # ------------------------------------------------------------------------
+
+    def submit(self, lat, lon, dt, priority='urgent', weather=None):
+        """
+        Queue one prediction. weather, when given (e.g. the caller already
+        has it), skips the weather step. Returns a Future whose result is
+        an ensemble_predict-style dict plus mode, weather_source,
+        queued_ms, service_ms and deadline_met. Raises RuntimeError before
+        start() or after stop(), when no worker would serve the request.
+        """
+        now = time.monotonic()
+        request = {'lat': lat, 'lon': lon, 'dt': dt, 'priority': priority,
+                   'weather': weather, 'submitted': now,
+                   'deadline': now + self.deadlines[priority], 'future': Future()}
+
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("admission scheduler is not running")
+            admitted = self._depth[priority] < self.limits[priority]
+            if admitted:
+                heapq.heappush(self._heap, (request['deadline'], next(self._seq), request))
+                self._depth[priority] += 1
+                self._cond.notify()
+            else:
+                self.counts['rejected'] += 1
+
+        if not admitted:
+            if self.lookup is None:
+                raise Overloaded(f"{priority} queue full ({self.limits[priority]} requests)")
+            self._serve(request, 'lookup')
+        return request['future']
+
+    def predict(self, lat, lon, dt, priority='urgent', weather=None):
+        """Blocking submit()."""
+        return self.submit(lat, lon, dt, priority, weather).result()
+
+    def choose_mode(self, slack, fill):
+        """
+        Richest mode allowed by queue fill whose estimated service time fits
+        in the remaining slack. A mode skipped for cost has its estimate
+        decayed, so it is retried once conditions recover.
+        """
+        last  = len(MODES) - 1 if self.lookup is not None else len(MODES) - 2
+        level = min(bisect.bisect_right(DEGRADE_AT, fill), last)
+        with self._cond:
+            while level < last and self.cost[MODES[level]] > slack:
+                self.cost[MODES[level]] *= 1 - COST_SMOOTHING
+                level += 1
+        return MODES[level]
+
+    # ------------------------------------------------------------------------
+    # SERVING
+    # ------------------------------------------------------------------------
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._heap:
+                    return
+                _, _, request = heapq.heappop(self._heap)
+                self._depth[request['priority']] -= 1
+                fill = len(self._heap) / self.capacity
+            slack = request['deadline'] - time.monotonic()
+            self._serve(request, self.choose_mode(slack, fill))
+
+    def _serve(self, request, mode):
+        start = time.monotonic()
+        try:
+            result = self._score(request, mode)
+        except Exception as e:
+            request['future'].set_exception(e)
+            return
+        done = time.monotonic()
+
+        result.update({
+            'mode':         mode,
+            'priority':     request['priority'],
+            'queued_ms':    (start - request['submitted']) * 1000,
+            'service_ms':   (done - start) * 1000,
+            'deadline_met': done <= request['deadline'],
+        })
+        with self._cond:
+            self.cost[mode] += COST_SMOOTHING * ((done - start) - self.cost[mode])
+            self.counts[mode] += 1
+            self.counts['late'] += not result['deadline_met']
+        request['future'].set_result(result)
+
+    def _score(self, request, mode):
+        lat, lon, dt = request['lat'], request['lon'], request['dt']
+        if mode == 'lookup':
+            return {**self.lookup.lookup(lat, lon, dt), 'weather_source': None}
+
+        weather, source = self._weather_for(request, live=mode == 'full')
+        if mode != 'reduced_models' and self.registry is not None:
+            # The registry builds features per bundle feature state
+            result = self.registry.predict(incident_frame(lat, lon, dt, weather),
+                                           incident_key(lat, lon, dt))
+        else:
+            features = prepare_features(lat, lon, dt, weather, self.feature_names,
+                                        self.feature_state)
+            if mode == 'reduced_models':
+                result = subset_predict(self.models, self.reduced_models, features,
+                                        self.weights, self.threshold)
+            else:
+                result = ensemble_predict(*self.models.values(), features,
+                                          self.weights, self.threshold)
+        result['weather']        = weather
+        result['weather_source'] = source
+        return result
+
+    def _weather_for(self, request, live):
+        """(weather, source) with source one of caller / live / cached / default."""
+        if request['weather'] is not None:
+            return request['weather'], 'caller'
+
+        key = (round(request['lat'], WEATHER_CACHE_ROUNDING),
+               round(request['lon'], WEATHER_CACHE_ROUNDING))
+        if live:
+            # Leave enough of the deadline to finish in cached-weather mode
+            with self._cond:
+                reserve = self.cost['cached_weather']
+            budget  = request['deadline'] - time.monotonic() - reserve
+            weather = self.fetch_weather(*key, timeout=max(0.1, min(self.weather_timeout, budget)))
+            if weather:
+                with self._cond:
+                    self._weather[key] = (time.monotonic(), weather)
+                return weather, 'live'
+
+        with self._cond:
+            cached = self._weather.get(key)
+        if cached and time.monotonic() - cached[0] <= self.weather_ttl:
+            return cached[1], 'cached'
+        return default_weather(), 'default'
@@ -14,39 +14,34 @@ Model: Equal-weight ensemble (RF + XGBoost + LightGBM, threshold=0.13)
 Test-set performance: 79.4% HIGH recall | 20.6% under-triage | AUC 0.633
 """
 
+import time
 import streamlit as st
-import pandas as pd
-import numpy as np
 from datetime import datetime
+from functools import lru_cache
 import pytz
 NAIROBI_TZ = pytz.timezone("Africa/Nairobi")
 import plotly.graph_objects as go
 import plotly.express as px
 
 from config import *
-from utils  import (load_ensemble_models, get_weather_data, default_weather,
-                    extract_temporal_features, prepare_features,
-                    ensemble_predict, get_top_features,
-                    validate_coordinates, get_distance_from_cbd)
+from gazetteer import load_gazetteer, normalise
+from risk_lookup  import load_risk_lookup
+from admission    import AdmissionScheduler, MODE_DESCRIPTIONS
+from road_context import NO_ROAD_LABEL
+from resources    import (load_models, load_state, load_roads, load_travel,
+                          load_registry)
+from utils  import (get_weather_data, default_weather,
+                    extract_temporal_features,
+                    get_top_features,
+                    get_distance_from_cbd)
 
 
 # ============================================================================
 # NEAREST HOSPITAL LOOKUP
 # ============================================================================
-# Major Nairobi trauma centres with coordinates.
-# Used to recommend the closest facility based on accident location.
-NAIROBI_HOSPITALS = [
-    {"name": "Kenyatta National Hospital",    "lat": -1.3018, "lon": 36.8065},
-    {"name": "Nairobi Hospital",              "lat": -1.2921, "lon": 36.8159},
-    {"name": "Aga Khan University Hospital",  "lat": -1.2634, "lon": 36.8187},
-    {"name": "MP Shah Hospital",              "lat": -1.2699, "lon": 36.8127},
-    {"name": "Mathare Hospital",              "lat": -1.2621, "lon": 36.8597},
-    {"name": "Karen Hospital",                "lat": -1.3173, "lon": 36.7145},
-    {"name": "Gertrude's Children's Hospital","lat": -1.2603, "lon": 36.8225},
-    {"name": "Nairobi West Hospital",         "lat": -1.3089, "lon": 36.8219},
-    {"name": "Mater Misericordiae Hospital",  "lat": -1.3006, "lon": 36.8389},
-]
-
+# Straight-line fallback used when the travel-time field has not been built.
+# Trauma centre list lives in config.NAIROBI_HOSPITALS.
+@lru_cache(maxsize=1024)
 def get_nearest_hospital(lat, lon):
     """Return the name of the closest hospital to the accident location."""
     import math
@@ -65,6 +60,19 @@ def get_nearest_hospital(lat, lon):
     return nearest["name"]
 
 
+@lru_cache(maxsize=1024)
+def nearest_trauma_centres(lat, lon, hour):
+    """
+    Trauma centres ranked by road travel time at this hour, as
+    (name, eta_min) pairs. Falls back to the straight-line nearest centre
+    (with no ETA) when the travel-time grid has not been built.
+    """
+    options = travel_times.lookup(lat, lon, hour) if travel_times else None
+    if not options:
+        return ((get_nearest_hospital(lat, lon), None),)
+    return tuple((o['name'], o['eta_min']) for o in options)
+
+
 # ============================================================================
 # PAGE CONFIGURATION
 # ============================================================================
@@ -100,6 +108,9 @@ st.markdown("""
 for key, val in [('prediction_made', False),
                 ('prediction_result', None),
                 ('weather_data', None),
+                ('weather_reading', None),
+                ('lat', DEFAULT_LOCATION['lat']),
+                ('lon', DEFAULT_LOCATION['lon']),
                 ('selected_date', datetime.now(NAIROBI_TZ).date()),
                 ('selected_time', datetime.now(NAIROBI_TZ).time())]:
     if key not in st.session_state:
@@ -108,18 +119,115 @@ for key, val in [('prediction_made', False),
 # ============================================================================
 # MODEL LOADING
 # ============================================================================
+# Models, feature state, rasters and the model registry are shared with the
+# dispatch board page through resources.py (one copy per server process)
+rf_model, xgb_model, lgbm_model, ens_config, feature_names = load_models()
+feature_state = load_state()
+
+
 @st.cache_resource
-def load_models():
-    try:
-        return load_ensemble_models(
-            RF_MODEL_PATH, XGB_MODEL_PATH, LGBM_MODEL_PATH,
-            CONFIG_PATH, METADATA_PATH
-        )
-    except Exception as e:
-        st.error(f"Model loading failed: {e}")
-        st.stop()
+def load_places():
+    """Offline gazetteer — indexes are built once per server process."""
+    return load_gazetteer()
+
+gazetteer = load_places()
+
+road_context = load_roads()
+travel_times = load_travel()
+
+
+@st.cache_resource
+def load_scheduler():
+    """
+    One admission scheduler shared by every dispatcher session in this
+    server process, so overload is managed across sessions.
+    """
+    return AdmissionScheduler(
+        (rf_model, xgb_model, lgbm_model), feature_names,
+        ENSEMBLE_WEIGHTS, ENSEMBLE_THRESHOLD, feature_state,
+        load_risk_lookup(), registry=load_registry()).start()
+
+scheduler = load_scheduler()
+
+
+# ============================================================================
+# MEMOISED DERIVED VALUES
+# ============================================================================
+# Streamlit reruns the script on every widget change. These values depend
+# only on their inputs, so they are computed once per distinct input.
+cbd_distance      = lru_cache(maxsize=1024)(get_distance_from_cbd)
+temporal_features = lru_cache(maxsize=1024)(extract_temporal_features)
+
+
+@st.cache_resource
+def top_features():
+    """RF importances are fixed for the loaded model — rank them once."""
+    return get_top_features(rf_model, feature_names)
+
+
+class WeatherUnavailable(Exception):
+    """Raised inside the cached fetch so failed calls are never cached."""
 
-rf_model, xgb_model, lgbm_model, ens_config, feature_names = load_models()
+
+@st.cache_data(ttl=WEATHER_CACHE_TTL, show_spinner=False)
+def _cached_weather(lat, lon):
+    weather = get_weather_data(lat, lon)
+    if weather is None:
+        raise WeatherUnavailable
+    return weather, time.time()
+
+
+def fetch_weather(lat, lon):
+    """
+    (live weather, time it was fetched) for the rounded coordinates,
+    or (None, None) if the API is down.
+    """
+    try:
+        return _cached_weather(round(lat, 4), round(lon, 4))
+    except WeatherUnavailable:
+        return None, None
+
+
+def panel_weather(lat, lon):
+    """
+    The location panel's live reading when it is for these coordinates and
+    younger than WEATHER_CACHE_TTL, else None (the scheduler fetches its own).
+    """
+    reading = st.session_state.get('weather_reading')
+    if (reading is None or reading['key'] != (round(lat, 4), round(lon, 4))
+            or time.time() - reading['fetched_at'] > WEATHER_CACHE_TTL):
+        return None
+    return st.session_state.weather_data
+
+
+# How each weather source reads next to a prediction
+WEATHER_SOURCE_LABELS = {
+    'caller':    "live, from the location panel",
+    'live':      "live",
+    'cached':    "cached - live conditions were not fetched in time",
+    'default':   "Nairobi averages - live conditions were not fetched in time",
+    'simulated': "simulated adverse conditions, demo mode",
+}
+
+
+def apply_weather_override(weather, simulate_adverse):
+    """Copy of the weather with the demo adverse-conditions override applied."""
+    weather = dict(weather) if weather else default_weather()
+    if simulate_adverse:
+        weather['is_adverse'] = True
+        weather['is_raining'] = True
+        weather['weather_code'] = 63         # moderate rain
+        weather['precipitation'] = 15.0
+        weather['wind_speed'] = 45.0
+        weather['temperature'] = 18.0
+    return weather
+
+
+def show_render_time(panel, start):
+    """Caption with the panel's render time when profiling is switched on."""
+    if SHOW_RERUN_TIMING:
+        st.caption(f"{panel} rendered in "
+                   f"{(time.perf_counter() - start) * 1000:.0f} ms")
 
 
 # ============================================================================
@@ -149,13 +257,13 @@ with st.sidebar:
     This is a decision support tool.
     Always combine with caller information and professional judgement.
     """)
-    
+
     st.markdown("---")
     st.caption("**Prediction Drivers**")
     st.caption("Temporal: 51.4%")
     st.caption("Spatial: 33.6%")
     st.caption("Weather: 15.0%")
-    
+
     st.markdown("---")
     st.caption("**Severity Classification**")
     st.caption("HIGH = Fatal + Severe crashes")
@@ -166,8 +274,9 @@ with st.sidebar:
 
     st.markdown("---")
     # Demo weather simulation toggle
-    simulate_adverse = st.checkbox(
+    st.checkbox(
         "Demo: Simulate Adverse Weather",
+        key="simulate_adverse",
         help="Override live weather to demonstrate system response to adverse conditions"
     )
 
@@ -175,15 +284,49 @@ with st.sidebar:
 # ============================================================================
 # INPUT SECTION
 # ============================================================================
+# Each panel is a fragment: changing a widget reruns only the panel that owns
+# it, not the whole page. Panels share their values through session state.
 st.header("Accident Details")
 col_loc, col_time = st.columns([2, 1])
 
 # ----------------------------------------------------------------------------
-# LOCATION INPUT
+# LOCATION + WEATHER INPUT
 # ----------------------------------------------------------------------------
-with col_loc:
+# Weather depends on location, so both live in one fragment
+@st.fragment
+def location_weather_panel():
+    start = time.perf_counter()
     st.subheader(" Location")
 
+    # Caller descriptions ("Thika Road near Roysambu") resolved offline;
+    # picking a match fills in the coordinates below
+    place_query = st.text_input(
+        "Caller's location description",
+        key="place_query",
+        placeholder="e.g. Ngong Road by Prestige",
+        help="Estates, roads and landmarks - press Enter for suggestions")
+    if place_query:
+        suggestions = gazetteer.autocomplete(place_query)
+        resolved    = gazetteer.resolve(place_query)
+        options     = ([resolved['name']] if resolved else []) + [
+            s['label'] for s in suggestions
+            if not resolved or normalise(s['label']) != normalise(resolved['name'])]
+
+        def use_place():
+            if st.session_state.place_choice is None:     # selection cleared
+                return
+            choice = gazetteer.resolve(st.session_state.place_choice)
+            if choice:
+                st.session_state.lat = choice['latitude']
+                st.session_state.lon = choice['longitude']
+
+        if options:
+            st.selectbox("Matching places", options, index=None,
+                         key="place_choice", on_change=use_place,
+                         placeholder="Select a match to set coordinates")
+        else:
+            st.caption("No matching place - enter coordinates manually.")
+
     # GPS coordinates are required - all spatial features are derived from them.
     # In real deployment, these would be auto-populated from the caller's GPS or cell tower data via the CAD system.
     c1, c2 = st.columns(2)
@@ -192,86 +335,52 @@ with col_loc:
             "Latitude",
             min_value=NAIROBI_BOUNDS['lat_min'],
             max_value=NAIROBI_BOUNDS['lat_max'],
-            value=DEFAULT_LOCATION['lat'],
             format="%.6f",
+            key="lat",
             help="Decimal degrees - e.g. -1.286389")
     with c2:
         lon = st.number_input(
             "Longitude",
             min_value=NAIROBI_BOUNDS['lon_min'],
             max_value=NAIROBI_BOUNDS['lon_max'],
-            value=DEFAULT_LOCATION['lon'],
             format="%.6f",
+            key="lon",
             help="Decimal degrees - e.g. 36.817223")
 
     st.caption("Enter the GPS coordinates of the accident location as reported by the caller.")
     if lat and lon:
-        dist = get_distance_from_cbd(lat, lon)
-        st.success(f" {lat:.5f}, {lon:.5f}  ·  {dist:.1f} km from CBD")
-
-# ----------------------------------------------------------------------------
-# DATE & TIME INPUT (with session state to prevent reset)
-# ----------------------------------------------------------------------------
-with col_time:
-    st.subheader(" Date & Time")
-
-    st.caption("Auto-filled with current date and time. Adjust if the accident occurred earlier.")
-    
-    # Date input with session state
-    accident_date = st.date_input("Date", value=st.session_state.selected_date or datetime.now(NAIROBI_TZ).date(), key="date_input")
-    st.session_state.selected_date = accident_date
-    
-    # Time input with session state - prevents automatic reset to current time
-    accident_time = st.time_input("Time", value=st.session_state.selected_time or datetime.now(NAIROBI_TZ).time(), key="time_input")
-    st.session_state.selected_time = accident_time
-    
-    accident_dt = datetime.combine(accident_date, accident_time)
-
-    temp   = extract_temporal_features(accident_dt)
-    badges = []
-    if temp['is_rush_hour']: badges.append(" Rush Hour")
-    if temp['is_night']:     badges.append(" Night")
-    if temp['is_weekend']:   badges.append(" Weekend")
-
-    if badges:
-        st.warning("  ".join(badges))
-    else:
-        st.success(" Regular hours")
-
-
-# ----------------------------------------------------------------------------
-# WEATHER INPUT (with compact dynamic contextual info + demo override)
-# ----------------------------------------------------------------------------
-st.markdown("---")
-st.markdown('<h3 style="margin-bottom:0.3rem"> Weather Conditions</h3>',
-            unsafe_allow_html=True)
-st.caption("Automatically fetched from the accident location once coordinates are entered.")
-w_col1, w_col2 = st.columns(2)
+        dist = cbd_distance(lat, lon)
+        road = road_context.lookup(lat, lon) if road_context is not None else None
+        road_text = ""
+        if road and road['road_type'] is None:
+            road_text = f"  ·  {NO_ROAD_LABEL}"
+        elif road:
+            road_text = (f"  ·  {road['road_type'].replace('_', ' ').title()} "
+                         f"{road['road_dist_m']:.0f} m away"
+                         + (", near a junction" if road['likely_intersection'] else ""))
+        st.success(f" {lat:.5f}, {lon:.5f}  ·  {dist:.1f} km from CBD{road_text}")
+
+    # ------------------------------------------------------------------------
+    # WEATHER (compact dynamic contextual info + demo override)
+    # ------------------------------------------------------------------------
+    st.markdown('<h3 style="margin-bottom:0.3rem"> Weather Conditions</h3>',
+                unsafe_allow_html=True)
+    st.caption("Automatically fetched from the accident location once coordinates are entered.")
+    simulate_adverse = st.session_state.get('simulate_adverse', False)
 
-with w_col1:
+    # Stacked rather than split into two columns: this panel already sits in
+    # a column and Streamlit allows only one level of column nesting
     if lat and lon:
-        # Only re-fetch if coordinates changed - prevents redundant API calls every time Streamlit reruns on button click
-        current_coords = (round(lat, 4), round(lon, 4))
-        if st.session_state.get('weather_coords') != current_coords:
-            with st.spinner("Fetching live weather..."):
-                weather = get_weather_data(lat, lon)
-                st.session_state.weather_data   = weather
-                st.session_state.weather_coords = current_coords
-        else:
-            weather = st.session_state.weather_data
-
-        if not weather:
-            weather = default_weather()
-        
-        # Apply demo weather override if checkbox is enabled
-        if simulate_adverse:
-            weather['is_adverse'] = True
-            weather['is_raining'] = True
-            weather['precipitation'] = 15.0
-            weather['wind_speed'] = 45.0
-            weather['temperature'] = 18.0
-
-        if st.session_state.weather_data and not simulate_adverse:
+        # Cached per rounded coordinate pair - reruns never re-hit the API
+        with st.spinner("Fetching live weather..."):
+            live, fetched_at = fetch_weather(lat, lon)
+        st.session_state.weather_data    = live
+        st.session_state.weather_reading = (
+            {'key': (round(lat, 4), round(lon, 4)), 'fetched_at': fetched_at}
+            if live else None)
+        weather = apply_weather_override(live, simulate_adverse)
+
+        if live and not simulate_adverse:
             st.success(" Live weather retrieved")
         elif simulate_adverse:
             st.warning(" Demo mode: Simulated adverse conditions")
@@ -283,22 +392,10 @@ with w_col1:
         m2.metric("Rain",  f"{weather['precipitation']:.1f} mm")
         m3.metric("Wind",  f"{weather['wind_speed']:.1f} km/h")
 
-        if weather['is_adverse']:
-            st.error(" ADVERSE WEATHER - Higher severity risk")
-        elif weather['is_raining']:
-            st.warning(" Rainy conditions")
-        else:
-            st.info(" Clear conditions")
-    else:
-        st.warning("Enter location first to fetch weather")
-        weather = default_weather()
-
-# Compact dynamic contextual weather info
-with w_col2:
-    if lat and lon and weather:
+        # Compact dynamic contextual weather info
         if weather['is_adverse']:
             st.error("""
-            **ADVERSE CONDITIONS**  
+            **ADVERSE WEATHER - Higher severity risk**  
             Reduced visibility/vehicle control • Extended response times • Consider additional units
             """)
         elif weather['is_raining']:
@@ -312,201 +409,289 @@ with w_col2:
             Standard protocols • No weather complications
             """)
     else:
+        st.warning("Enter location first to fetch weather")
         st.info("""
         **Weather Impact**  
         Affects vehicle control, visibility, road conditions, and response times
         """)
 
+    show_render_time("Location & weather", start)
 
-# ============================================================================
-# PREDICT BUTTON
-# ============================================================================
-st.markdown("---")
-_, btn_col, _ = st.columns([1, 2, 1])
-with btn_col:
-    predict_clicked = st.button("PREDICT SEVERITY",
-                                type="primary",
-                                use_container_width=True)
 
+# ----------------------------------------------------------------------------
+# DATE & TIME INPUT (with session state to prevent reset)
+# ----------------------------------------------------------------------------
+@st.fragment
+def time_panel():
+    start = time.perf_counter()
+    st.subheader(" Date & Time")
+
+    st.caption("Auto-filled with current date and time. Adjust if the accident occurred earlier.")
 
+    # Date input with session state
+    accident_date = st.date_input("Date", value=st.session_state.selected_date or datetime.now(NAIROBI_TZ).date(), key="date_input")
+    st.session_state.selected_date = accident_date
 
-# ============================================================================
-# PREDICTION LOGIC
-# ============================================================================
-if predict_clicked:
-    if lat is None or lon is None:
-        st.error("Please provide accident location first.")
+    # Time input with session state - prevents automatic reset to current time
+    accident_time = st.time_input("Time", value=st.session_state.selected_time or datetime.now(NAIROBI_TZ).time(), key="time_input")
+    st.session_state.selected_time = accident_time
+
+    accident_dt = datetime.combine(accident_date, accident_time)
+
+    temp   = temporal_features(accident_dt)
+    badges = []
+    if temp['is_rush_hour']: badges.append(" Rush Hour")
+    if temp['is_night']:     badges.append(" Night")
+    if temp['is_weekend']:   badges.append(" Weekend")
+
+    if badges:
+        st.warning("  ".join(badges))
     else:
-        weather = st.session_state.weather_data or default_weather()
-        
-        # Apply demo weather override if checkbox is enabled
-        if simulate_adverse:
-            weather['is_adverse'] = True
-            weather['is_raining'] = True
-            weather['precipitation'] = 15.0
-            weather['wind_speed'] = 45.0
-            weather['temperature'] = 18.0
-
-        with st.spinner("Analysing accident data..."):
-            # Build 44-feature vector (mirrors Notebook 02 pipeline)
-            features_df = prepare_features(
-                lat, lon, accident_dt, weather, feature_names)
-
-            # Weighted ensemble probability + 0.13 threshold
-            result = ensemble_predict(
-                rf_model, xgb_model, lgbm_model,
-                features_df,
-                ENSEMBLE_WEIGHTS,
-                ENSEMBLE_THRESHOLD
-            )
-
-            result['top_features']     = get_top_features(rf_model, feature_names)
-            result['location']         = (lat, lon)
-            result['datetime']         = accident_dt
-            result['weather']          = weather
-            # Nearest hospital computed once per prediction
-            result['nearest_hospital'] = get_nearest_hospital(lat, lon)
-
-            st.session_state.prediction_result = result
-            st.session_state.prediction_made   = True
+        st.success(" Regular hours")
+
+    show_render_time("Date & time", start)
+
+
+with col_loc:
+    location_weather_panel()
+with col_time:
+    time_panel()
 
 
 # ============================================================================
-# RESULTS DISPLAY
+# PREDICTION + RESULTS
 # ============================================================================
-if st.session_state.prediction_made and st.session_state.prediction_result:
+def build_gauge(prob, severity, risk_level):
+    # Risk stratification gauge - shows risk category instead of raw percentage
+    fig_g = go.Figure(go.Indicator(
+        mode="gauge",
+        value=prob * 100,
+        title={'text': f"<b>{risk_level}</b>",
+            'font': {'size': 28, 'color': '#c0392b' if severity == 1 else '#27ae60'}},
+        gauge={
+            'axis': {'range': [0, 100], 'visible': True},
+            'bar':  {'color': '#c0392b' if severity == 1 else '#27ae60', 'thickness': 0.3},
+            'steps': [
+                {'range': [0,  13], 'color': '#e8f5e9', 'name': 'Standard'},
+                {'range': [13, 40], 'color': '#fff9c4', 'name': 'Elevated'},
+                {'range': [40, 70], 'color': '#ffcdd2', 'name': 'High'},
+                {'range': [70,100], 'color': '#ffebee', 'name': 'Critical'},
+            ],
+            'threshold': {
+                'line': {'color': 'black', 'width': 3},
+                'thickness': 0.85, 'value': 13
+            }
+        }
+    ))
+    fig_g.update_layout(height=250, margin=dict(l=10,r=10,t=60,b=10))
+    return fig_g
+
+
+def build_feature_bar(top_feats, severity):
+    # Top features - what drove this specific prediction
+    fig_f = px.bar(top_feats,
+                x='importance', y='feature',
+                orientation='h',
+                color='importance',
+                color_continuous_scale=(
+                    'Reds' if severity == 1 else 'Greens'))
+    fig_f.update_layout(
+        yaxis={'categoryorder': 'total ascending'},
+        height=250, showlegend=False,
+        margin=dict(l=10,r=10,t=10,b=10),
+        coloraxis_showscale=False)
+    return fig_f
+
+
+@st.fragment
+def prediction_panel():
+    start = time.perf_counter()
+
+    # ========================================================================
+    # PREDICT BUTTON
+    # ========================================================================
     st.markdown("---")
-    st.header(" Dispatch Recommendation")
-
-    res      = st.session_state.prediction_result
-    severity = res['prediction']
-    prob     = res['probability']
-
-
-    # ----------------------------------------------------------------------------
-    # SEVERITY BANNER
-    # ----------------------------------------------------------------------------
-    if severity == 1:
-        st.markdown(f"""
-        <div class="severity-high">
-            <h3 style="color:#c0392b;margin:0">
-                HIGH SEVERITY ACCIDENT</h3>
-            <p style="margin:.3rem 0;color:#555;font-size:0.95rem">
-                Response type: <strong>Advanced Life Support (ALS)</strong>
-            </p>
-        </div>""", unsafe_allow_html=True)
-    else:
-        st.markdown(f"""
-        <div class="severity-low">
-            <h3 style="color:#27ae60;margin:0">
-                LOW SEVERITY ACCIDENT</h3>
-            <p style="margin:.3rem 0;color:#555;font-size:0.95rem">
-                Response type: <strong>Basic Life Support (BLS)</strong>
-            </p>
-        </div>""", unsafe_allow_html=True)
-
-
-    # ----------------------------------------------------------------------------
-    # RISK LEVEL (replaces raw probability confidence badge)
-    # ----------------------------------------------------------------------------
-    if prob >= 0.70:
-        risk_level = "CRITICAL RISK"
-        risk_icon = "🔴"
-        risk_caption = "Assessment based on accident location, timing, and conditions. CRITICAL risk requires immediate ALS deployment."
-    elif prob >= 0.40:
-        risk_level = "HIGH RISK"
-        risk_icon = "🔴"
-        risk_caption = "Assessment based on accident location, timing, and conditions. HIGH risk indicates strong need for ALS response."
-    elif prob >= 0.13:
-        risk_level = "ELEVATED RISK"
-        risk_icon = "🟡"
-        risk_caption = "Assessment based on accident location, timing, and conditions. ELEVATED risk suggests ALS dispatch with dispatcher judgment."
-    else:
-        risk_level = "STANDARD RISK"
-        risk_icon = "🟢"
-        risk_caption = "Assessment based on accident location, timing, and conditions. STANDARD risk indicates BLS response sufficient."
+    _, btn_col, _ = st.columns([1, 2, 1])
+    with btn_col:
+        predict_clicked = st.button("PREDICT SEVERITY",
+                                    type="primary",
+                                    use_container_width=True)
+
+    # ========================================================================
+    # PREDICTION LOGIC
+    # ========================================================================
+    if predict_clicked:
+        lat = st.session_state.get('lat')
+        lon = st.session_state.get('lon')
+        if lat is None or lon is None:
+            st.error("Please provide accident location first.")
+        else:
+            accident_dt = datetime.combine(st.session_state.selected_date,
+                                           st.session_state.selected_time)
+            # Score with the weather the panel shows while it is fresh, so a
+            # click never re-hits the API; otherwise the scheduler fetches
+            # (live, or cached under load)
+            simulate = st.session_state.get('simulate_adverse', False)
+            weather  = (apply_weather_override(st.session_state.weather_data, True)
+                        if simulate else panel_weather(lat, lon))
+
+            with st.spinner("Analysing accident data..."):
+                # 44-feature vector + weighted ensemble (0.13 threshold),
+                # queued behind the admission scheduler; under overload it
+                # answers in a degraded mode instead of waiting
+                result = scheduler.predict(lat, lon, accident_dt,
+                                           priority='urgent', weather=weather)
+                if simulate:
+                    result['weather_source'] = 'simulated'
+
+                result['top_features']     = top_features()
+                result['location']         = (lat, lon)
+                result['datetime']         = accident_dt
+                result.setdefault('weather', None)
+                # Fastest trauma centres computed once per prediction
+                result['hospitals']        = nearest_trauma_centres(
+                    lat, lon, accident_dt.hour)
+                # Charts are built on first view of the detailed analysis
+                result['figures']          = None
+
+                st.session_state.prediction_result = result
+                st.session_state.prediction_made   = True
+
+    # ========================================================================
+    # RESULTS DISPLAY
+    # ========================================================================
+    if st.session_state.prediction_made and st.session_state.prediction_result:
+        st.markdown("---")
+        st.header(" Dispatch Recommendation")
+
+        res      = st.session_state.prediction_result
+        severity = res['prediction']
+        prob     = res['probability']
+
+
+        # --------------------------------------------------------------------
+        # SEVERITY BANNER
+        # --------------------------------------------------------------------
+        if severity == 1:
+            st.markdown(f"""
+            <div class="severity-high">
+                <h3 style="color:#c0392b;margin:0">
+                    HIGH SEVERITY ACCIDENT</h3>
+                <p style="margin:.3rem 0;color:#555;font-size:0.95rem">
+                    Response type: <strong>Advanced Life Support (ALS)</strong>
+                </p>
+            </div>""", unsafe_allow_html=True)
+        else:
+            st.markdown(f"""
+            <div class="severity-low">
+                <h3 style="color:#27ae60;margin:0">
+                    LOW SEVERITY ACCIDENT</h3>
+                <p style="margin:.3rem 0;color:#555;font-size:0.95rem">
+                    Response type: <strong>Basic Life Support (BLS)</strong>
+                </p>
+            </div>""", unsafe_allow_html=True)
+
+        if res.get('mode') in ('reduced_models', 'lookup'):
+            st.warning(f"Scored under system load ({MODE_DESCRIPTIONS[res['mode']]}). "
+                       "Predict again when load eases for a full assessment.")
+
+        # The weather the model actually scored with, and where it came from
+        used = res.get('weather')
+        if used is None:
+            st.caption("Weather not used - scored from the precomputed risk table.")
+        else:
+            used_text = (f"Weather used: {used['temperature']:.1f}°C · "
+                         f"{used['precipitation']:.1f} mm rain · "
+                         f"{used['wind_speed']:.1f} km/h wind "
+                         f"({WEATHER_SOURCE_LABELS[res['weather_source']]})")
+            if res['weather_source'] in ('cached', 'default'):
+                st.info(used_text)
+            else:
+                st.caption(used_text)
+
+
+        # --------------------------------------------------------------------
+        # RISK LEVEL (replaces raw probability confidence badge)
+        # --------------------------------------------------------------------
+        if prob >= 0.70:
+            risk_level = "CRITICAL RISK"
+            risk_icon = "🔴"
+            risk_caption = "Assessment based on accident location, timing, and conditions. CRITICAL risk requires immediate ALS deployment."
+        elif prob >= 0.40:
+            risk_level = "HIGH RISK"
+            risk_icon = "🔴"
+            risk_caption = "Assessment based on accident location, timing, and conditions. HIGH risk indicates strong need for ALS response."
+        elif prob >= 0.13:
+            risk_level = "ELEVATED RISK"
+            risk_icon = "🟡"
+            risk_caption = "Assessment based on accident location, timing, and conditions. ELEVATED risk suggests ALS dispatch with dispatcher judgment."
+        else:
+            risk_level = "STANDARD RISK"
+            risk_icon = "🟢"
+            risk_caption = "Assessment based on accident location, timing, and conditions. STANDARD risk indicates BLS response sufficient."
+
+        st.markdown(f"**Model confidence:** {risk_icon} {risk_level}",
+                    unsafe_allow_html=True)
+
+
+        # --------------------------------------------------------------------
+        # DISPATCH ACTIONS
+        # --------------------------------------------------------------------
+        # HIGH severity actions use the fastest-to-reach trauma centre
+        st.markdown('<h3 style="margin-top:1rem;margin-bottom:0.3rem"> Dispatch Actions</h3>',
+                    unsafe_allow_html=True)
+
+        if severity == 1:
+            name, eta = res['hospitals'][0]
+            eta_text  = f" (~{eta:.0f} min by road)" if eta is not None else ""
+            high_actions = [
+                "URGENT: Dispatch Advanced Life Support (ALS) unit immediately",
+                f"Alert nearest trauma centre - {name}{eta_text}",
+                "Prepare receiving team for potential critical care",
+                "Consider air ambulance if severe traffic congestion",
+            ]
+            for action in high_actions:
+                st.error(f"• {action}")
+            if len(res['hospitals']) > 1:
+                st.caption("Alternatives: " + " · ".join(
+                    f"{n} (~{e:.0f} min)" for n, e in res['hospitals'][1:]))
+        else:
+            for action in RECOMMENDED_ACTIONS[0]:
+                st.success(f"• {action}")
 
-    st.markdown(f"**Model confidence:** {risk_icon} {risk_level}",
-                unsafe_allow_html=True)
 
+        # --------------------------------------------------------------------
+        # DETAILED ANALYSIS (collapsed)
+        # --------------------------------------------------------------------
+        # A toggle rather than st.expander: expander bodies execute even when
+        # collapsed, so the charts would be rebuilt on every rerun
+        st.markdown("---")
+        if st.toggle(" View Detailed Analysis", value=False, key="show_details"):
 
-    # ----------------------------------------------------------------------------
-    # DISPATCH ACTIONS
-    # ----------------------------------------------------------------------------
-    # HIGH severity actions use the nearest hospital instead of a hardcoded name
-    st.markdown('<h3 style="margin-top:1rem;margin-bottom:0.3rem"> Dispatch Actions</h3>',
-                unsafe_allow_html=True)
+            # Figures are built once per prediction, then reused
+            if res['figures'] is None:
+                res['figures'] = (build_gauge(prob, severity, risk_level),
+                                  build_feature_bar(res['top_features'], severity))
+            fig_g, fig_f = res['figures']
 
-    if severity == 1:
-        high_actions = [
-            "URGENT: Dispatch Advanced Life Support (ALS) unit immediately",
-            f"Alert nearest trauma centre - {res['nearest_hospital']}",
-            "Prepare receiving team for potential critical care",
-            "Consider air ambulance if severe traffic congestion",
-        ]
-        for action in high_actions:
-            st.error(f"• {action}")
-    else:
-        for action in RECOMMENDED_ACTIONS[0]:
-            st.success(f"• {action}")
+            d1, d2 = st.columns(2)
 
+            with d1:
+                st.subheader("Risk Assessment")
+                st.plotly_chart(fig_g, use_container_width=True)
 
-    # ----------------------------------------------------------------------------
-    # DETAILED ANALYSIS (collapsed)
-    # ----------------------------------------------------------------------------
-    st.markdown("---")
-    with st.expander(" View Detailed Analysis", expanded=False):
-
-        d1, d2 = st.columns(2)
-
-        # Risk stratification gauge - shows risk category instead of raw percentage
-        with d1:
-            st.subheader("Risk Assessment")
-            
-            # Create gauge with needle position but risk category text instead of percentage
-            fig_g = go.Figure(go.Indicator(
-                mode="gauge",
-                value=prob * 100,
-                title={'text': f"<b>{risk_level}</b>", 
-                    'font': {'size': 28, 'color': '#c0392b' if severity == 1 else '#27ae60'}},
-                gauge={
-                    'axis': {'range': [0, 100], 'visible': True},
-                    'bar':  {'color': '#c0392b' if severity == 1 else '#27ae60', 'thickness': 0.3},
-                    'steps': [
-                        {'range': [0,  13], 'color': '#e8f5e9', 'name': 'Standard'},
-                        {'range': [13, 40], 'color': '#fff9c4', 'name': 'Elevated'},
-                        {'range': [40, 70], 'color': '#ffcdd2', 'name': 'High'},
-                        {'range': [70,100], 'color': '#ffebee', 'name': 'Critical'},
-                    ],
-                    'threshold': {
-                        'line': {'color': 'black', 'width': 3},
-                        'thickness': 0.85, 'value': 13
-                    }
-                }
-            ))
-            fig_g.update_layout(height=250, margin=dict(l=10,r=10,t=60,b=10))
-            st.plotly_chart(fig_g, use_container_width=True)
-            
-            # Dynamic caption based on risk level
-            st.caption(risk_caption)
-
-
-        # Top features - what drove this specific prediction
-        with d2:
-            st.subheader("Top Risk Factors")
-            st.caption("Variables that most influenced this prediction:")
-            fig_f = px.bar(res['top_features'],
-                        x='importance', y='feature',
-                        orientation='h',
-                        color='importance',
-                        color_continuous_scale=(
-                            'Reds' if severity == 1 else 'Greens'))
-            fig_f.update_layout(
-                yaxis={'categoryorder': 'total ascending'},
-                height=250, showlegend=False,
-                margin=dict(l=10,r=10,t=10,b=10),
-                coloraxis_showscale=False)
-            st.plotly_chart(fig_f, use_container_width=True)
+                # Dynamic caption based on risk level
+                st.caption(risk_caption)
+
+            with d2:
+                st.subheader("Top Risk Factors")
+                st.caption("Variables that most influenced this prediction:")
+                st.plotly_chart(fig_f, use_container_width=True)
+
+    show_render_time("Prediction", start)
+
+
+prediction_panel()
 
 
 # ============================================================================
@@ -515,4 +700,4 @@ if st.session_state.prediction_made and st.session_state.prediction_result:
 st.markdown("---")
 st.caption(
     "**Disclaimer:** Decision support tool only. "
-    "Final dispatch decisions must be made by qualified emergency personnel.")
\ No newline at end of file
+    "Final dispatch decisions must be made by qualified emergency personnel.")
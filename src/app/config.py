@@ -38,6 +38,35 @@ ENSEMBLE_WEIGHTS = {'rf': 0.33, 'xgboost': 0.33, 'lgbm': 0.34}
 ENSEMBLE_THRESHOLD = 0.13
 
 
+# Offline gazetteer of estates, landmarks and road alignments for resolving
+# caller location descriptions without network access
+GAZETTEER_PATH = os.path.join(
+    PROJECT_ROOT, 'data', 'gazetteer', 'nairobi_gazetteer.csv')
+
+
+# Nearest-road class / intersection raster built from a local OSM extract
+# by road_context.py. Shown to dispatchers only: the models learned road type
+# from crash volume, so the raster is not fed into the feature vector
+ROAD_CONTEXT_PATH = os.path.join(
+    PROJECT_ROOT, 'data', 'features', 'road_context.npz')
+
+
+# ============================================================================
+# RETRAINING PIPELINE
+# ============================================================================
+# Inputs produced by Notebooks 01 / 02 and used by train_pipeline.py
+LABELED_CRASHES_PATH = os.path.join(
+    PROJECT_ROOT, 'data', 'processed', 'labeled_crashes.csv')
+WEATHER_ARCHIVE_PATH = os.path.join(
+    PROJECT_ROOT, 'data', 'raw', 'weather_data_raw.pkl')
+
+# Stage results keyed by input hash, so unchanged stages are skipped
+PIPELINE_CACHE_DIR = os.path.join(PROJECT_ROOT, 'data', 'cache')
+
+# Retrained artifacts land here for review before replacing MODEL_DIR
+RETRAIN_OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'models', 'retrained')
+
+
 # ============================================================================
 # NAIROBI GEOGRAPHIC BOUNDARIES
 # ============================================================================
@@ -52,6 +81,78 @@ DEFAULT_LOCATION = {
     'name': 'Nairobi City Centre'
 }
 
+# ============================================================================
+# INTERFACE PERFORMANCE
+# ============================================================================
+# Live weather is cached per rounded coordinate pair for this many seconds;
+# conditions change slowly relative to a dispatcher editing the same call
+WEATHER_CACHE_TTL = 600
+
+# Show per-panel render time under each panel (rerun latency profiling)
+SHOW_RERUN_TIMING = False
+
+# ============================================================================
+# MULTI-CALLER INCIDENT MERGING
+# ============================================================================
+# Reports within this distance and time of an open incident are treated as
+# further callers for the same crash and scored once
+MERGE_RADIUS_M   = 250
+MERGE_WINDOW_MIN = 30
+
+# ============================================================================
+# SHADOW / CANARY MODELS
+# ============================================================================
+# Extra model bundles loaded beside production. Each directory uses the
+# train_pipeline.py export layout; directories that do not exist are skipped.
+# Shadow bundles are scored off the response path and never served; the
+# canary serves CANARY_FRACTION of incidents in place of production.
+SHADOW_MODEL_DIRS = {'retrained': RETRAIN_OUTPUT_DIR}
+CANARY_MODEL_DIR  = None
+CANARY_FRACTION   = 0.05
+
+# Per-request comparison records (agreement, probability delta, latency)
+SHADOW_LOG_PATH = os.path.join(
+    PROJECT_ROOT, 'data', 'monitoring', 'shadow_log.jsonl')
+
+# ============================================================================
+# ADMISSION CONTROL
+# ============================================================================
+# Response deadline (seconds from submission) and queue bound per priority
+REQUEST_DEADLINES_S = {'critical': 2.0, 'urgent': 5.0, 'routine': 15.0}
+QUEUE_LIMITS        = {'critical': 32,  'urgent': 64,  'routine': 64}
+SCORING_WORKERS     = 4
+
+# Models kept in the reduced-model degraded mode (weights renormalised)
+REDUCED_MODELS = ['xgboost']
+
+# Precomputed probability per grid cell, weekday and hour for the
+# last-resort degraded mode; built by risk_lookup.py from the ensemble
+RISK_LOOKUP_PATH = os.path.join(
+    PROJECT_ROOT, 'data', 'features', 'risk_lookup.npz')
+
+# ============================================================================
+# TRAUMA CENTRES
+# ============================================================================
+# Major Nairobi trauma centres with coordinates.
+# Used to recommend the closest facility based on accident location.
+NAIROBI_HOSPITALS = [
+    {"name": "Kenyatta National Hospital",    "lat": -1.3018, "lon": 36.8065},
+    {"name": "Nairobi Hospital",              "lat": -1.2921, "lon": 36.8159},
+    {"name": "Aga Khan University Hospital",  "lat": -1.2634, "lon": 36.8187},
+    {"name": "MP Shah Hospital",              "lat": -1.2699, "lon": 36.8127},
+    {"name": "Mathare Hospital",              "lat": -1.2621, "lon": 36.8597},
+    {"name": "Karen Hospital",                "lat": -1.3173, "lon": 36.7145},
+    {"name": "Gertrude's Children's Hospital","lat": -1.2603, "lon": 36.8225},
+    {"name": "Nairobi West Hospital",         "lat": -1.3089, "lon": 36.8219},
+    {"name": "Mater Misericordiae Hospital",  "lat": -1.3006, "lon": 36.8389},
+]
+
+# Road-network travel-time field built by travel_time.py from a local OSM
+# extract; when absent, the nearest hospital is chosen by straight line
+TRAVEL_TIME_PATH = os.path.join(
+    PROJECT_ROOT, 'data', 'features', 'travel_time.npz')
+
+
 # ============================================================================
 # DISPLAY SETTINGS
 # ============================================================================
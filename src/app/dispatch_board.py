@@ -0,0 +1,312 @@
+"""
+Dispatch Board — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+Holds the queue of open incidents a dispatcher is juggling and keeps their
+severity scores current. All incidents that need (re-)scoring are featurised
+and scored together in one batched ensemble call; incidents whose inputs
+have not changed keep their previous score, so adding one incident or
+refreshing the weather only re-scores the affected rows. When the
+travel-time grid is available, each scored incident also carries its
+fastest trauma centre and road ETA from the same batch. The OSM road
+raster, when built, labels each incident with its nearest road class for
+the dispatcher; it is not a model input.
+
+With an IncidentIndex attached, a report close in space and time to an
+open incident is linked to it as another caller instead of queued as a new
+incident: it adds to the incident's report count and shares its score.
+
+With a ModelRegistry attached, each batch is scored by the registry: it
+builds the features per bundle feature state, serves production (or the
+canary for its share of incidents) and compares shadow bundles in the
+background.
+"""
+
+import itertools
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from utils import (default_weather, prepare_features_batch,
+                   ensemble_predict_batch, WEATHER_KEYS)
+from model_registry import incident_key
+from road_context import NO_ROAD_LABEL
+
+
+# Weather is fetched once per grid cell of this size (decimal places),
+# matching the rounding the single-incident view uses for its cache
+WEATHER_ROUNDING = 4
+
+# Weather refresh: cells fetched concurrently, and the whole refresh given
+# up after this many seconds (slower cells keep their current weather)
+WEATHER_FETCH_WORKERS    = 8
+WEATHER_REFRESH_BUDGET_S = 8.0
+
+BOARD_COLUMNS = ['incident_id', 'label', 'latitude', 'longitude', 'datetime',
+                 'road_class', 'n_reports', 'probability', 'prediction', 'model_set',
+                 'hospital', 'eta_min', 'scored_at']
+
+REPORT_COLUMNS = ['report_id', 'incident_id', 'label', 'latitude', 'longitude',
+                  'datetime', 'n_reports', 'probability', 'prediction']
+
+
+class DispatchBoard:
+    """
+    Open incidents plus their latest ensemble scores.
+
+    Incidents are stored by id; any incident whose inputs change is marked
+    dirty and picked up by the next rescore(). The board never re-scores
+    a clean incident.
+    """
+
+    def __init__(self, rf, xgb, lgbm, feature_names, weights, threshold,
+                 road_context=None, travel_times=None, feature_state=None,
+                 merge_index=None, registry=None):
+        self.models        = (rf, xgb, lgbm)
+        self.feature_names = feature_names
+        self.weights       = weights
+        self.threshold     = threshold
+        self.road_context  = road_context
+        self.travel_times  = travel_times
+        self.feature_state = feature_state
+        self.merge_index   = merge_index
+        self.registry      = registry
+
+        self._incidents  = {}         # id -> incident record
+        self._scores     = {}         # id -> score record
+        self._reports    = {}         # report id -> report record (incl. incident id)
+        self._dirty      = set()
+        self._ids        = itertools.count(1)
+        self._report_ids = itertools.count(1)
+        self._latest_dt  = None       # latest report time seen (merge clock)
+
+    # ------------------------------------------------------------------------
+    # QUEUE MANAGEMENT
+    # ------------------------------------------------------------------------
+
+    def open_incident_for(self, lat, lon, dt):
+        """Id of the open incident a report here would merge into, or None."""
+        if self.merge_index is None:
+            return None
+        incident_id = self.merge_index.match(lat, lon, dt)
+        return incident_id if incident_id in self._incidents else None
+
+    def add_incident(self, lat, lon, dt, weather=None, label=None):
+        """
+        Queue a caller report. A report matching an open incident is linked
+        to it (no re-scoring, weather unused); otherwise a new incident is
+        queued and scored on the next rescore(). Returns the incident id.
+        """
+        incident_id = self.open_incident_for(lat, lon, dt)
+
+        if incident_id is not None:
+            self._incidents[incident_id]['n_reports'] += 1
+        else:
+            incident_id = next(self._ids)
+            w    = weather if weather else default_weather()
+            road = (self.road_context.lookup(lat, lon)
+                    if self.road_context is not None else None)
+            self._incidents[incident_id] = {
+                'incident_id': incident_id,
+                'label':       label or f"Incident {incident_id}",
+                'latitude':    lat,
+                'longitude':   lon,
+                'datetime':    dt,
+                'road_class':  (road['road_type'] or NO_ROAD_LABEL) if road else None,
+                'n_reports':   1,
+                **{k: w[k] for k in WEATHER_KEYS},
+            }
+            self._dirty.add(incident_id)
+
+        if self.merge_index is not None:
+            self.merge_index.add(incident_id, lat, lon, dt)
+        if self._latest_dt is None or dt > self._latest_dt:
+            self._latest_dt = dt
+        report_id = next(self._report_ids)
+        self._reports[report_id] = {
+            'report_id':   report_id,
+            'incident_id': incident_id,
+            'label':       label or f"Report {report_id}",
+            'latitude':    lat,
+            'longitude':   lon,
+            'datetime':    dt,
+        }
+        return incident_id
+
+    def close_incident(self, incident_id):
+        """Remove a resolved incident and its linked reports from the board."""
+        self._incidents.pop(incident_id, None)
+        self._scores.pop(incident_id, None)
+        self._dirty.discard(incident_id)
+        self._reports = {r: rep for r, rep in self._reports.items()
+                         if rep['incident_id'] != incident_id}
+        if self.merge_index is not None:
+            self.merge_index.remove(incident_id)
+
+    def expire_merges(self, now=None):
+        """
+        Stop merging into incidents whose merge window has passed by `now`;
+        they stay on the board. Keeps the merge index bounded over a
+        session. Returns the number of incidents expired.
+
+        `now` defaults to the latest reported time on the board rather than
+        the wall clock, so back-dated reports are matched against each other
+        on the same time base the merge window uses.
+        """
+        now = now if now is not None else self._latest_dt
+        if self.merge_index is None or now is None:
+            return 0
+        return len(self.merge_index.expire(now))
+
+    def __len__(self):
+        return len(self._incidents)
+
+    def n_reports(self, incident_id):
+        """Number of caller reports linked to an open incident."""
+        return self._incidents[incident_id]['n_reports']
+
+    @property
+    def pending(self):
+        """Number of incidents waiting to be (re-)scored."""
+        return len(self._dirty)
+
+    # ------------------------------------------------------------------------
+    # WEATHER REFRESH
+    # ------------------------------------------------------------------------
+
+    def refresh_weather(self, fetch_weather, workers=WEATHER_FETCH_WORKERS,
+                        budget_s=WEATHER_REFRESH_BUDGET_S):
+        """
+        Re-fetch weather once per rounded location and mark dirty only the
+        incidents whose weather actually changed.
+
+        fetch_weather(lat, lon) returns a weather dict or None (API down);
+        None, an error, or no answer within budget_s leaves the incident's
+        current weather in place. Cells are fetched on up to `workers`
+        threads. Returns (incidents marked for re-scoring, cells not
+        refreshed).
+        """
+        cells = {}
+        for inc in self._incidents.values():
+            key = (round(inc['latitude'],  WEATHER_ROUNDING),
+                   round(inc['longitude'], WEATHER_ROUNDING))
+            cells.setdefault(key, []).append(inc)
+        if not cells:
+            return 0, 0
+
+        pool    = ThreadPoolExecutor(max_workers=min(workers, len(cells)))
+        futures = {pool.submit(fetch_weather, *key): key for key in cells}
+        done, _ = wait(futures, timeout=budget_s)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        changed, missed = 0, len(cells) - len(done)
+        for future in done:
+            weather = future.exception() is None and future.result()
+            if not weather:
+                missed += 1
+                continue
+            incidents = cells[futures[future]]
+            for inc in incidents:
+                if any(inc[k] != weather[k] for k in WEATHER_KEYS):
+                    inc.update({k: weather[k] for k in WEATHER_KEYS})
+                    self._dirty.add(inc['incident_id'])
+                    changed += 1
+        return changed, missed
+
+    # ------------------------------------------------------------------------
+    # SCORING
+    # ------------------------------------------------------------------------
+
+    def rescore(self):
+        """
+        Score every dirty incident in one batched ensemble call.
+        Returns the number of incidents scored. Incidents stay dirty until
+        their scores are stored, so a failed batch is retried next time.
+        """
+        ids = [i for i in self._dirty if i in self._incidents]
+        if not ids:
+            return 0
+
+        batch = pd.DataFrame([self._incidents[i] for i in ids], index=ids)
+        if self.registry is not None:
+            keys     = [incident_key(*row) for row in
+                        zip(batch['latitude'], batch['longitude'], batch['datetime'])]
+            results  = self.registry.predict_batch(batch, keys)
+        else:
+            features = prepare_features_batch(batch, self.feature_names,
+                                              self.feature_state)
+            results  = ensemble_predict_batch(*self.models, features,
+                                              self.weights, self.threshold)
+            results['model_set'] = 'production'
+
+        hospital = np.full(len(ids), None, dtype=object)
+        eta_min  = np.full(len(ids), np.nan)
+        if self.travel_times is not None:
+            routes = self.travel_times.lookup_batch(
+                batch['latitude'], batch['longitude'],
+                batch['datetime'].map(lambda d: d.hour).to_numpy(), k=1)
+            covered = routes['covered']
+            hospital[covered] = routes['hospital'][covered, 0]
+            eta_min[covered]  = routes['eta_min'][covered, 0]
+
+        scored_at = datetime.now()
+        for i, incident_id in enumerate(ids):
+            self._scores[incident_id] = {
+                'probability': float(results['probability'].iat[i]),
+                'prediction':  int(results['prediction'].iat[i]),
+                'model_set':   results['model_set'].iat[i],
+                'hospital':    hospital[i],
+                'eta_min':     float(eta_min[i]),
+                'scored_at':   scored_at,
+            }
+        self._dirty.difference_update(ids)
+        return len(ids)
+
+    def ranked(self):
+        """
+        All open incidents ranked by HIGH-severity probability.
+        Incidents not yet scored sort last with a NaN probability.
+        """
+        if not self._incidents:
+            return pd.DataFrame(columns=BOARD_COLUMNS)
+
+        rows = []
+        for incident_id, inc in self._incidents.items():
+            score = self._scores.get(incident_id, {})
+            rows.append({
+                'incident_id': incident_id,
+                'label':       inc['label'],
+                'latitude':    inc['latitude'],
+                'longitude':   inc['longitude'],
+                'datetime':    inc['datetime'],
+                'road_class':  inc['road_class'],
+                'n_reports':   inc['n_reports'],
+                'probability': score.get('probability', np.nan),
+                'prediction':  score.get('prediction'),
+                'model_set':   score.get('model_set'),
+                'hospital':    score.get('hospital'),
+                'eta_min':     score.get('eta_min', np.nan),
+                'scored_at':   score.get('scored_at'),
+            })
+
+        # More callers breaks ties between equally scored incidents
+        board = pd.DataFrame(rows, columns=BOARD_COLUMNS)
+        return board.sort_values(['probability', 'n_reports'], ascending=False,
+                                 na_position='last').reset_index(drop=True)
+
+    def reports(self):
+        """
+        Every caller report with the score of the incident it was merged
+        into (one ensemble call per incident, fanned out to its reports).
+        """
+        rows = []
+        for rep in self._reports.values():
+            score = self._scores.get(rep['incident_id'], {})
+            rows.append({
+                **rep,
+                'n_reports':   self._incidents[rep['incident_id']]['n_reports'],
+                'probability': score.get('probability', np.nan),
+                'prediction':  score.get('prediction'),
+            })
+        return pd.DataFrame(rows, columns=REPORT_COLUMNS)
@@ -0,0 +1,432 @@
+"""
+Feature Materialisation — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+The one implementation of the Notebook 02 feature transforms. The retraining
+pipeline and the app both call transform(), so training and inference
+features cannot drift apart.
+
+Raw record schema (one row per crash or incident):
+    latitude, longitude, datetime
+    temperature, precipitation, wind_speed, humidity, pressure, weather_code
+    crashes_at_location, high_rate_at_location       location history
+
+Road type, intersection and risk category are derived from the location
+history exactly as Notebook 02 does. At inference the history is unknown,
+so both history columns take the fitted state's location_fill and the
+categories follow from those same values; every feature is computed the
+same way on both paths.
+
+Large crash histories are featurised in bounded memory: fit_state() and
+materialize() stream the raw CSV in fixed-size chunks and append each
+featurised chunk to a Parquet store.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+
+# Rows per chunk when streaming raw crash records
+CHUNK_SIZE = 50_000
+
+# Nairobi CBD (City Hall)
+CBD_LAT, CBD_LON = -1.286389, 36.817223
+
+NUMERIC_FEATURES = [
+    'latitude', 'longitude',
+    'hour', 'day_of_week', 'month', 'year', 'is_weekend',
+    'hour_severity_rate', 'day_severity_rate', 'month_severity_rate',
+    'is_night', 'is_rush_hour',
+    'crashes_at_location', 'high_rate_at_location',
+    'high_risk_location', 'dangerous_time', 'high_risk_location_dangerous_time',
+    'actual_temperature_c', 'actual_precipitation_mm', 'actual_wind_speed_kmh',
+    'actual_humidity_percent', 'actual_pressure_hpa', 'weather_code',
+    'is_adverse_weather',
+    'likely_intersection', 'high_speed_road', 'distance_from_cbd_km',
+    'high_risk_infrastructure',
+]
+
+# One-hot levels in pd.get_dummies order (the risk category is an ordered
+# pd.cut categorical; the rest sort alphabetically)
+CATEGORY_LEVELS = {
+    'location_risk_category': ['LOW_RISK', 'MEDIUM_RISK', 'HIGH_RISK', 'VERY_HIGH_RISK'],
+    'daylight_status':        ['DARKNESS', 'DAYLIGHT'],
+    'weather_condition':      ['CLEAR', 'CLOUDY', 'FOG', 'RAIN', 'SEVERE'],
+    'road_type_proxy':        ['MAIN_ROAD', 'MAJOR_HIGHWAY', 'RESIDENTIAL', 'SECONDARY_ROAD'],
+    'geographic_zone':        ['CBD_CORE', 'INNER_SUBURBS', 'OUTER_SUBURBS', 'PERIPHERAL'],
+}
+CATEGORICAL_FEATURES = list(CATEGORY_LEVELS)
+TARGET = 'severity_binary'
+
+# Raw weather fields -> feature columns
+WEATHER_FEATURES = {
+    'temperature':   'actual_temperature_c',
+    'precipitation': 'actual_precipitation_mm',
+    'wind_speed':    'actual_wind_speed_kmh',
+    'humidity':      'actual_humidity_percent',
+    'pressure':      'actual_pressure_hpa',
+    'weather_code':  'weather_code',
+}
+
+# Open-Meteo archive variables -> raw weather fields
+ARCHIVE_VARIABLES = {
+    'temperature_2m':       'temperature',
+    'precipitation':        'precipitation',
+    'wind_speed_10m':       'wind_speed',
+    'relative_humidity_2m': 'humidity',
+    'surface_pressure':     'pressure',
+    'weather_code':         'weather_code',
+}
+
+# WMO weather code groups (Notebook 02)
+FOG_CODES    = [45, 48]
+RAIN_CODES   = [51, 53, 55, 61, 63, 65, 80, 81, 82]
+SEVERE_CODES = [71, 73, 75, 95, 96, 99]
+
+# Used when no fitted state is available (e.g. metadata from the notebooks).
+# Severity rates are percentages, as computed in Notebook 02.
+DEFAULT_STATE = {
+    'rates':         {'hour': {}, 'day': {}, 'month': {}},
+    'rate_fallback': {'hour': 11.8, 'day': 12.2, 'month': 12.0},
+    'weather_fill':  {'temperature': 20.0, 'precipitation': 0.0,
+                      'wind_speed': 10.0, 'humidity': 65.0,
+                      'pressure': 1013.0, 'weather_code': 0},
+    'location_fill': {'crashes_at_location': 3.0, 'high_rate_at_location': 0.0},
+}
+
+
+# ============================================================================
+# ELEMENTARY TRANSFORMS (arrays or scalars)
+# ============================================================================
+
+def temporal_flags(hour, day_of_week):
+    """Weekend / night / rush-hour / daylight flags from Notebook 02."""
+    hour, dow = np.asarray(hour), np.asarray(day_of_week)
+    is_weekend   = (dow >= 5).astype(int)
+    is_night     = ((hour >= 22) | (hour <= 4)).astype(int)
+    is_rush_hour = (((hour >= 6) & (hour <= 9)) |
+                    ((hour >= 17) & (hour <= 19))).astype(int)
+    return {
+        'is_weekend':     is_weekend,
+        'is_night':       is_night,
+        'is_rush_hour':   is_rush_hour,
+        'dangerous_time': is_night | is_weekend,
+        'daylight':       np.where((hour >= 7) & (hour <= 18), 'DAYLIGHT', 'DARKNESS'),
+    }
+
+
+def cbd_distance_km(lat, lon):
+    """Haversine distance (km) from the Nairobi CBD."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    clat, clon = np.radians(CBD_LAT), np.radians(CBD_LON)
+    a = (np.sin((lat - clat) / 2) ** 2 +
+         np.cos(clat) * np.cos(lat) * np.sin((lon - clon) / 2) ** 2)
+    return 6371.0 * 2 * np.arcsin(np.sqrt(a))
+
+
+def geographic_zone(dist_km):
+    dist_km = np.asarray(dist_km)
+    return np.select([dist_km < 5, dist_km < 15, dist_km < 30],
+                     ['CBD_CORE', 'INNER_SUBURBS', 'OUTER_SUBURBS'], 'PERIPHERAL')
+
+
+def weather_condition(code):
+    """Simplified condition from a WMO weather code."""
+    code = np.asarray(code, dtype=float)
+    return np.select([code <= 3, np.isin(code, FOG_CODES),
+                      np.isin(code, RAIN_CODES), np.isin(code, SEVERE_CODES)],
+                     ['CLEAR', 'FOG', 'RAIN', 'SEVERE'], 'CLOUDY')
+
+
+def history_context(crashes_at_location, high_rate_at_location):
+    """Road type, intersection flag and risk category from crash history."""
+    crashes = np.asarray(crashes_at_location, dtype=float)
+    rate    = np.asarray(high_rate_at_location, dtype=float)
+    return {
+        'road_type': np.select(
+            [crashes >= 200, crashes >= 100, crashes >= 20],
+            ['MAJOR_HIGHWAY', 'MAIN_ROAD', 'SECONDARY_ROAD'], 'RESIDENTIAL'),
+        'likely_intersection': (crashes > 50).astype(int),
+        'location_risk_category': np.select(
+            [rate <= 10, rate <= 15, rate <= 20],
+            ['LOW_RISK', 'MEDIUM_RISK', 'HIGH_RISK'], 'VERY_HIGH_RISK'),
+    }
+
+
+def feature_names_for(observed=None):
+    """
+    Training column order: numeric features, then one-hot columns.
+    observed maps each categorical feature to the levels seen in training;
+    like pd.get_dummies, unseen levels get no column.
+    """
+    names = list(NUMERIC_FEATURES)
+    for cat, levels in CATEGORY_LEVELS.items():
+        seen = observed.get(cat, levels) if observed else levels
+        names += [f"{cat}_{lvl}" for lvl in levels if lvl in seen]
+    return names
+
+
+# ============================================================================
+# RECORD -> FEATURE TRANSFORM
+# ============================================================================
+
+def _column(records, name, fill):
+    """Column as an array with missing values (or a missing column) filled."""
+    if name not in records.columns:
+        return np.full(len(records), fill)
+    return records[name].fillna(fill).to_numpy()
+
+
+def categorical_columns(records, state=None):
+    """The five categorical features for a chunk of raw records."""
+    state = state or DEFAULT_STATE
+    dt    = pd.to_datetime(records['datetime'])
+    hour  = dt.dt.hour.to_numpy()
+    dist  = cbd_distance_km(records['latitude'].to_numpy(dtype=float),
+                            records['longitude'].to_numpy(dtype=float))
+    ctx   = history_context(
+        _column(records, 'crashes_at_location', state['location_fill']['crashes_at_location']),
+        _column(records, 'high_rate_at_location', state['location_fill']['high_rate_at_location']))
+
+    code = _column(records, 'weather_code', state['weather_fill']['weather_code'])
+    return {
+        'location_risk_category': ctx['location_risk_category'].astype(str),
+        'daylight_status':        temporal_flags(hour, 0)['daylight'],
+        'weather_condition':      weather_condition(code),
+        'road_type_proxy':        ctx['road_type'].astype(str),
+        'geographic_zone':        geographic_zone(dist),
+    }, ctx, dist
+
+
+def transform(records, state=None, feature_names=None):
+    """
+    Feature matrix for a DataFrame of raw records.
+
+    state comes from fit_state() (stored in feature_metadata.pkl); without
+    it DEFAULT_STATE supplies the rate and weather fallbacks. Columns follow
+    feature_names (missing ones are zero), defaulting to the state's names.
+    """
+    state = state or DEFAULT_STATE
+    n     = len(records)
+    dt    = pd.to_datetime(records['datetime'])
+    hour  = dt.dt.hour.to_numpy()
+    dow   = dt.dt.dayofweek.to_numpy()
+    month = dt.dt.month.to_numpy()
+    flags = temporal_flags(hour, dow)
+
+    cats, ctx, dist = categorical_columns(records, state)
+
+    def rate(kind, keys):
+        table = state['rates'].get(kind, {})
+        return pd.Series(keys).map(table).fillna(state['rate_fallback'][kind]).to_numpy()
+
+    high_rate = _column(records, 'high_rate_at_location',
+                        state['location_fill']['high_rate_at_location'])
+    risk      = cats['location_risk_category']
+    road      = cats['road_type_proxy']
+    intersect = ctx['likely_intersection'].astype(int)
+
+    # High-risk location == rate > 15 in training == HIGH / VERY_HIGH category
+    high_risk_location = np.isin(risk, ['HIGH_RISK', 'VERY_HIGH_RISK']).astype(int)
+    high_speed_road    = np.isin(road, ['MAJOR_HIGHWAY', 'MAIN_ROAD']).astype(int)
+
+    raw = {
+        'latitude':                 records['latitude'].to_numpy(dtype=float),
+        'longitude':                records['longitude'].to_numpy(dtype=float),
+        'hour':                     hour,
+        'day_of_week':              dow,
+        'month':                    month,
+        'year':                     dt.dt.year.to_numpy(),
+        'is_weekend':               flags['is_weekend'],
+        'hour_severity_rate':       rate('hour', hour),
+        'day_severity_rate':        rate('day', dow),
+        'month_severity_rate':      rate('month', month),
+        'is_night':                 flags['is_night'],
+        'is_rush_hour':             flags['is_rush_hour'],
+        'crashes_at_location':      _column(records, 'crashes_at_location',
+                                            state['location_fill']['crashes_at_location']),
+        'high_rate_at_location':    high_rate,
+        'high_risk_location':       high_risk_location,
+        'dangerous_time':           flags['dangerous_time'],
+        'high_risk_location_dangerous_time': high_risk_location * flags['dangerous_time'],
+        'is_adverse_weather':       np.isin(cats['weather_condition'],
+                                            ['RAIN', 'FOG', 'SEVERE']).astype(int),
+        'likely_intersection':      intersect,
+        'high_speed_road':          high_speed_road,
+        'distance_from_cbd_km':     dist,
+        'high_risk_infrastructure': intersect & high_speed_road,
+    }
+    for key, col in WEATHER_FEATURES.items():
+        raw[col] = _column(records, key, state['weather_fill'][key])
+    for cat, levels in CATEGORY_LEVELS.items():
+        for lvl in levels:
+            raw[f"{cat}_{lvl}"] = (cats[cat] == lvl).astype(int)
+
+    names = feature_names or state.get('feature_names') or feature_names_for()
+    df = pd.DataFrame(raw, index=records.index).astype(float)
+    return df.reindex(columns=names, fill_value=0.0)
+
+
+# ============================================================================
+# STREAMING RAW RECORDS
+# ============================================================================
+
+def load_weather_archive(path):
+    """
+    Hourly archive weather saved by Notebook 02 (weather_data_raw.pkl) as a
+    table keyed by (date, hour) with the raw weather fields.
+    """
+    import pickle
+
+    with open(path, 'rb') as f:
+        results = pickle.load(f)
+
+    frames = []
+    for item in results:
+        hourly = item['weather_data'].get('hourly', {})
+        n      = len(hourly.get('time', []))
+        if not n:
+            continue
+        frame = pd.DataFrame({key: hourly.get(var, [np.nan] * n)
+                              for var, key in ARCHIVE_VARIABLES.items()})
+        frame['date'] = pd.Timestamp(item['crash_date_only'])
+        frame['hour'] = np.arange(n)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_crash_chunks(crashes_path, weather=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the labeled crash CSV as raw-record chunks.
+    weather (from load_weather_archive) is joined on crash date and hour;
+    without it the CSV's own actual_* columns are used.
+    """
+    for chunk in pd.read_csv(crashes_path, chunksize=chunk_size):
+        chunk = chunk.rename(columns={'crash_datetime': 'datetime'})
+        chunk['datetime'] = pd.to_datetime(chunk['datetime'])
+        if weather is not None:
+            keys  = pd.DataFrame({'date': chunk['datetime'].dt.normalize(),
+                                  'hour': chunk['datetime'].dt.hour},
+                                 index=chunk.index)
+            joined = keys.merge(weather, on=['date', 'hour'], how='left')
+            for key in WEATHER_FEATURES:
+                chunk[key] = joined[key].to_numpy()
+        else:
+            chunk = chunk.rename(columns={col: key for key, col in WEATHER_FEATURES.items()})
+        yield chunk
+
+
+def _median_from_counts(counts):
+    """Exact median of a value -> count table (pandas median semantics)."""
+    if counts.empty:
+        return np.nan
+    counts = counts.sort_index()
+    cum    = counts.cumsum().to_numpy()
+    total  = cum[-1]
+    lo     = counts.index[np.searchsorted(cum, (total - 1) // 2 + 1)]
+    hi     = counts.index[np.searchsorted(cum, total // 2 + 1)]
+    return (lo + hi) / 2
+
+
+def fit_state(chunks):
+    """
+    First streaming pass: the training-set statistics transform() needs.
+
+    Accumulates per-hour / weekday / month HIGH counts, weather value
+    counts (for exact median / mode fills) and the categorical levels
+    observed, holding only these tallies in memory.
+    """
+    tallies = {'hour': [], 'day': [], 'month': []}
+    weather_counts = {key: pd.Series(dtype=float) for key in WEATHER_FEATURES}
+    observed = {cat: set() for cat in CATEGORY_LEVELS}
+    n_rows = 0
+
+    for chunk in chunks:
+        n_rows += len(chunk)
+        dt      = pd.to_datetime(chunk['datetime'])
+        is_high = chunk[TARGET].eq('HIGH').astype(int)
+        for kind, keys in [('hour', dt.dt.hour), ('day', dt.dt.dayofweek),
+                           ('month', dt.dt.month)]:
+            tallies[kind].append(is_high.groupby(keys.to_numpy()).agg(['sum', 'count']))
+        for key in WEATHER_FEATURES:
+            weather_counts[key] = weather_counts[key].add(
+                chunk[key].value_counts(), fill_value=0)
+        # Category levels depend only on the (unfilled) history and weather
+        # inputs; missing weather codes become the training mode later
+        cats, _, _ = categorical_columns(chunk.dropna(subset=['weather_code']))
+        for cat, values in cats.items():
+            observed[cat].update(np.unique(values))
+
+    rates = {}
+    for kind, parts in tallies.items():
+        total = pd.concat(parts).groupby(level=0).sum()
+        rates[kind] = (total['sum'] / total['count'] * 100).to_dict()
+
+    weather_fill = {key: float(_median_from_counts(counts))
+                    for key, counts in weather_counts.items()}
+    weather_fill['precipitation'] = 0.0           # no rain assumed if missing
+    weather_fill['weather_code']  = float(weather_counts['weather_code'].sort_index().idxmax())
+
+    return {
+        'rates':         rates,
+        'rate_fallback': {kind: float(np.median(list(r.values())))
+                          for kind, r in rates.items()},
+        'weather_fill':  weather_fill,
+        'location_fill': dict(DEFAULT_STATE['location_fill']),
+        'feature_names': feature_names_for(observed),
+        'n_rows':        n_rows,
+    }
+
+
+# ============================================================================
+# COLUMNAR STORE
+# ============================================================================
+
+def materialize(chunks, out_path, state):
+    """
+    Second streaming pass: featurise each chunk and append it to a Parquet
+    store (features + integer label). Returns the number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = out_path + '.partial'
+    writer, n_rows = None, 0
+    try:
+        for chunk in chunks:
+            X = transform(chunk, state)
+            X[TARGET] = chunk[TARGET].eq('HIGH').astype(np.int8).to_numpy()
+            table = pa.Table.from_pandas(X, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+            writer.write_table(table)
+            n_rows += len(X)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, out_path)
+    return n_rows
+
+
+def load_store(path, columns=None):
+    """Feature matrix and labels from a materialised store."""
+    import pyarrow.parquet as pq
+
+    df = pq.read_table(path, columns=None if columns is None
+                       else list(columns) + [TARGET]).to_pandas()
+    return df.drop(columns=TARGET), df[TARGET].to_numpy()
+
+
+def materialize_crashes(crashes_path, out_path, weather_path=None,
+                        chunk_size=CHUNK_SIZE):
+    """
+    Featurise a labeled crash CSV into a Parquet store in two bounded-memory
+    passes. Returns the fitted state (save it with the feature metadata).
+    """
+    weather = (load_weather_archive(weather_path)
+               if weather_path and os.path.exists(weather_path) else None)
+    state = fit_state(read_crash_chunks(crashes_path, weather, chunk_size))
+    materialize(read_crash_chunks(crashes_path, weather, chunk_size), out_path, state)
+    return state
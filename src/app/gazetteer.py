@@ -0,0 +1,303 @@
+"""
+Offline Place Gazetteer — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+Callers describe locations ("Thika Road near Roysambu", "Ngong Rd by
+Prestige"), not GPS coordinates. This module resolves such descriptions to
+coordinates from a bundled list of Nairobi estates, landmarks and road
+alignments — no network access required.
+
+Lookups use two in-memory indexes built once at load time:
+  - a token prefix index for as-you-type autocomplete
+  - a character-trigram index for misspellings ("Rosambu", "Kilelshwa")
+
+Coordinates are approximate centroids / road alignments, all inside
+NAIROBI_BOUNDS, and are meant to seed the latitude/longitude inputs — the
+dispatcher can still refine them.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from collections import Counter
+
+from config import GAZETTEER_PATH, NAIROBI_BOUNDS
+
+
+# Longest prefix stored per token; longer queries are filtered after lookup
+MAX_PREFIX_LEN = 12
+
+# Minimum Dice similarity for a trigram (fuzzy) match to be accepted
+MIN_FUZZY_SCORE = 0.45
+
+# A landmark snapped onto a named road further than this keeps its own point
+ROAD_SNAP_MAX_KM = 2.0
+
+# Phrases callers use to relate two places: "<road> near <landmark>"
+CONNECTORS = r'\s+(?:near|by|at|opposite|opp|next to|off|along|outside|before|after)\s+|,'
+
+ABBREVIATIONS = {
+    'rd': 'road', 'ave': 'avenue', 'av': 'avenue', 'st': 'street',
+    'hwy': 'highway', 'rbt': 'roundabout', 'r/about': 'roundabout',
+    'hosp': 'hospital', 'univ': 'university', 'mkt': 'market',
+    'stn': 'station', 'stage': '',
+}
+
+# Ranking order when several places share a prefix
+KIND_RANK = {'landmark': 0, 'estate': 1, 'road': 2}
+
+
+# ============================================================================
+# TEXT NORMALISATION
+# ============================================================================
+
+def normalise(text):
+    """Lower-case, strip punctuation/apostrophes and expand abbreviations."""
+    text = text.lower().replace("'", '').replace('’', '')
+    text = re.sub(r'[^a-z0-9/ ]+', ' ', text)
+    tokens = [ABBREVIATIONS.get(t, t) for t in text.split()]
+    return ' '.join(t for t in tokens if t)
+
+
+def trigrams(text):
+    """Padded character trigrams of a normalised string."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def split_description(text):
+    """Split a caller description on connector phrases ('near', 'by', ',')."""
+    return [p.strip() for p in re.split(CONNECTORS, text, flags=re.I) if p.strip()]
+
+
+# ============================================================================
+# GAZETTEER
+# ============================================================================
+
+class Gazetteer:
+    """
+    Place lookup over the bundled gazetteer.
+
+    Each place is a dict with name, kind (estate / landmark / road),
+    latitude and longitude; roads also carry their alignment as a
+    (n, 2) array of lat/lon vertices under 'path'.
+    """
+
+    def __init__(self, places):
+        self.places = places
+
+        # Every name and alias is a searchable key pointing back at a place
+        self._keys       = []          # (normalised key, place index)
+        self._prefix_idx = {}          # token prefix -> set of key ids
+        self._tri_idx    = {}          # trigram      -> list of key ids
+        self._tri_count  = []          # key id -> number of trigrams
+        self._exact      = {}          # normalised key -> place index
+
+        for p_idx, place in enumerate(places):
+            for label in [place['name']] + place['aliases']:
+                key = normalise(label)
+                if not key or key in self._exact:
+                    continue
+                k_id = len(self._keys)
+                self._keys.append((key, p_idx))
+                self._exact[key] = p_idx
+                for token in key.split():
+                    for n in range(1, min(len(token), MAX_PREFIX_LEN) + 1):
+                        self._prefix_idx.setdefault(token[:n], set()).add(k_id)
+                key_tri = trigrams(key)
+                self._tri_count.append(len(key_tri))
+                for tri in key_tri:
+                    self._tri_idx.setdefault(tri, []).append(k_id)
+
+    # ------------------------------------------------------------------------
+    # SINGLE-PHRASE LOOKUPS
+    # ------------------------------------------------------------------------
+
+    def _prefix_keys(self, query):
+        """Key ids whose tokens start with every query token."""
+        tokens = query.split()
+        hits   = None
+        for tok in tokens:
+            ids  = self._prefix_idx.get(tok[:MAX_PREFIX_LEN], set())
+            hits = ids if hits is None else hits & ids
+            if not hits:
+                return []
+        # Tokens longer than the stored prefix need a final check
+        long_toks = [t for t in tokens if len(t) > MAX_PREFIX_LEN]
+        return [k for k in hits
+                if all(any(kt.startswith(t) for kt in self._keys[k][0].split())
+                       for t in long_toks)]
+
+    def _fuzzy_keys(self, query, limit):
+        """Key ids ranked by trigram Dice similarity to the query."""
+        q_tri  = trigrams(query)
+        shared = Counter()
+        for tri in q_tri:
+            shared.update(self._tri_idx.get(tri, ()))
+        scored = []
+        for k_id, n_shared in shared.items():
+            score = 2 * n_shared / (len(q_tri) + self._tri_count[k_id])
+            if score >= MIN_FUZZY_SCORE:
+                scored.append((score, k_id))
+        scored.sort(reverse=True)
+        return [k_id for _, k_id in scored[:limit]]
+
+    def _rank(self, key_ids, query):
+        """Order matches: whole-key prefix first, then kind, then shorter names."""
+        def sort_key(k_id):
+            key, p_idx = self._keys[k_id]
+            return (not key.startswith(query),
+                    KIND_RANK.get(self.places[p_idx]['kind'], 3),
+                    len(key))
+        seen, out = set(), []
+        for k_id in sorted(key_ids, key=sort_key):
+            p_idx = self._keys[k_id][1]
+            if p_idx not in seen:
+                seen.add(p_idx)
+                out.append(p_idx)
+        return out
+
+    def match(self, phrase):
+        """Best single place for one phrase, or None."""
+        query = normalise(phrase)
+        if not query:
+            return None
+        if query in self._exact:
+            return self.places[self._exact[query]]
+        ranked = self._rank(self._prefix_keys(query), query)
+        if not ranked:
+            fuzzy = self._fuzzy_keys(query, limit=1)
+            ranked = [self._keys[k][1] for k in fuzzy]
+        return self.places[ranked[0]] if ranked else None
+
+    # ------------------------------------------------------------------------
+    # AUTOCOMPLETE
+    # ------------------------------------------------------------------------
+
+    def autocomplete(self, text, limit=8):
+        """
+        Suggestions for a partially typed description.
+
+        Only the phrase after the last connector is completed, so
+        "Thika Road near Roy" suggests "Thika Road near Roysambu".
+        Falls back to fuzzy matching when no prefix matches.
+        """
+        parts = re.split(CONNECTORS, text, flags=re.I)
+        tail  = parts[-1]
+        # Keep the typed head with one space after its connector,
+        # whether that is a phrase ("near") or a comma
+        head  = re.sub(r'\s*,$', ',', text[:len(text) - len(tail)].rstrip())
+        head  = f"{head} " if head else ''
+        query = normalise(tail)
+        if not query:
+            return []
+
+        ranked = self._rank(self._prefix_keys(query), query)[:limit]
+        if not ranked:
+            ranked = self._rank(self._fuzzy_keys(query, limit), query)[:limit]
+
+        return [{'label':     f"{head}{self.places[i]['name']}",
+                 'name':      self.places[i]['name'],
+                 'kind':      self.places[i]['kind'],
+                 'latitude':  self.places[i]['latitude'],
+                 'longitude': self.places[i]['longitude']}
+                for i in ranked]
+
+    # ------------------------------------------------------------------------
+    # FULL DESCRIPTION RESOLUTION
+    # ------------------------------------------------------------------------
+
+    def resolve(self, description):
+        """
+        Coordinates for a caller description, or None if nothing matches.
+
+        "<road> near <place>" resolves to the point on the road closest to
+        the place; otherwise the first recognised place is used. The result
+        carries 'latitude' / 'longitude' ready for prepare_features.
+        """
+        matches = [m for m in (self.match(p) for p in split_description(description)) if m]
+        if not matches:
+            return None
+
+        roads  = [m for m in matches if m['kind'] == 'road']
+        points = [m for m in matches if m['kind'] != 'road']
+
+        if roads and points:
+            lat, lon, dist_km = snap_to_path(points[0]['latitude'],
+                                             points[0]['longitude'],
+                                             roads[0]['path'])
+            if dist_km <= ROAD_SNAP_MAX_KM:
+                name = f"{roads[0]['name']} near {points[0]['name']}"
+            else:
+                lat, lon = points[0]['latitude'], points[0]['longitude']
+                name = points[0]['name']
+        else:
+            best = points[0] if points else roads[0]
+            lat, lon, name = best['latitude'], best['longitude'], best['name']
+
+        return {'query':     description,
+                'name':      name,
+                'latitude':  float(lat),
+                'longitude': float(lon),
+                'matched':   [m['name'] for m in matches]}
+
+
+# ============================================================================
+# GEOMETRY
+# ============================================================================
+
+def snap_to_path(lat, lon, path):
+    """
+    Closest point to (lat, lon) on a polyline of lat/lon vertices.
+    Uses a local equirectangular projection — accurate to metres at
+    city scale. Returns (lat, lon, distance_km).
+    """
+    km_lat = 110.574
+    km_lon = 111.320 * np.cos(np.radians(lat))
+    xy     = np.column_stack([(path[:, 1] - lon) * km_lon,
+                              (path[:, 0] - lat) * km_lat])
+    if len(xy) == 1:
+        return path[0, 0], path[0, 1], float(np.hypot(*xy[0]))
+
+    a, b  = xy[:-1], xy[1:]
+    ab    = b - a
+    t     = np.clip(-(a * ab).sum(axis=1) / np.maximum((ab * ab).sum(axis=1), 1e-12), 0, 1)
+    proj  = a + ab * t[:, None]
+    dist  = np.hypot(proj[:, 0], proj[:, 1])
+    i     = int(dist.argmin())
+    return (lat + proj[i, 1] / km_lat,
+            lon + proj[i, 0] / km_lon,
+            float(dist[i]))
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def load_gazetteer(path=GAZETTEER_PATH, bounds=NAIROBI_BOUNDS):
+    """
+    Build a Gazetteer from the bundled CSV.
+    Road rows are vertices ordered by 'seq' and are merged into one place
+    per road. Rows outside the study area are rejected.
+    """
+    df = pd.read_csv(path, dtype={'aliases': str}).fillna({'aliases': ''})
+
+    outside = df[~df['lat'].between(bounds['lat_min'], bounds['lat_max']) |
+                 ~df['lon'].between(bounds['lon_min'], bounds['lon_max'])]
+    if len(outside):
+        raise ValueError(
+            f"Gazetteer entries outside NAIROBI_BOUNDS: {outside['name'].tolist()}")
+
+    places = []
+    for (name, kind), grp in df.groupby(['name', 'kind'], sort=False):
+        grp     = grp.sort_values('seq')
+        aliases = [a for s in grp['aliases'] for a in s.split('|') if a]
+        path    = grp[['lat', 'lon']].to_numpy(dtype=float)
+        mid     = path[len(path) // 2]
+        place   = {'name': name, 'kind': kind, 'aliases': aliases,
+                   'latitude': float(mid[0]), 'longitude': float(mid[1])}
+        if kind == 'road':
+            place['path'] = path
+        places.append(place)
+
+    return Gazetteer(places)
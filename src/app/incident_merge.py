@@ -0,0 +1,189 @@
+"""
+Multi-Caller Incident Merging — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+Several people usually report the same crash (Ma3Route's n_crash_reports).
+Scoring every report separately repeats the weather fetch and the full
+ensemble for one event. This module groups reports that fall within
+MERGE_RADIUS_M and MERGE_WINDOW_MIN of an open incident, so each incident is
+scored once and the result fanned back out to all of its reports.
+
+IncidentIndex buckets open incidents by (lat cell, lon cell, time slot),
+with cells one radius wide and slots one window long. A new report only
+probes the 27 neighbouring buckets, so matching is O(1) per report
+regardless of how many incidents are open.
+
+The report count is exposed alongside the score as a dispatcher signal. It
+is not a model input: Notebook 02 drops n_crash_reports as leakage because
+it is unknown when the first call comes in.
+"""
+
+import math
+import itertools
+import numpy as np
+from datetime import timedelta
+
+from config import MERGE_RADIUS_M, MERGE_WINDOW_MIN, DEFAULT_LOCATION
+
+
+M_PER_DEG_LAT = 111_320
+
+# Offsets of the buckets probed around a report: 3 x 3 cells x 3 slots
+NEIGHBOURS = list(itertools.product((-1, 0, 1), repeat=3))
+
+
+class IncidentIndex:
+    """
+    Grid-cell + time-window index of open incidents.
+
+    Each incident is stored under the cell of its report centroid and the
+    slot of its latest report, so a report within the radius and window is
+    always found in a neighbouring bucket. Reports are expected in roughly
+    time order; one arriving long after its incident went quiet starts a
+    new incident.
+    """
+
+    def __init__(self, radius_m=MERGE_RADIUS_M, window_min=MERGE_WINDOW_MIN,
+                 ref_lat=DEFAULT_LOCATION['lat']):
+        self.radius_m = radius_m
+        self.window   = timedelta(minutes=window_min)
+        self.m_per_deg_lon = M_PER_DEG_LAT * math.cos(math.radians(ref_lat))
+        self.cell_lat = radius_m / M_PER_DEG_LAT
+        self.cell_lon = radius_m / self.m_per_deg_lon
+
+        self._buckets = {}          # (row, col, slot) -> set of incident ids
+        self._entries = {}          # incident id -> centroid, time span, count
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, incident_id):
+        return incident_id in self._entries
+
+    def _key(self, lat, lon, dt):
+        return (math.floor(lat / self.cell_lat),
+                math.floor(lon / self.cell_lon),
+                math.floor(dt.timestamp() / self.window.total_seconds()))
+
+    def _distance_m(self, lat, lon, entry):
+        return math.hypot((lat - entry['latitude']) * M_PER_DEG_LAT,
+                          (lon - entry['longitude']) * self.m_per_deg_lon)
+
+    def match(self, lat, lon, dt):
+        """Id of the closest open incident this report belongs to, or None."""
+        row, col, slot = self._key(lat, lon, dt)
+        best, best_m = None, self.radius_m
+        for dr, dc, ds in NEIGHBOURS:
+            for incident_id in self._buckets.get((row + dr, col + dc, slot + ds), ()):
+                entry = self._entries[incident_id]
+                if not (entry['first_seen'] - self.window <= dt
+                        <= entry['last_seen'] + self.window):
+                    continue
+                dist = self._distance_m(lat, lon, entry)
+                if dist <= best_m:
+                    best, best_m = incident_id, dist
+        return best
+
+    def add(self, incident_id, lat, lon, dt):
+        """
+        Register a report under incident_id (new or existing), updating the
+        incident's centroid and time span. Returns its report count.
+        """
+        entry = self._entries.get(incident_id)
+        if entry is None:
+            entry = {'latitude': lat, 'longitude': lon, 'first_seen': dt,
+                     'last_seen': dt, 'n_reports': 0}
+            self._entries[incident_id] = entry
+        else:
+            self._unlink(incident_id)
+
+        n = entry['n_reports'] = entry['n_reports'] + 1
+        entry['latitude']  += (lat - entry['latitude']) / n
+        entry['longitude'] += (lon - entry['longitude']) / n
+        entry['first_seen'] = min(entry['first_seen'], dt)
+        entry['last_seen']  = max(entry['last_seen'], dt)
+        entry['key'] = self._key(entry['latitude'], entry['longitude'],
+                                 entry['last_seen'])
+        self._buckets.setdefault(entry['key'], set()).add(incident_id)
+        return n
+
+    def _unlink(self, incident_id):
+        key    = self._entries[incident_id]['key']
+        bucket = self._buckets[key]
+        bucket.discard(incident_id)
+        if not bucket:
+            del self._buckets[key]
+
+    def remove(self, incident_id):
+        """Drop a closed incident; later reports near it start a new one."""
+        if incident_id in self._entries:
+            self._unlink(incident_id)
+            del self._entries[incident_id]
+
+    def expire(self, now):
+        """
+        Drop incidents whose window has passed (no later report can merge
+        into them). Returns the expired ids.
+        """
+        stale = [i for i, e in self._entries.items()
+                 if e['last_seen'] + self.window < now]
+        for incident_id in stale:
+            self.remove(incident_id)
+        return stale
+
+    def n_reports(self, incident_id):
+        return self._entries[incident_id]['n_reports']
+
+
+# ============================================================================
+# BATCH MERGE + FAN-OUT
+# ============================================================================
+
+def merge_reports(reports, radius_m=MERGE_RADIUS_M, window_min=MERGE_WINDOW_MIN):
+    """
+    Group a DataFrame of reports (latitude, longitude, datetime, plus any
+    other columns) into incidents.
+
+    Returns (reports with an incident_id column, incidents). Each incident
+    sits at its reports' centroid with the earliest report time, takes the
+    first report's other columns (e.g. weather), and carries n_reports.
+    """
+    reports = reports.sort_values('datetime', kind='stable')
+    index   = IncidentIndex(radius_m, window_min)
+    new_ids = itertools.count(1)
+
+    incident_ids = np.empty(len(reports), dtype=int)
+    for i, (lat, lon, dt) in enumerate(zip(reports['latitude'],
+                                           reports['longitude'],
+                                           reports['datetime'])):
+        incident_id = index.match(lat, lon, dt)
+        if incident_id is None:
+            incident_id = next(new_ids)
+        index.add(incident_id, lat, lon, dt)
+        incident_ids[i] = incident_id
+
+    reports = reports.assign(incident_id=incident_ids)
+    groups  = reports.groupby('incident_id', sort=True)
+    incidents = groups.first().assign(
+        latitude=groups['latitude'].mean(),
+        longitude=groups['longitude'].mean(),
+        datetime=groups['datetime'].min(),
+        n_reports=groups.size(),
+    )
+    return reports.sort_index(), incidents
+
+
+def score_reports(reports, score_incidents, radius_m=MERGE_RADIUS_M,
+                  window_min=MERGE_WINDOW_MIN):
+    """
+    Merge reports into incidents, score each incident once and fan the
+    result back out to every linked report.
+
+    score_incidents(incidents) receives the merged incidents and returns a
+    DataFrame of results with the same index (e.g. a wrapper around
+    prepare_features_batch + ensemble_predict_batch).
+    """
+    reports, incidents = merge_reports(reports, radius_m, window_min)
+    scores = score_incidents(incidents)
+    scores = scores.set_axis(incidents.index).assign(n_reports=incidents['n_reports'])
+    return reports.join(scores, on='incident_id')
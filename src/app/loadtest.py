@@ -0,0 +1,492 @@
+"""
+Load Test Harness — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+How does the prediction path behave with 50 concurrent dispatchers, or when
+Open-Meteo is slow or down? This harness answers that offline:
+
+  IncidentGenerator   synthetic incidents — locations clustered along the
+                      gazetteer's road corridors and estates inside
+                      NAIROBI_BOUNDS, report times following a diurnal mix
+  FakeOpenMeteo       local HTTP stand-in for the forecast API with
+                      configurable latency, error rate and outage windows
+  run_load            ramps concurrent dispatchers through the real
+                      weather -> features -> ensemble path and reports
+                      throughput, tail latency and fallback-to-default rate
+
+With --scheduler the dispatchers submit through the AdmissionScheduler
+instead (mixed priorities), and each stage also reports the share of
+responses per degraded mode and the deadline hit rate.
+
+With --shadows the ramp runs twice through a ModelRegistry, once with
+production alone and once with the shadow bundles attached, and reports
+p50/p95 of the response path side by side. Weather is left at defaults so
+only the model path is timed.
+
+Usage:
+    python src/app/loadtest.py --levels 1,5,10,25,50 --stage-seconds 20 \\
+        --latency-ms 300 --error-rate 0.05 --outage 30:45 [--scheduler]
+    python src/app/loadtest.py --shadows [--shadow-dir models/retrained]
+"""
+
+import json, time, random, argparse, threading
+from functools import partial
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from config import (NAIROBI_BOUNDS, RF_MODEL_PATH, XGB_MODEL_PATH,
+                    LGBM_MODEL_PATH, CONFIG_PATH, METADATA_PATH,
+                    ENSEMBLE_WEIGHTS, ENSEMBLE_THRESHOLD, SHADOW_MODEL_DIRS)
+from admission import AdmissionScheduler, MODES
+from model_registry import ModelBundle, ModelRegistry, incident_key, is_exported
+from risk_lookup import load_risk_lookup
+from gazetteer import load_gazetteer
+from utils import (load_ensemble_models, load_feature_state, get_weather_data,
+                   default_weather, prepare_features, incident_frame,
+                   ensemble_predict, WEATHER_TIMEOUT_S)
+
+
+# Relative report volume by hour of day: morning and evening rush peaks,
+# quiet small hours
+HOURLY_WEIGHTS = np.array([1.6, 1.2, 1.0, 0.9, 1.0, 1.8, 3.6, 5.8, 6.4, 5.2,
+                           4.4, 4.2, 4.4, 4.3, 4.3, 4.6, 5.4, 6.6, 6.9, 5.9,
+                           4.6, 3.6, 2.8, 2.1])
+
+# Where synthetic incidents happen: on a road corridor, around an estate
+# or landmark, or anywhere in the study area
+LOCATION_MIX = {'road': 0.6, 'place': 0.3, 'uniform': 0.1}
+
+# Positional scatter (degrees; ~100 m on roads, ~400 m around places)
+ROAD_JITTER  = 0.0009
+PLACE_JITTER = 0.0036
+
+# Share of dispatcher requests per scheduler priority
+PRIORITY_MIX = {'critical': 0.2, 'urgent': 0.5, 'routine': 0.3}
+
+
+# ============================================================================
+# SYNTHETIC INCIDENTS
+# ============================================================================
+
+class IncidentGenerator:
+    """
+    Random incidents with a realistic spatial and diurnal distribution.
+    Road corridors are sampled proportionally to their length.
+    """
+
+    def __init__(self, gazetteer=None, bounds=NAIROBI_BOUNDS, seed=0,
+                 start=None, days=28):
+        gazetteer   = gazetteer or load_gazetteer()
+        self.bounds = bounds
+        self.rng    = np.random.default_rng(seed)
+        self.start  = start or datetime.now().replace(hour=0, minute=0, second=0,
+                                                      microsecond=0)
+        self.days   = days
+
+        segments = [np.stack([p['path'][:-1], p['path'][1:]], axis=1)
+                    for p in gazetteer.places if p['kind'] == 'road' and len(p['path']) > 1]
+        self.segments = np.concatenate(segments)                # (n, 2, 2) lat/lon
+        seg_len       = np.linalg.norm(self.segments[:, 1] - self.segments[:, 0], axis=1)
+        self.seg_p    = seg_len / seg_len.sum()
+        self.places   = np.array([[p['latitude'], p['longitude']]
+                                  for p in gazetteer.places if p['kind'] != 'road'])
+        self.hour_p   = HOURLY_WEIGHTS / HOURLY_WEIGHTS.sum()
+
+    def _locations(self, n):
+        b    = self.bounds
+        kind = self.rng.choice(list(LOCATION_MIX), size=n, p=list(LOCATION_MIX.values()))
+        pts  = np.empty((n, 2))
+
+        road = kind == 'road'
+        seg  = self.segments[self.rng.choice(len(self.segments), road.sum(), p=self.seg_p)]
+        t    = self.rng.random((road.sum(), 1))
+        pts[road] = (seg[:, 0] + t * (seg[:, 1] - seg[:, 0]) +
+                     self.rng.normal(0, ROAD_JITTER, (road.sum(), 2)))
+
+        place = kind == 'place'
+        pts[place] = (self.places[self.rng.integers(len(self.places), size=place.sum())] +
+                      self.rng.normal(0, PLACE_JITTER, (place.sum(), 2)))
+
+        uni = kind == 'uniform'
+        pts[uni] = np.column_stack([
+            self.rng.uniform(b['lat_min'], b['lat_max'], uni.sum()),
+            self.rng.uniform(b['lon_min'], b['lon_max'], uni.sum())])
+
+        pts[:, 0] = np.clip(pts[:, 0], b['lat_min'], b['lat_max'])
+        pts[:, 1] = np.clip(pts[:, 1], b['lon_min'], b['lon_max'])
+        return pts
+
+    def sample(self, n):
+        """DataFrame of n incidents: latitude, longitude, datetime, priority."""
+        pts   = self._locations(n)
+        day   = self.rng.integers(self.days, size=n)
+        hour  = self.rng.choice(24, size=n, p=self.hour_p)
+        mins  = self.rng.integers(60, size=n)
+        stamp = (pd.Timestamp(self.start) + pd.to_timedelta(day, unit='D') +
+                 pd.to_timedelta(hour, unit='h') + pd.to_timedelta(mins, unit='min'))
+        prio  = self.rng.choice(list(PRIORITY_MIX), size=n, p=list(PRIORITY_MIX.values()))
+        return pd.DataFrame({'latitude': pts[:, 0], 'longitude': pts[:, 1],
+                             'datetime': stamp, 'priority': prio})
+
+
+# ============================================================================
+# FAKE OPEN-METEO SERVER
+# ============================================================================
+
+class FakeOpenMeteo:
+    """
+    Local stand-in for the Open-Meteo forecast endpoint.
+
+    Every request waits latency_ms ± jitter_ms, then fails with HTTP 500
+    at error_rate. During an outage window (seconds after start(), as
+    (start, end) pairs) requests either get an immediate 503
+    (outage_mode='error') or hang past any client timeout ('hang').
+    """
+
+    HANG_SECONDS = 60
+
+    def __init__(self, latency_ms=200, jitter_ms=50, error_rate=0.0,
+                 outages=(), outage_mode='error', seed=0):
+        self.latency_ms  = latency_ms
+        self.jitter_ms   = jitter_ms
+        self.error_rate  = error_rate
+        self.outages     = list(outages)
+        self.outage_mode = outage_mode
+        self.rng         = random.Random(seed)
+        self.counts      = {'ok': 0, 'error': 0, 'outage': 0}
+        self._lock       = threading.Lock()
+        self._server     = None
+        self._started    = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1/forecast"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._started = time.monotonic()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def in_outage(self):
+        elapsed = time.monotonic() - self._started
+        return any(start <= elapsed < end for start, end in self.outages)
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def _draw(self):
+        with self._lock:
+            delay = max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            fail  = self.rng.random() < self.error_rate
+            rain  = self.rng.random() < 0.2
+        return delay, fail, rain
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass                    # client already timed out
+
+            def do_GET(self):
+                if fake.in_outage():
+                    fake._count('outage')
+                    if fake.outage_mode == 'hang':
+                        time.sleep(fake.HANG_SECONDS)
+                    return self._reply(503, {'error': True, 'reason': 'outage'})
+
+                delay, fail, rain = fake._draw()
+                time.sleep(delay)
+                if fail:
+                    fake._count('error')
+                    return self._reply(500, {'error': True, 'reason': 'injected'})
+
+                q   = parse_qs(urlparse(self.path).query)
+                lat = float(q.get('latitude', [0])[0])
+                fake._count('ok')
+                self._reply(200, {
+                    'latitude': lat,
+                    'current': {
+                        'temperature_2m':       round(19 + 4 * np.sin(lat * 50), 1),
+                        'precipitation':        2.4 if rain else 0.0,
+                        'wind_speed_10m':       11.2,
+                        'relative_humidity_2m': 78 if rain else 61,
+                        'surface_pressure':     838.5,
+                        'weather_code':         61 if rain else 2,
+                    }})
+
+        return Handler
+
+
+# ============================================================================
+# LOAD DRIVER
+# ============================================================================
+
+def score_incident(models, feature_names, feature_state, incident, base_url, timeout):
+    """
+    One dispatcher request through the synchronous production path.
+    Returns total and weather seconds and whether weather fell back to defaults.
+    """
+    start   = time.perf_counter()
+    weather = get_weather_data(incident.latitude, incident.longitude,
+                               base_url=base_url, timeout=timeout)
+    weather_s = time.perf_counter() - start
+    fallback  = weather is None
+
+    features = prepare_features(incident.latitude, incident.longitude,
+                                incident.datetime.to_pydatetime(),
+                                weather or default_weather(), feature_names,
+                                feature_state=feature_state)
+    ensemble_predict(*models, features, ENSEMBLE_WEIGHTS, ENSEMBLE_THRESHOLD)
+    return {'latency_s': time.perf_counter() - start, 'weather_s': weather_s,
+            'fallback': fallback}
+
+
+def schedule_incident(scheduler, incident, priority):
+    """One dispatcher request through the AdmissionScheduler."""
+    start  = time.perf_counter()
+    result = scheduler.predict(incident.latitude, incident.longitude,
+                               incident.datetime.to_pydatetime(), priority)
+    return {'latency_s': time.perf_counter() - start, 'weather_s': np.nan,
+            'fallback': result['weather_source'] == 'default',
+            'mode': result['mode'], 'deadline_met': result['deadline_met']}
+
+
+def registry_incident(registry, incident):
+    """
+    One request through ModelRegistry.predict with default weather, so
+    only features and the served bundle are timed (shadows run after).
+    Features use each bundle's own feature state.
+    """
+    start = time.perf_counter()
+    lat, lon = incident.latitude, incident.longitude
+    dt = incident.datetime.to_pydatetime()
+    registry.predict(incident_frame(lat, lon, dt, default_weather()),
+                     incident_key(lat, lon, dt))
+    return {'latency_s': time.perf_counter() - start, 'weather_s': np.nan,
+            'fallback': False}
+
+
+def run_stage(concurrency, seconds, work, incidents):
+    """
+    Run `concurrency` dispatcher threads for `seconds`, each scoring
+    incidents back to back. Returns one record per completed request.
+    """
+    deadline = time.monotonic() + seconds
+    records, lock = [], threading.Lock()
+    cursor = iter(range(10 ** 12))
+
+    def dispatcher():
+        while time.monotonic() < deadline:
+            with lock:
+                i = next(cursor)
+            incident = incidents.iloc[i % len(incidents)]
+            try:
+                rec = {**work(incident), 'error': False}
+            except Exception:
+                rec = {'latency_s': np.nan, 'weather_s': np.nan,
+                       'fallback': False, 'error': True}
+            rec['finished'] = time.monotonic()
+            with lock:
+                records.append(rec)
+
+    threads = [threading.Thread(target=dispatcher, daemon=True) for _ in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return pd.DataFrame(records), time.monotonic() - started
+
+
+def summarise(records, concurrency, elapsed):
+    """Throughput, tail latency and fallback rate for one ramp stage."""
+    ok  = records[~records['error']] if len(records) else records
+    lat = ok['latency_s'] * 1000 if len(ok) else pd.Series([np.nan])
+    summary = {
+        'concurrency':   concurrency,
+        'requests':      len(records),
+        'throughput_rps': len(records) / elapsed,
+        'p50_ms':        lat.quantile(0.50),
+        'p95_ms':        lat.quantile(0.95),
+        'p99_ms':        lat.quantile(0.99),
+        'max_ms':        lat.max(),
+        'weather_p95_ms': (ok['weather_s'] * 1000).quantile(0.95) if len(ok) else np.nan,
+        'fallback_rate': ok['fallback'].mean() if len(ok) else np.nan,
+        'errors':        int(records['error'].sum()) if len(records) else 0,
+    }
+    if 'mode' in ok:
+        shares = ok['mode'].value_counts(normalize=True)
+        summary.update({f'mode_{m}': shares.get(m, 0.0) for m in MODES})
+        summary['deadline_met'] = ok['deadline_met'].mean()
+    return summary
+
+
+def run_load(models, feature_names, base_url, levels, stage_seconds,
+             feature_state=None, timeout=WEATHER_TIMEOUT_S, n_incidents=5000, seed=0,
+             scheduler=None, registry=None):
+    """
+    Ramp through concurrency levels; returns a per-stage summary DataFrame.
+    With a started scheduler (or a registry), requests go through it instead.
+    """
+    incidents = IncidentGenerator(seed=seed).sample(n_incidents)
+
+    def work(incident):
+        if scheduler is not None:
+            return schedule_incident(scheduler, incident, incident.priority)
+        if registry is not None:
+            return registry_incident(registry, incident)
+        return score_incident(models, feature_names, feature_state,
+                              incident, base_url, timeout)
+
+    rows = []
+    for level in levels:
+        records, elapsed = run_stage(level, stage_seconds, work, incidents)
+        rows.append(summarise(records, level, elapsed))
+        print(f"  {level:>4} dispatchers: {rows[-1]['throughput_rps']:7.1f} req/s  "
+              f"p95 {rows[-1]['p95_ms']:8.0f} ms  "
+              f"fallback {rows[-1]['fallback_rate']:.1%}")
+    return pd.DataFrame(rows)
+
+
+def run_shadow_comparison(models, feature_names, levels, stage_seconds, shadows,
+                          feature_state=None, n_incidents=5000, seed=0):
+    """
+    Same ramp through a production-only registry and through one with the
+    shadow bundles attached. Returns (p50 / p95 per level for both, the
+    shadow registry's compared / dropped counts).
+    """
+    production = ModelBundle('production', 'production', models, feature_names,
+                             ENSEMBLE_WEIGHTS, ENSEMBLE_THRESHOLD, feature_state)
+    stages = {}
+    for label, bundles in (('without', []), ('with', shadows)):
+        print(f"Registry {label} shadows:")
+        registry = ModelRegistry(production, shadows=bundles, log_path=None)
+        stages[label] = run_load(models, feature_names, None, levels, stage_seconds,
+                                 feature_state, n_incidents=n_incidents, seed=seed,
+                                 registry=registry).set_index('concurrency')
+        registry.close()
+
+    without, with_ = stages['without'], stages['with']
+    summary = pd.DataFrame({
+        'p50_without_ms': without['p50_ms'],
+        'p50_with_ms':    with_['p50_ms'],
+        'p95_without_ms': without['p95_ms'],
+        'p95_with_ms':    with_['p95_ms'],
+        'p95_overhead_ms': with_['p95_ms'] - without['p95_ms'],
+    })
+    return summary.reset_index(), {k: registry.counts[k] for k in ('compared', 'dropped')}
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def parse_outage(text):
+    start, end = text.split(':')
+    return float(start), float(end)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ramp concurrent dispatchers against a fake Open-Meteo server.")
+    parser.add_argument('--levels', default='1,5,10,25,50',
+                        help="Comma-separated concurrency levels")
+    parser.add_argument('--stage-seconds', type=float, default=20)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--outage', type=parse_outage, action='append', default=[],
+                        help="Outage window start:end in seconds from launch (repeatable)")
+    parser.add_argument('--outage-mode', choices=['error', 'hang'], default='error')
+    parser.add_argument('--timeout', type=float, default=WEATHER_TIMEOUT_S,
+                        help="Client timeout for the weather call (s); with "
+                             "--scheduler, also capped by the request deadline")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scheduler', action='store_true',
+                        help="Submit through the AdmissionScheduler (degraded modes)")
+    parser.add_argument('--shadows', action='store_true',
+                        help="Compare registry latency with and without shadow bundles")
+    parser.add_argument('--shadow-dir', action='append', default=[],
+                        help="Extra shadow bundle export directory (repeatable); "
+                             "SHADOW_MODEL_DIRS are used when present")
+    parser.add_argument('--out', help="Write the stage summary to this CSV")
+    args = parser.parse_args()
+
+    rf, xgb, lgbm, _, feature_names = load_ensemble_models(
+        RF_MODEL_PATH, XGB_MODEL_PATH, LGBM_MODEL_PATH, CONFIG_PATH, METADATA_PATH)
+    feature_state = load_feature_state(METADATA_PATH)
+    levels = [int(x) for x in args.levels.split(',')]
+
+    if args.shadows:
+        dirs = {**{n: d for n, d in SHADOW_MODEL_DIRS.items() if is_exported(d)},
+                **{f"shadow_{i}": d for i, d in enumerate(args.shadow_dir, 1)}}
+        if not dirs:
+            parser.error("no exported shadow bundle found; pass --shadow-dir")
+        shadows = [ModelBundle.load(name, 'shadow', d) for name, d in dirs.items()]
+        summary, counts = run_shadow_comparison(
+            (rf, xgb, lgbm), feature_names, levels, args.stage_seconds, shadows,
+            feature_state, seed=args.seed)
+        print("\n" + summary.round(1).to_string(index=False))
+        print(f"\nShadow comparisons: {counts}")
+        if args.out:
+            summary.to_csv(args.out, index=False)
+            print(f"Saved to {args.out}")
+        return
+
+    with FakeOpenMeteo(args.latency_ms, args.jitter_ms, args.error_rate,
+                       args.outage, args.outage_mode, args.seed) as fake:
+        print(f"Fake Open-Meteo at {fake.url}")
+        scheduler = None
+        if args.scheduler:
+            scheduler = AdmissionScheduler(
+                (rf, xgb, lgbm), feature_names, ENSEMBLE_WEIGHTS, ENSEMBLE_THRESHOLD,
+                feature_state, lookup=load_risk_lookup(),
+                fetch_weather=partial(get_weather_data, base_url=fake.url),
+                weather_timeout=args.timeout).start()
+        summary = run_load((rf, xgb, lgbm), feature_names, fake.url, levels,
+                           args.stage_seconds, feature_state, args.timeout,
+                           seed=args.seed, scheduler=scheduler)
+        if scheduler is not None:
+            scheduler.stop()
+            print(f"\nScheduler: {scheduler.stats()}")
+        counts = dict(fake.counts)
+
+    print("\n" + summary.round(3).to_string(index=False))
+    print(f"\nFake server responses: {counts}")
+    if args.out:
+        summary.to_csv(args.out, index=False)
+        print(f"Saved to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
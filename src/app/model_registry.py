@@ -0,0 +1,338 @@
+"""
+Model Registry — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+A retrained ensemble could only be judged offline before it replaced the
+current one. ModelRegistry holds several model bundles at once so a new
+ensemble can be compared on live traffic first:
+
+  production  serves every response the canary does not take
+  canary      serves CANARY_FRACTION of incidents, chosen by a stable hash
+              of the incident so repeat predictions stay on one bundle
+  shadow      scored on every request, never served
+
+The registry takes raw incidents and builds one feature matrix per
+distinct feature state (the fitted severity-rate tables and fills stored
+with each bundle), over the union of the feature names of the bundles
+sharing it; every bundle selects its columns from its own state's matrix.
+A retrained bundle is therefore scored on the features it was trained
+with, and comparisons measure model differences rather than feature skew.
+
+Only the serving bundle runs on the response path. The rest (and any
+feature matrix only they need) are computed on one background thread
+afterwards, which appends one record per model set to SHADOW_LOG_PATH:
+probability, delta and agreement against the served result, the feature
+state used, and scoring latency. When that thread falls behind,
+comparisons are dropped and counted rather than queued without bound.
+
+Usage:
+    python src/app/model_registry.py    # summarise the comparison log
+"""
+
+import os, json, time, zlib, uuid, pickle, hashlib, argparse, threading
+import numpy as np
+import pandas as pd
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import (SHADOW_MODEL_DIRS, CANARY_MODEL_DIR, CANARY_FRACTION,
+                    SHADOW_LOG_PATH)
+from utils import (load_ensemble_models, load_feature_state,
+                   prepare_features_batch, ensemble_predict_batch)
+
+
+# Artifact files of one bundle, in load_ensemble_models argument order
+# (the train_pipeline.py export layout)
+BUNDLE_FILES = ('rf_model.pkl', 'xgb_model.pkl', 'lgbm_model.pkl',
+                'ensemble_config.json', 'feature_metadata.pkl')
+
+# Comparison jobs allowed to wait for the background thread before new
+# ones are dropped
+SHADOW_BACKLOG = 256
+
+# Comparison records kept in memory for summary()
+RECENT_RECORDS = 10_000
+
+
+def incident_key(lat, lon, dt):
+    """Stable identity of an incident for canary routing and the log."""
+    return f"{lat:.5f},{lon:.5f},{dt:%Y-%m-%d %H:%M}"
+
+
+def routing_fraction(key):
+    """Deterministic value in [0, 1) per key (same on every process)."""
+    return zlib.crc32(key.encode()) / 2 ** 32
+
+
+def state_key(feature_state):
+    """Short stable id of a fitted feature state ('default' for None)."""
+    if feature_state is None:
+        return 'default'
+    return hashlib.sha1(pickle.dumps(feature_state)).hexdigest()[:12]
+
+
+def is_exported(directory):
+    return directory is not None and all(
+        os.path.exists(os.path.join(directory, f)) for f in BUNDLE_FILES)
+
+
+class ModelBundle:
+    """
+    One deployable ensemble: three models plus weights, threshold and the
+    feature state it was trained with (None = features.DEFAULT_STATE).
+    """
+
+    def __init__(self, name, role, models, feature_names, weights, threshold,
+                 feature_state=None):
+        self.name          = name
+        self.role          = role
+        self.models        = models
+        self.feature_names = list(feature_names)
+        self.weights       = weights
+        self.threshold     = threshold
+        self.feature_state = feature_state
+        self.state_key     = state_key(feature_state)
+
+    @classmethod
+    def load(cls, name, role, directory):
+        """Bundle from a train_pipeline.py export directory."""
+        paths = [os.path.join(directory, f) for f in BUNDLE_FILES]
+        rf, xgb, lgbm, config, feature_names = load_ensemble_models(*paths)
+        return cls(name, role, (rf, xgb, lgbm), feature_names,
+                   config['weights'], config['threshold'],
+                   load_feature_state(paths[-1]))
+
+    def score(self, features):
+        """ensemble_predict_batch on this bundle's columns of a shared matrix."""
+        if list(features.columns) != self.feature_names:
+            features = features[self.feature_names]
+        return ensemble_predict_batch(*self.models, features,
+                                      self.weights, self.threshold)
+
+
+class ModelRegistry:
+    """Production bundle plus optional canary and shadow bundles."""
+
+    def __init__(self, production, canary=None, shadows=(),
+                 canary_fraction=CANARY_FRACTION, log_path=SHADOW_LOG_PATH):
+        self.production      = production
+        self.canary          = canary
+        self.shadows         = list(shadows)
+        self.bundles         = [production] + ([canary] if canary else []) + self.shadows
+        self.canary_fraction = canary_fraction
+
+        # state key -> (feature state, union of its bundles' feature names)
+        self.states = {}
+        for b in self.bundles:
+            _, names = self.states.setdefault(b.state_key, (b.feature_state, []))
+            names.extend(n for n in b.feature_names if n not in names)
+        self.log_path        = log_path
+
+        self.recent    = deque(maxlen=RECENT_RECORDS)
+        self.counts    = Counter()
+        self._pending  = 0
+        self._lock     = threading.Lock()
+        self._executor = (ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+                          if len(self.bundles) > 1 else None)
+
+    @classmethod
+    def from_config(cls, production):
+        """Registry around an already-loaded production bundle, adding
+        the shadow / canary bundles from config.py that exist on disk."""
+        shadows = [ModelBundle.load(name, 'shadow', d)
+                   for name, d in SHADOW_MODEL_DIRS.items() if is_exported(d)]
+        canary  = (ModelBundle.load('canary', 'canary', CANARY_MODEL_DIR)
+                   if is_exported(CANARY_MODEL_DIR) else None)
+        return cls(production, canary, shadows)
+
+    def close(self):
+        """Wait for outstanding comparisons; later requests are not compared."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    # ------------------------------------------------------------------------
+    # RESPONSE PATH
+    # ------------------------------------------------------------------------
+
+    def featurise(self, incidents, key):
+        """Feature matrix for raw incidents under one feature state."""
+        feature_state, names = self.states[key]
+        return prepare_features_batch(incidents, names, feature_state)
+
+    def predict_batch(self, incidents, keys=None):
+        """
+        Served results for raw incidents (prepare_features_batch input).
+        keys (incident_key per row) route rows to the canary; without keys
+        production serves everything. Returns an ensemble_predict_batch
+        frame plus a model_set column; other bundles are compared later.
+        """
+        canary_rows = np.zeros(len(incidents), dtype=bool)
+        if self.canary is not None and keys is not None:
+            canary_rows = np.array([routing_fraction(k) < self.canary_fraction
+                                    for k in keys], dtype=bool)
+
+        parts, latency, matrices = [], {}, {}
+        for bundle, rows in ((self.production, ~canary_rows), (self.canary, canary_rows)):
+            if rows.any():
+                if bundle.state_key not in matrices:
+                    matrices[bundle.state_key] = self.featurise(incidents, bundle.state_key)
+                start  = time.perf_counter()
+                result = bundle.score(matrices[bundle.state_key][rows])
+                latency[bundle.name] = (time.perf_counter() - start) * 1000
+                parts.append(result.assign(model_set=bundle.name))
+        served = pd.concat(parts).loc[incidents.index] if len(parts) > 1 else parts[0]
+
+        executor = self._executor
+        if executor is not None:
+            self._submit(executor, incidents, matrices, served, latency, keys)
+        return served
+
+    def predict(self, incident, key=None):
+        """predict_batch for a one-row incidents frame, as an ensemble_predict-style dict."""
+        row = self.predict_batch(incident, None if key is None else [key]).iloc[0]
+        return {
+            'prediction':  int(row['prediction']),
+            'probability': float(row['probability']),
+            'rf_prob':     float(row['rf_prob']),
+            'xgb_prob':    float(row['xgb_prob']),
+            'lgbm_prob':   float(row['lgbm_prob']),
+            'confidence':  float(row['confidence']),
+            'model_set':   row['model_set'],
+        }
+
+    def _submit(self, executor, incidents, matrices, served, latency, keys):
+        with self._lock:
+            if self._pending >= SHADOW_BACKLOG:
+                self.counts['dropped'] += 1
+                return
+            self._pending += 1
+        executor.submit(self._compare, incidents, matrices, served, latency, keys)
+
+    # ------------------------------------------------------------------------
+    # BACKGROUND COMPARISON
+    # ------------------------------------------------------------------------
+
+    def _compare(self, incidents, matrices, served, latency, keys):
+        try:
+            records = []
+            stamp   = datetime.now().isoformat(timespec='seconds')
+            batch   = uuid.uuid4().hex[:12]
+            keys    = keys if keys is not None else [None] * len(incidents)
+            for bundle in self.bundles:
+                rows = (served['model_set'] != bundle.name).to_numpy()
+                if rows.any():
+                    if bundle.state_key not in matrices:
+                        matrices[bundle.state_key] = self.featurise(incidents,
+                                                                    bundle.state_key)
+                    start  = time.perf_counter()
+                    result = bundle.score(matrices[bundle.state_key][rows])
+                    ms     = (time.perf_counter() - start) * 1000
+                    records += self._records(stamp, batch, keys, bundle, result,
+                                             served[rows], rows, ms, 'shadow')
+                if (~rows).any():
+                    records += self._records(stamp, batch, keys, bundle, served[~rows],
+                                             served[~rows], ~rows,
+                                             latency[bundle.name], 'served')
+            self._log(records)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _records(self, stamp, batch, keys, bundle, result, served, rows, ms, path):
+        prob   = result['probability'].to_numpy()
+        s_prob = served['probability'].to_numpy()
+        agree  = result['prediction'].to_numpy() == served['prediction'].to_numpy()
+        return [{
+            'time':               stamp,
+            'batch':              batch,
+            'key':                key,
+            'model_set':          bundle.name,
+            'role':               bundle.role,
+            'path':               path,
+            'feature_state':      bundle.state_key,
+            'served_by':          s_set,
+            'probability':        round(float(p), 5),
+            'served_probability': round(float(sp), 5),
+            'delta':              round(float(p - sp), 5),
+            'agree':              bool(a),
+            'latency_ms':         round(ms, 3),
+            'batch_size':         int(rows.sum()),
+        } for key, p, sp, a, s_set in zip(np.asarray(keys, dtype=object)[rows],
+                                          prob, s_prob, agree, served['model_set'])]
+
+    def _log(self, records):
+        with self._lock:
+            self.recent.extend(records)
+            self.counts['compared'] += 1
+        if self.log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.writelines(json.dumps(r) + '\n' for r in records)
+
+    # ------------------------------------------------------------------------
+    # REPORTING
+    # ------------------------------------------------------------------------
+
+    def summary(self):
+        """summarise_records over the comparisons kept in memory."""
+        with self._lock:
+            return summarise_records(pd.DataFrame(list(self.recent)))
+
+
+def summarise_records(records):
+    """
+    Per model set: feature state used, rows served and compared, agreement
+    with the served prediction, probability deltas, and scoring latency
+    (ms) per path —
+    'served' on the response path, 'shadow' in the background. Latency is
+    measured once per batch, so each batch counts once, not once per row.
+    """
+    if records.empty:
+        return records
+
+    compared = records[records['path'] == 'shadow'].groupby('model_set')
+    by_set   = records.groupby('model_set')
+    summary  = pd.DataFrame({
+        'role':           by_set['role'].first(),
+        'feature_state':  (by_set['feature_state'].first() if 'feature_state' in records
+                           else None),
+        'served':         by_set['path'].apply(lambda p: (p == 'served').sum()),
+        'compared':       compared.size(),
+        'agreement':      compared['agree'].mean(),
+        'mean_delta':     compared['delta'].mean(),
+        'mean_abs_delta': compared['delta'].apply(lambda d: d.abs().mean()),
+    })
+
+    # Logs written before the batch id existed: a batch's rows share these
+    batch_key = (['batch'] if 'batch' in records else
+                 ['time', 'latency_ms', 'batch_size'])
+    batches   = records.drop_duplicates(batch_key + ['model_set', 'path'])
+    for path in ('served', 'shadow'):
+        latency = batches[batches['path'] == path].groupby('model_set')['latency_ms']
+        summary[f'p50_{path}_ms'] = latency.median()
+        summary[f'p95_{path}_ms'] = latency.quantile(0.95)
+    return summary.fillna({'compared': 0}).reset_index()
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarise shadow / canary comparisons per model set.")
+    parser.add_argument('log', nargs='?', default=SHADOW_LOG_PATH)
+    parser.add_argument('--since', help="Only records at or after this ISO time")
+    args = parser.parse_args()
+
+    records = pd.read_json(args.log, lines=True, dtype={'time': str})
+    if args.since:
+        records = records[records['time'] >= args.since]
+    print(f"{len(records):,} records from {args.log}\n")
+    print(summarise_records(records).round(4).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
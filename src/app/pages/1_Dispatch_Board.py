@@ -0,0 +1,148 @@
+"""
+Dispatch Board — Streamlit page
+Nairobi County Emergency Dispatch Decision Support Tool
+
+Queue of open incidents ranked by HIGH-severity probability. New incidents
+and weather refreshes are scored in one batched ensemble call covering only
+the incidents whose inputs changed. Further callers reporting the same crash
+are merged into the open incident rather than scored again.
+"""
+
+import time
+import streamlit as st
+from datetime import datetime
+import pytz
+NAIROBI_TZ = pytz.timezone("Africa/Nairobi")
+
+from config import *
+from utils  import get_weather_data
+from dispatch_board import DispatchBoard
+from incident_merge import IncidentIndex
+from resources      import (load_models, load_state, load_roads, load_travel,
+                            load_registry)
+
+
+st.set_page_config(
+    page_title=f"Dispatch Board · {APP_TITLE}",
+    page_icon=APP_ICON,
+    layout="wide",
+)
+
+
+# ============================================================================
+# MODEL LOADING
+# ============================================================================
+# Shared with the single-incident page (one registry per server process)
+rf_model, xgb_model, lgbm_model, ens_config, feature_names = load_models()
+
+# One board per dispatcher session
+if 'board' not in st.session_state:
+    st.session_state.board = DispatchBoard(
+        rf_model, xgb_model, lgbm_model, feature_names,
+        ENSEMBLE_WEIGHTS, ENSEMBLE_THRESHOLD, load_roads(), load_travel(),
+        load_state(), IncidentIndex(MERGE_RADIUS_M, MERGE_WINDOW_MIN),
+        load_registry())
+board = st.session_state.board
+
+# Incidents whose merge window ended before the latest reported time no
+# longer take further callers (report times, not the wall clock: reports
+# are often entered back-dated)
+board.expire_merges()
+
+
+st.header(" Dispatch Board")
+st.caption("Open incidents ranked by HIGH-severity probability. "
+           "Only new or changed incidents are re-scored.")
+
+
+# ============================================================================
+# ADD INCIDENT
+# ============================================================================
+# Seeded once per session so the entered time survives reruns
+if 'report_time' not in st.session_state:
+    st.session_state.report_time = datetime.now(NAIROBI_TZ).time().replace(microsecond=0)
+
+with st.form("add_incident", clear_on_submit=True):
+    c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+    label = c1.text_input("Caller description / reference",
+                          placeholder="e.g. Thika Rd near Roysambu")
+    lat = c2.number_input("Latitude",
+                          min_value=NAIROBI_BOUNDS['lat_min'],
+                          max_value=NAIROBI_BOUNDS['lat_max'],
+                          value=DEFAULT_LOCATION['lat'], format="%.6f")
+    lon = c3.number_input("Longitude",
+                          min_value=NAIROBI_BOUNDS['lon_min'],
+                          max_value=NAIROBI_BOUNDS['lon_max'],
+                          value=DEFAULT_LOCATION['lon'], format="%.6f")
+    reported = c4.time_input("Time", key="report_time")
+    added = st.form_submit_button("ADD INCIDENT", use_container_width=True)
+
+if added:
+    dt = datetime.combine(datetime.now(NAIROBI_TZ).date(), reported)
+    # A further caller for an open incident needs no weather fetch or scoring
+    merged_into = board.open_incident_for(lat, lon, dt)
+    weather     = None if merged_into else get_weather_data(lat, lon)
+    incident_id = board.add_incident(lat, lon, dt, weather, label)
+    if merged_into:
+        st.toast(f"Merged into incident #{incident_id} "
+                 f"({board.n_reports(incident_id)} reports)")
+
+
+# ============================================================================
+# BOARD
+# ============================================================================
+@st.fragment
+def board_panel():
+    b1, b2, b3, _ = st.columns([1, 1, 1, 1])
+    if b1.button("Refresh weather", use_container_width=True):
+        with st.spinner("Refreshing weather..."):
+            changed, missed = board.refresh_weather(get_weather_data)
+        st.toast(f"Weather changed for {changed} incident(s)"
+                 + (f"; {missed} location(s) kept their last weather" if missed else ""))
+
+    # Batched re-scoring of new and changed incidents only
+    start  = time.perf_counter()
+    scored = board.rescore()
+    if scored:
+        st.caption(f"Scored {scored} incident(s) in one batch "
+                   f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    ranked = board.ranked()
+    if ranked.empty:
+        st.info("No open incidents. Add one above.")
+        return
+
+    ranked['severity'] = ranked['prediction'].map(SEVERITY_LABELS)
+    st.dataframe(
+        ranked[['label', 'severity', 'probability', 'n_reports', 'road_class', 'hospital',
+                'eta_min', 'latitude', 'longitude', 'datetime', 'incident_id']],
+        hide_index=True, use_container_width=True,
+        column_config={
+            'label':       "Incident",
+            'severity':    "Severity",
+            'probability': st.column_config.ProgressColumn(
+                "P(HIGH)", min_value=0.0, max_value=1.0, format="%.2f"),
+            'n_reports':   st.column_config.NumberColumn("Reports", format="%d"),
+            'road_class':  "Nearest road",
+            'hospital':    "Fastest trauma centre",
+            'eta_min':     st.column_config.NumberColumn("ETA (min)", format="%.0f"),
+            'latitude':    st.column_config.NumberColumn("Lat", format="%.5f"),
+            'longitude':   st.column_config.NumberColumn("Lon", format="%.5f"),
+            'datetime':    st.column_config.DatetimeColumn("Reported", format="HH:mm"),
+            'incident_id': "ID",
+        })
+
+    to_close = b2.selectbox("Incident to close", ranked['incident_id'].tolist(),
+                            format_func=lambda i: f"#{i}",
+                            label_visibility="collapsed")
+    if b3.button("Close incident", use_container_width=True):
+        board.close_incident(to_close)
+        st.rerun(scope="fragment")
+
+
+board_panel()
+
+st.markdown("---")
+st.caption(
+    "**Disclaimer:** Decision support tool only. "
+    "Final dispatch decisions must be made by qualified emergency personnel.")
@@ -0,0 +1,58 @@
+"""
+Shared Resources — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+Server-wide resources used by more than one Streamlit page. st.cache_resource
+keys on the decorated function, so a loader defined in each page script
+gives each page its own copy; defining them once here means the single
+prediction view and the dispatch board share one set of models, one
+feature state and one ModelRegistry (and with it one shadow-comparison
+thread writing SHADOW_LOG_PATH).
+"""
+
+import streamlit as st
+
+from config import *
+from utils import load_ensemble_models, load_feature_state
+from road_context import load_road_context
+from travel_time import load_travel_times
+from model_registry import ModelBundle, ModelRegistry
+
+
+@st.cache_resource
+def load_models():
+    try:
+        return load_ensemble_models(
+            RF_MODEL_PATH, XGB_MODEL_PATH, LGBM_MODEL_PATH,
+            CONFIG_PATH, METADATA_PATH
+        )
+    except Exception as e:
+        st.error(f"Model loading failed: {e}")
+        st.stop()
+
+
+@st.cache_resource
+def load_state():
+    """Fitted feature statistics from retraining, or None for notebook metadata."""
+    return load_feature_state(METADATA_PATH)
+
+
+@st.cache_resource
+def load_roads():
+    """Road context raster (display only), or None if it has not been built yet."""
+    return load_road_context()
+
+
+@st.cache_resource
+def load_travel():
+    """Trauma centre travel-time grid, or None if it has not been built yet."""
+    return load_travel_times()
+
+
+@st.cache_resource
+def load_registry():
+    """Production ensemble plus any shadow / canary bundles found on disk."""
+    rf_model, xgb_model, lgbm_model, _, feature_names = load_models()
+    return ModelRegistry.from_config(ModelBundle(
+        'production', 'production', (rf_model, xgb_model, lgbm_model),
+        feature_names, ENSEMBLE_WEIGHTS, ENSEMBLE_THRESHOLD, load_state()))
@@ -0,0 +1,155 @@
+"""
+Precomputed Risk Lookup — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+Last-resort answer for the admission scheduler when there is no time for
+feature building or model inference: the ensemble's HIGH-severity
+probability precomputed for every grid cell, weekday and hour.
+
+  Build step (offline, after each retrain):
+      python src/app/risk_lookup.py
+    Scores the full ensemble once over cell x weekday x hour in one batch
+    and saves the table as .npz.
+
+  Request path:
+    RiskLookup.lookup / lookup_batch index the table — O(1), no models.
+
+Inputs the table does not vary — weather, month and year — are fixed at
+build time (default weather, the build date's month and year), so lookups
+are coarser than a live prediction and should be rebuilt periodically.
+"""
+
+import os, time, argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from config import (RISK_LOOKUP_PATH, RF_MODEL_PATH, XGB_MODEL_PATH,
+                    LGBM_MODEL_PATH, CONFIG_PATH, METADATA_PATH,
+                    ENSEMBLE_WEIGHTS, ENSEMBLE_THRESHOLD)
+from road_context import raster_grid
+from utils import (load_ensemble_models, load_feature_state,
+                   prepare_features_batch, ensemble_predict_batch)
+
+
+# Cell size in degrees (~1.1 km); coarse enough for a fast one-off build
+LOOKUP_RESOLUTION = 0.01
+
+
+# ============================================================================
+# BUILD STEP
+# ============================================================================
+
+def build_risk_lookup(models, feature_names, weights, threshold,
+                      out_path=RISK_LOOKUP_PATH, resolution=LOOKUP_RESOLUTION,
+                      feature_state=None, reference=None):
+    """
+    Score the ensemble over every cell x weekday x hour and save the
+    probabilities. reference fixes month and year (default: today).
+    """
+    reference = reference or datetime.now()
+    lats, lons = raster_grid(resolution=resolution)
+    grid_lon, grid_lat = np.meshgrid(lons, lats)
+
+    # A Monday in the reference month; + day_of_week days + hour hours
+    monday = pd.Timestamp(reference.year, reference.month, 1)
+    monday += pd.Timedelta(days=(7 - monday.dayofweek) % 7)
+    dow, hour, cell = np.meshgrid(np.arange(7), np.arange(24),
+                                  np.arange(grid_lat.size), indexing='ij')
+
+    t0 = time.perf_counter()
+    incidents = pd.DataFrame({
+        'latitude':  grid_lat.ravel()[cell.ravel()],
+        'longitude': grid_lon.ravel()[cell.ravel()],
+        'datetime':  (monday + pd.to_timedelta(dow.ravel(), unit='D') +
+                      pd.to_timedelta(hour.ravel(), unit='h')),
+    })
+    features = prepare_features_batch(incidents, feature_names, feature_state)
+    results  = ensemble_predict_batch(*models, features, weights, threshold)
+    elapsed  = time.perf_counter() - t0
+
+    probability = results['probability'].to_numpy(dtype=np.float32).reshape(
+        (7, 24) + grid_lat.shape)
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    np.savez_compressed(
+        out_path,
+        probability=probability,
+        threshold=threshold,
+        lat_min=lats[0] - resolution / 2,
+        lon_min=lons[0] - resolution / 2,
+        resolution=resolution,
+        reference=monday.strftime('%Y-%m'),
+    )
+    return {'rows': len(incidents), 'shape': grid_lat.shape, 'seconds': elapsed}
+
+
+# ============================================================================
+# REQUEST-PATH LOOKUP
+# ============================================================================
+
+class RiskLookup:
+    """Precomputed ensemble probability per (weekday, hour, row, col)."""
+
+    def __init__(self, probability, threshold, lat_min, lon_min, resolution):
+        self.probability = probability
+        self.threshold   = float(threshold)
+        self.lat_min     = float(lat_min)
+        self.lon_min     = float(lon_min)
+        self.resolution  = float(resolution)
+
+    @classmethod
+    def load(cls, path=RISK_LOOKUP_PATH):
+        with np.load(path) as z:
+            return cls(z['probability'], z['threshold'], z['lat_min'],
+                       z['lon_min'], z['resolution'])
+
+    def lookup_batch(self, lat, lon, day_of_week, hour):
+        """Probabilities for arrays of points; points outside the grid are clamped."""
+        n_rows, n_cols = self.probability.shape[2:]
+        rows = np.floor((np.asarray(lat, dtype=float) - self.lat_min) / self.resolution).astype(int)
+        cols = np.floor((np.asarray(lon, dtype=float) - self.lon_min) / self.resolution).astype(int)
+        return self.probability[np.asarray(day_of_week), np.asarray(hour),
+                                np.clip(rows, 0, n_rows - 1),
+                                np.clip(cols, 0, n_cols - 1)].astype(float)
+
+    def lookup(self, lat, lon, dt):
+        """ensemble_predict-style result for one incident from the table."""
+        p = float(self.lookup_batch([lat], [lon], [dt.weekday()], [dt.hour])[0])
+        prediction = int(p >= self.threshold)
+        return {
+            'prediction':  prediction,
+            'probability': p,
+            'confidence':  (p if prediction == 1 else 1 - p) * 100,
+        }
+
+
+def load_risk_lookup(path=RISK_LOOKUP_PATH):
+    """RiskLookup if the table has been built, else None."""
+    return RiskLookup.load(path) if os.path.exists(path) else None
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute the ensemble risk table for degraded-mode lookups.")
+    parser.add_argument('--out', default=RISK_LOOKUP_PATH)
+    parser.add_argument('--resolution', type=float, default=LOOKUP_RESOLUTION,
+                        help="Cell size in degrees (default 0.01 ~ 1.1 km)")
+    args = parser.parse_args()
+
+    rf, xgb, lgbm, _, feature_names = load_ensemble_models(
+        RF_MODEL_PATH, XGB_MODEL_PATH, LGBM_MODEL_PATH, CONFIG_PATH, METADATA_PATH)
+    info = build_risk_lookup((rf, xgb, lgbm), feature_names, ENSEMBLE_WEIGHTS,
+                             ENSEMBLE_THRESHOLD, args.out, args.resolution,
+                             load_feature_state(METADATA_PATH))
+    print(f"Grid: {info['shape'][0]} x {info['shape'][1]} cells x 7 days x 24 hours "
+          f"= {info['rows']:,} rows scored in {info['seconds']:.1f}s")
+    print(f"Saved to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
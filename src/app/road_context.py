@@ -0,0 +1,274 @@
+"""
+Road Context Raster — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+Real road context for a location from a local OpenStreetMap extract of
+Nairobi — nearest road class, distance to it and whether a junction is
+close — shown to dispatchers beside the prediction. It is not a model
+input: the ensemble learned road type and intersections from crash volume
+at the location, and mapped road class is a different quantity.
+
+  Build step (offline, once per extract):
+      python src/app/road_context.py nairobi.osm.pbf
+    Loads the road network, indexes it in a shapely STRtree and samples
+    nearest-road class, distance to road and distance to the nearest
+    intersection onto a fine raster over NAIROBI_BOUNDS, saved as .npz.
+
+  Request path:
+    RoadContext.lookup / lookup_batch turn lat/lon into a raster cell
+    index — O(1), no geometry queries.
+
+Any format GDAL reads works for the extract (.osm.pbf, .gpkg, .geojson,
+.shp) as long as it carries an OSM 'highway' column.
+"""
+
+import os, time, argparse
+import numpy as np
+
+from config import NAIROBI_BOUNDS, ROAD_CONTEXT_PATH
+
+
+# Raster cell size in degrees (~55 m at Nairobi's latitude)
+RASTER_RESOLUTION = 0.0005
+
+# Points further than this from any road are treated as off-network
+ROAD_MAX_DIST_M = 150
+
+# Nearest junction within this distance sets likely_intersection
+INTERSECTION_RADIUS_M = 50
+
+# UTM zone 37S — metric distances for Nairobi
+METRIC_CRS = 'EPSG:32737'
+
+# Raster class codes -> road class names (same labels as road_type_proxy).
+# Code 0 means no road within ROAD_MAX_DIST_M.
+ROAD_CLASSES = ['NONE', 'MAJOR_HIGHWAY', 'MAIN_ROAD',
+                'SECONDARY_ROAD', 'RESIDENTIAL']
+
+# Shown for points with no road within ROAD_MAX_DIST_M
+NO_ROAD_LABEL = "no mapped road nearby"
+
+# OSM highway=* values -> raster class code
+OSM_HIGHWAY_CLASS = {
+    'motorway': 1, 'motorway_link': 1, 'trunk': 1, 'trunk_link': 1,
+    'primary': 2, 'primary_link': 2,
+    'secondary': 3, 'secondary_link': 3, 'tertiary': 3, 'tertiary_link': 3,
+    'residential': 4, 'unclassified': 4, 'living_street': 4, 'service': 4,
+    'road': 4,
+}
+
+
+# ============================================================================
+# BUILD STEP
+# ============================================================================
+
+def load_road_network(extract_path):
+    """
+    Read drivable roads from an OSM extract, projected to metres.
+    Returns (geometries, class codes).
+    """
+    import geopandas as gpd
+
+    kwargs = {'layer': 'lines'} if extract_path.endswith(('.pbf', '.osm')) else {}
+    roads = gpd.read_file(extract_path, **kwargs)
+    if 'highway' not in roads.columns:
+        raise ValueError(f"{extract_path} has no 'highway' column")
+
+    roads = roads[roads['highway'].isin(OSM_HIGHWAY_CLASS.keys())]
+    roads = roads[roads.geometry.geom_type.isin(['LineString', 'MultiLineString'])]
+    roads = roads.explode(index_parts=False)
+    if roads.crs is None:
+        roads = roads.set_crs('EPSG:4326')
+    roads = roads.to_crs(METRIC_CRS)
+
+    codes = roads['highway'].map(OSM_HIGHWAY_CLASS).to_numpy(dtype=np.uint8)
+    return roads.geometry.to_numpy(), codes
+
+
+def find_intersections(geoms):
+    """
+    Junction points of the road network.
+
+    OSM ways share nodes where they meet. Each vertex is counted once per
+    way end it terminates and twice where a way passes through it; a
+    vertex with degree >= 3 is a junction (a plain way-to-way continuation
+    only reaches 2).
+    """
+    import shapely
+
+    coords, idx = shapely.get_coordinates(geoms, return_index=True)
+    keys        = np.round(coords, 1)                 # 10 cm snapping
+
+    starts = np.r_[True, idx[1:] != idx[:-1]]
+    ends   = np.r_[idx[1:] != idx[:-1], True]
+    weight = np.where(starts | ends, 1, 2)
+
+    uniq, inverse = np.unique(keys, axis=0, return_inverse=True)
+    degree = np.bincount(inverse.ravel(), weights=weight)
+    return shapely.points(uniq[degree >= 3])
+
+
+def raster_grid(bounds=NAIROBI_BOUNDS, resolution=RASTER_RESOLUTION):
+    """Cell-centre latitudes and longitudes covering the study area."""
+    lats = np.arange(bounds['lat_min'], bounds['lat_max'], resolution) + resolution / 2
+    lons = np.arange(bounds['lon_min'], bounds['lon_max'], resolution) + resolution / 2
+    return lats, lons
+
+
+def build_road_context(extract_path, out_path=ROAD_CONTEXT_PATH,
+                       resolution=RASTER_RESOLUTION):
+    """
+    Sample nearest-road class and intersection proximity onto the raster
+    and save it. All geometry work happens here, never at request time.
+    """
+    import shapely
+    from pyproj import Transformer
+
+    timings = {}
+
+    t0 = time.perf_counter()
+    geoms, codes = load_road_network(extract_path)
+    junctions    = find_intersections(geoms)
+    timings['load'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    road_tree = shapely.STRtree(geoms)
+    junc_tree = shapely.STRtree(junctions)
+    timings['index'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lats, lons = raster_grid(resolution=resolution)
+    grid_lon, grid_lat = np.meshgrid(lons, lats)
+    to_metric = Transformer.from_crs('EPSG:4326', METRIC_CRS, always_xy=True)
+    x, y      = to_metric.transform(grid_lon.ravel(), grid_lat.ravel())
+    cells     = shapely.points(x, y)
+
+    (cell_i, road_i), road_d = road_tree.query_nearest(
+        cells, max_distance=ROAD_MAX_DIST_M, return_distance=True, all_matches=False)
+    road_class = np.zeros(len(cells), dtype=np.uint8)
+    road_dist  = np.full(len(cells), np.inf, dtype=np.float32)
+    road_class[cell_i] = codes[road_i]
+    road_dist[cell_i]  = road_d
+
+    junc_dist = np.full(len(cells), np.inf, dtype=np.float32)
+    if len(junctions):
+        (cell_j, _), junc_d = junc_tree.query_nearest(
+            cells, max_distance=ROAD_MAX_DIST_M, return_distance=True, all_matches=False)
+        junc_dist[cell_j] = junc_d
+    timings['sample'] = time.perf_counter() - t0
+
+    shape = grid_lat.shape
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    np.savez_compressed(
+        out_path,
+        road_class=road_class.reshape(shape),
+        road_dist_m=road_dist.reshape(shape),
+        intersection_dist_m=junc_dist.reshape(shape),
+        lat_min=lats[0] - resolution / 2,
+        lon_min=lons[0] - resolution / 2,
+        resolution=resolution,
+        source=os.path.basename(extract_path),
+    )
+    return {'roads': len(geoms), 'intersections': len(junctions),
+            'cells': len(cells), 'shape': shape, 'timings': timings}
+
+
+# ============================================================================
+# REQUEST-PATH LOOKUP
+# ============================================================================
+
+class RoadContext:
+    """
+    Precomputed road context raster.
+    lookup() / lookup_batch() only compute a cell index and read arrays.
+    """
+
+    def __init__(self, road_class, road_dist_m, intersection_dist_m,
+                 lat_min, lon_min, resolution):
+        self.road_class          = road_class
+        self.road_dist_m         = road_dist_m
+        self.intersection_dist_m = intersection_dist_m
+        self.lat_min             = float(lat_min)
+        self.lon_min             = float(lon_min)
+        self.resolution          = float(resolution)
+        self._road_names         = np.array(ROAD_CLASSES)
+
+    @classmethod
+    def load(cls, path=ROAD_CONTEXT_PATH):
+        with np.load(path) as z:
+            return cls(z['road_class'], z['road_dist_m'], z['intersection_dist_m'],
+                       z['lat_min'], z['lon_min'], z['resolution'])
+
+    def _cells(self, lat, lon):
+        """Row/col indexes and an in-raster mask for arrays of points."""
+        rows = np.floor((np.asarray(lat, dtype=float) - self.lat_min) / self.resolution).astype(int)
+        cols = np.floor((np.asarray(lon, dtype=float) - self.lon_min) / self.resolution).astype(int)
+        n_rows, n_cols = self.road_class.shape
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        return np.clip(rows, 0, n_rows - 1), np.clip(cols, 0, n_cols - 1), inside
+
+    def lookup_batch(self, lat, lon):
+        """
+        Road context for arrays of points.
+        Returns a dict of arrays: road_type ('NONE' off the road network),
+        road_dist_m (inf off the network), likely_intersection, on_road
+        (a road within ROAD_MAX_DIST_M) and covered (False outside the raster).
+        """
+        rows, cols, inside = self._cells(lat, lon)
+        code = self.road_class[rows, cols]
+        dist = self.road_dist_m[rows, cols]
+        junc = self.intersection_dist_m[rows, cols]
+        on_road = inside & (code != 0) & np.isfinite(dist)
+        return {
+            'road_type':           np.where(on_road, self._road_names[code], 'NONE'),
+            'road_dist_m':         np.where(on_road, dist, np.inf),
+            'likely_intersection': ((junc <= INTERSECTION_RADIUS_M) & inside).astype(int),
+            'on_road':             on_road,
+            'covered':             inside,
+        }
+
+    def lookup(self, lat, lon):
+        """
+        Road context for a single point, or None outside the raster.
+        road_type and road_dist_m are None when no road is within
+        ROAD_MAX_DIST_M.
+        """
+        ctx = self.lookup_batch([lat], [lon])
+        if not ctx['covered'][0]:
+            return None
+        on_road = bool(ctx['on_road'][0])
+        return {
+            'road_type':           str(ctx['road_type'][0]) if on_road else None,
+            'road_dist_m':         float(ctx['road_dist_m'][0]) if on_road else None,
+            'likely_intersection': int(ctx['likely_intersection'][0]),
+        }
+
+
+def load_road_context(path=ROAD_CONTEXT_PATH):
+    """RoadContext if the raster has been built, else None."""
+    return RoadContext.load(path) if os.path.exists(path) else None
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the road context raster from a local OSM extract.")
+    parser.add_argument('extract', help="OSM extract (.osm.pbf, .gpkg, .geojson, ...)")
+    parser.add_argument('--out', default=ROAD_CONTEXT_PATH)
+    parser.add_argument('--resolution', type=float, default=RASTER_RESOLUTION,
+                        help="Cell size in degrees (default 0.0005 ~ 55 m)")
+    args = parser.parse_args()
+
+    info = build_road_context(args.extract, args.out, args.resolution)
+    t    = info['timings']
+    print(f"Roads: {info['roads']:,}  Intersections: {info['intersections']:,}")
+    print(f"Raster: {info['shape'][0]} x {info['shape'][1]} = {info['cells']:,} cells")
+    print(f"Load {t['load']:.1f}s | Index {t['index']:.1f}s | Sample {t['sample']:.1f}s")
+    print(f"Saved to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""
+Threshold & Weight Re-optimisation — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+Re-tunes the ensemble weights and decision threshold from a replay log of
+stored per-model probabilities and confirmed outcomes, without rerunning
+the training notebooks. Writes a candidate ensemble_config.json that can be
+reviewed before it replaces the production file.
+
+Replay log columns (CSV):
+    rf_prob, xgb_prob, lgbm_prob   per-model HIGH probabilities
+    severity_binary                confirmed outcome (1 = HIGH, 0 = LOW)
+    geographic_zone                optional, or the geographic_zone_* one-hots
+
+--per-zone prints the threshold each geographic zone would need for the
+target recall. It is a report only: serving applies one global threshold,
+so zone thresholds are not written to the candidate config.
+
+Usage:
+    python src/app/threshold_tuning.py replay_log.csv --per-zone
+"""
+
+import os, json, time, argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from config import MODEL_DIR, ENSEMBLE_WEIGHTS, ENSEMBLE_THRESHOLD
+
+
+PROB_COLUMNS  = ['rf_prob', 'xgb_prob', 'lgbm_prob']
+WEIGHT_KEYS   = ['rf', 'xgboost', 'lgbm']
+LABEL_COLUMN  = 'severity_binary'
+ZONE_COLUMN   = 'geographic_zone'
+ZONE_PREFIX   = 'geographic_zone_'
+
+# Same recall target the 0.13 threshold was chosen for in Notebook 03
+TARGET_RECALL = 0.80
+
+# Zones with fewer confirmed HIGH cases than this keep the global threshold
+MIN_ZONE_POSITIVES = 30
+
+CANDIDATE_CONFIG_PATH = os.path.join(MODEL_DIR, 'ensemble_config_candidate.json')
+
+
+# ============================================================================
+# REPLAY LOG LOADING
+# ============================================================================
+
+def load_replay_log(path):
+    """
+    Read a replay log and return (probs, labels, zones).
+    probs is an (n, 3) float32 matrix in rf / xgboost / lgbm order;
+    zones is None when the log carries no zone information.
+    """
+    df = pd.read_csv(path)
+
+    missing = [c for c in PROB_COLUMNS + [LABEL_COLUMN] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Replay log is missing columns: {missing}")
+
+    probs  = df[PROB_COLUMNS].to_numpy(dtype=np.float32)
+    labels = df[LABEL_COLUMN].to_numpy().astype(np.int8)
+
+    if ZONE_COLUMN in df.columns:
+        zones = df[ZONE_COLUMN].astype(str).to_numpy()
+    else:
+        # Recover the zone name from the one-hot columns used at training time
+        onehot = [c for c in df.columns if c.startswith(ZONE_PREFIX)]
+        if onehot:
+            names = np.array([c[len(ZONE_PREFIX):] for c in onehot])
+            zones = names[df[onehot].to_numpy().argmax(axis=1)]
+        else:
+            zones = None
+
+    return probs, labels, zones
+
+
+# ============================================================================
+# SORT-BASED CURVES
+# ============================================================================
+
+def threshold_curves(scores, labels):
+    """
+    Recall, under-triage, over-triage and precision at every distinct
+    threshold, plus ROC-AUC — computed from one descending sort.
+
+    Each threshold t in the output means "predict HIGH when score >= t",
+    matching ensemble_predict.
+    """
+    order  = np.argsort(-scores, kind='stable')
+    s      = scores[order]
+    y      = labels[order].astype(np.int64)
+
+    tp = np.cumsum(y)
+    fp = np.cumsum(1 - y)
+
+    # Keep the last position of each run of tied scores
+    last = np.r_[np.flatnonzero(np.diff(s)), len(s) - 1]
+    s, tp, fp = s[last], tp[last], fp[last]
+
+    n_pos = max(int(tp[-1]), 1)
+    n_neg = max(int(fp[-1]), 1)
+
+    recall    = tp / n_pos
+    fpr       = fp / n_neg
+    precision = tp / (tp + fp)
+
+    # Trapezoidal ROC-AUC with the (0, 0) origin prepended
+    tpr_ext = np.r_[0.0, recall]
+    fpr_ext = np.r_[0.0, fpr]
+    auc     = float(np.sum(np.diff(fpr_ext) * (tpr_ext[1:] + tpr_ext[:-1]) / 2))
+
+    return {
+        'thresholds':   s,
+        'recall':       recall,
+        'under_triage': (1 - recall) * 100,
+        'over_triage':  fpr * 100,
+        'precision':    precision,
+        'auc':          auc,
+    }
+
+
+def threshold_for_recall(scores, labels, target=TARGET_RECALL):
+    """
+    Highest threshold whose HIGH recall reaches the target.
+    Uses a partial sort of the positive scores only — O(n) per call.
+    """
+    pos = scores[labels == 1]
+    if len(pos) == 0:
+        return None
+    k = int(np.ceil(target * len(pos)))
+    k = min(max(k, 1), len(pos))
+    return float(np.partition(pos, len(pos) - k)[len(pos) - k])
+
+
+# ============================================================================
+# WEIGHT SEARCH
+# ============================================================================
+
+def simplex_grid(step=0.05):
+    """All (rf, xgboost, lgbm) weight triples on the simplex at a fixed step."""
+    n = int(round(1 / step))
+    grid = [(i, j, n - i - j) for i in range(n + 1) for j in range(n + 1 - i)]
+    return np.array(grid, dtype=np.float64) / n
+
+
+def search_weights(probs, labels, step=0.05, target=TARGET_RECALL, chunk=16):
+    """
+    Evaluate every simplex weight triple at its target-recall threshold.
+
+    HIGH and LOW rows are split once up front; scores for a chunk of weight
+    triples then come from one matrix product per class, and each threshold
+    is a partial sort of the HIGH scores. Ranked by over-triage (fewest
+    false ALS dispatches at the required recall).
+    """
+    grid     = simplex_grid(step)
+    is_pos   = labels == 1
+    pos      = probs[is_pos]
+    neg      = probs[~is_pos]
+    n_pos    = len(pos)
+    n_neg    = max(len(neg), 1)
+    if n_pos == 0:
+        raise ValueError("Replay log contains no confirmed HIGH cases")
+
+    k    = min(max(int(np.ceil(target * n_pos)), 1), n_pos)
+    rows = []
+
+    for start in range(0, len(grid), chunk):
+        w_block = grid[start:start + chunk].astype(np.float32)
+        pos_s   = pos @ w_block.T                         # (n_pos, chunk)
+        neg_s   = neg @ w_block.T                         # (n_neg, chunk)
+
+        # k-th highest HIGH score per column = target-recall threshold
+        t_block = np.partition(pos_s, n_pos - k, axis=0)[n_pos - k]
+        tp      = np.count_nonzero(pos_s >= t_block, axis=0)
+        fp      = np.count_nonzero(neg_s >= t_block, axis=0)
+
+        for w, t, tp_i, fp_i in zip(w_block, t_block, tp, fp):
+            rows.append({
+                'w_rf':         round(float(w[0]), 4),
+                'w_xgboost':    round(float(w[1]), 4),
+                'w_lgbm':       round(float(w[2]), 4),
+                'threshold':    float(t),
+                'recall':       tp_i / n_pos,
+                'under_triage': (1 - tp_i / n_pos) * 100,
+                'over_triage':  fp_i / n_neg * 100,
+                'precision':    tp_i / max(tp_i + fp_i, 1),
+            })
+
+    results = pd.DataFrame(rows)
+    return results.sort_values(['over_triage', 'threshold'],
+                               ascending=[True, False]).reset_index(drop=True)
+
+
+def fit_zone_thresholds(scores, labels, zones, target=TARGET_RECALL,
+                        fallback=None, min_positives=MIN_ZONE_POSITIVES):
+    """
+    Per-zone target-recall thresholds.
+    Zones with too few confirmed HIGH cases fall back to the global value
+    rather than fitting noise.
+    """
+    out = {}
+    for zone in np.unique(zones):
+        mask = zones == zone
+        if int(labels[mask].sum()) < min_positives:
+            out[str(zone)] = fallback
+        else:
+            out[str(zone)] = threshold_for_recall(scores[mask], labels[mask], target)
+    return out
+
+
+# ============================================================================
+# CANDIDATE CONFIG
+# ============================================================================
+
+def build_candidate_config(probs, labels, step=0.05, target=TARGET_RECALL):
+    """Run the full search and return (config dict, weight search table)."""
+    results = search_weights(probs, labels, step, target)
+    best    = results.iloc[0]
+    weights = {'rf':      float(best['w_rf']),
+               'xgboost': float(best['w_xgboost']),
+               'lgbm':    float(best['w_lgbm'])}
+
+    w       = np.array([weights[k] for k in WEIGHT_KEYS], dtype=np.float32)
+    scores  = probs @ w
+    curves  = threshold_curves(scores, labels)
+
+    config = {
+        'weights':          weights,
+        'threshold':        round(float(best['threshold']), 4),
+        'date_saved':       datetime.now().strftime('%Y-%m-%d %H:%M'),
+        'val_recall':       round(float(best['recall']), 4),
+        'val_under_triage': round(float(best['under_triage']), 2),
+        'val_auc':          round(curves['auc'], 4),
+        'target_recall':    target,
+        'n_samples':        int(len(labels)),
+    }
+
+    return config, results
+
+
+def zone_threshold_report(probs, labels, zones, config, target=TARGET_RECALL):
+    """Per-zone thresholds under the candidate weights (report only)."""
+    w      = np.array([config['weights'][k] for k in WEIGHT_KEYS], dtype=np.float32)
+    zone_t = fit_zone_thresholds(probs @ w, labels, zones, target,
+                                 fallback=config['threshold'])
+    return {z: round(float(t), 4) for z, t in zone_t.items()}
+
+
+def baseline_summary(probs, labels, target=TARGET_RECALL):
+    """
+    Current production weights at the production threshold
+    (ENSEMBLE_THRESHOLD) — the configuration a candidate would replace —
+    plus the threshold those weights would need to reach the target recall.
+    """
+    w      = np.array([ENSEMBLE_WEIGHTS[k] for k in WEIGHT_KEYS], dtype=np.float32)
+    scores = probs @ w
+    high   = scores >= ENSEMBLE_THRESHOLD
+    pos    = labels == 1
+    recall = high[pos].mean() if pos.any() else np.nan
+    return {
+        'auc':                threshold_curves(scores, labels)['auc'],
+        'threshold':          ENSEMBLE_THRESHOLD,
+        'recall':             float(recall),
+        'under_triage':       float((1 - recall) * 100),
+        'over_triage':        float(high[~pos].mean() * 100) if (~pos).any() else np.nan,
+        'threshold_for_target': threshold_for_recall(scores, labels, target),
+    }
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-optimise ensemble weights and threshold from a replay log.")
+    parser.add_argument('replay_log', help="CSV of per-model probabilities and outcomes")
+    parser.add_argument('--step', type=float, default=0.05,
+                        help="Simplex grid step for the weight search (default 0.05)")
+    parser.add_argument('--target-recall', type=float, default=TARGET_RECALL,
+                        help="HIGH recall the threshold must reach (default 0.80)")
+    parser.add_argument('--per-zone', action='store_true',
+                        help="Also report the threshold each geographic zone would need")
+    parser.add_argument('--out', default=CANDIDATE_CONFIG_PATH,
+                        help="Where to write the candidate ensemble_config.json")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    probs, labels, zones = load_replay_log(args.replay_log)
+    t_load = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    config, results = build_candidate_config(
+        probs, labels, args.step, args.target_recall)
+    t_search = time.perf_counter() - t0
+
+    base = baseline_summary(probs, labels, args.target_recall)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(config, f, indent=2)
+
+    print(f"Rows: {len(labels):,}  ({int(labels.sum()):,} HIGH)  "
+          f"loaded in {t_load:.2f}s")
+    print(f"Searched {len(results):,} weight triples in {t_search:.2f}s")
+    print(f"Production config:  {ENSEMBLE_WEIGHTS}  threshold {base['threshold']}  "
+          f"AUC {base['auc']:.4f}")
+    print(f"  Recall {base['recall']:.4f}  "
+          f"Under-triage {base['under_triage']:.2f}%  "
+          f"Over-triage {base['over_triage']:.2f}%  "
+          f"(threshold for {args.target_recall:.0%} recall would be "
+          f"{base['threshold_for_target']:.4f})")
+    print(f"Candidate weights:  {config['weights']}  "
+          f"threshold {config['threshold']}  AUC {config['val_auc']}")
+    print(f"  Recall {config['val_recall']:.4f}  "
+          f"Under-triage {config['val_under_triage']:.2f}%  "
+          f"Over-triage {results.iloc[0]['over_triage']:.2f}%")
+    if args.per_zone and zones is not None:
+        print("Per-zone thresholds (report only, not written to the config):")
+        for zone, t in zone_threshold_report(probs, labels, zones, config,
+                                             args.target_recall).items():
+            print(f"  {zone:15s} threshold {t}")
+    print(f"Candidate config written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+"""
+Retraining Pipeline — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+Command-line replacement for running Notebooks 02 and 03 by hand. Produces
+the full production artifact set from the labeled crash data:
+
+    rf_model.pkl, xgb_model.pkl, lgbm_model.pkl,
+    ensemble_config.json, feature_metadata.pkl
+
+Stages (each timed):
+  features  labeled crashes + archived weather -> Parquet feature store,
+            streamed in bounded chunks through features.py (Notebook 02)
+  split     train / validation / test split, SMOTE on train only
+  train     5-fold CV + final fit of RF, XGBoost and LightGBM; all 18 fits
+            run in parallel across cores
+  ensemble  equal-weight ensemble, threshold at 80% validation recall,
+            test-set metrics (Notebook 03)
+  export    write the artifact set
+
+features, split and train results are cached under data/cache, keyed by a
+hash of their inputs (file contents, parameters, pipeline version), so a
+rerun on unchanged data skips straight to the ensemble stage.
+
+Usage:
+    python src/app/train_pipeline.py --out models/retrained
+"""
+
+import os, json, time, pickle, hashlib, argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from config import (LABELED_CRASHES_PATH, WEATHER_ARCHIVE_PATH,
+                    PIPELINE_CACHE_DIR, RETRAIN_OUTPUT_DIR, ENSEMBLE_WEIGHTS)
+from threshold_tuning import TARGET_RECALL
+import features
+
+
+# Bump when feature or split logic changes — invalidates every cache entry
+PIPELINE_VERSION = 2
+
+RANDOM_STATE = 42
+TEST_SIZE    = 0.15
+VAL_SIZE     = 0.176          # 15% of the total, taken from the remaining 85%
+CV_FOLDS     = 5
+
+# Threshold grid searched in Notebook 03 for the target validation recall
+THRESHOLD_GRID = np.arange(0.05, 0.35, 0.01)
+
+# Artifact file name per model, as loaded by config.py
+MODEL_FILES = {'rf': 'rf_model.pkl', 'xgboost': 'xgb_model.pkl',
+               'lgbm': 'lgbm_model.pkl'}
+
+# Hyperparameters from Notebook 03
+MODEL_PARAMS = {
+    'rf':      dict(n_estimators=200, max_depth=15, min_samples_split=10,
+                    min_samples_leaf=5, random_state=RANDOM_STATE),
+    'xgboost': dict(n_estimators=200, max_depth=6, learning_rate=0.1,
+                    subsample=0.8, colsample_bytree=0.8,
+                    random_state=RANDOM_STATE, eval_metric='logloss',
+                    verbosity=0),
+    'lgbm':    dict(n_estimators=200, max_depth=6, learning_rate=0.1,
+                    subsample=0.8, colsample_bytree=0.8,
+                    random_state=RANDOM_STATE, verbose=-1),
+}
+
+# ============================================================================
+# CACHING
+# ============================================================================
+
+def file_digest(path):
+    """SHA-256 of a file's contents, read in 1 MB blocks."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(*parts):
+    """Short stable hash of JSON-serialisable stage inputs."""
+    blob = json.dumps([PIPELINE_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+class StageRunner:
+    """
+    Runs pipeline stages, timing each one and reusing cached results.
+    cache_dir=None disables caching.
+
+    A stage that writes files of its own (the feature store) lists them in
+    outputs; the cached result is only reused while they still exist.
+    """
+
+    def __init__(self, cache_dir=PIPELINE_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.timings   = []         # (stage, seconds, 'cached' | 'built')
+
+    def path(self, stage, key, ext='joblib'):
+        return os.path.join(self.cache_dir, f"{stage}_{key}.{ext}")
+
+    def run(self, stage, build, key=None, outputs=()):
+        import joblib
+
+        start = time.perf_counter()
+        path  = self.path(stage, key) if self.cache_dir and key else None
+
+        if path and os.path.exists(path) and all(map(os.path.exists, outputs)):
+            result, status = joblib.load(path), 'cached'
+        else:
+            result, status = build(), 'built'
+            if path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                joblib.dump(result, path)
+
+        self.timings.append((stage, time.perf_counter() - start, status))
+        return result
+
+
+# ============================================================================
+# SPLIT + SMOTE
+# ============================================================================
+
+def split_and_balance(store_path, feature_names):
+    """
+    70 / 15 / 15 stratified split of the feature store; SMOTE on the
+    training part only.
+    """
+    from sklearn.model_selection import train_test_split
+    from imblearn.over_sampling import SMOTE
+
+    X, y = features.load_store(store_path, feature_names)
+    X = X.to_numpy()
+    X_temp, X_test, y_temp, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, stratify=y, random_state=RANDOM_STATE)
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_temp, y_temp, test_size=VAL_SIZE, stratify=y_temp,
+        random_state=RANDOM_STATE)
+
+    smote = SMOTE(random_state=RANDOM_STATE, k_neighbors=5)
+    X_train, y_train = smote.fit_resample(X_train, y_train)
+
+    return {'X_train': X_train, 'y_train': y_train,
+            'X_val':   X_val,   'y_val':   y_val,
+            'X_test':  X_test,  'y_test':  y_test}
+
+
+# ============================================================================
+# PARALLEL CV + TRAINING
+# ============================================================================
+
+def make_model(name):
+    """Fresh single-threaded estimator; parallelism comes from the task pool."""
+    if name == 'rf':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(**MODEL_PARAMS[name], n_jobs=1)
+    if name == 'xgboost':
+        from xgboost import XGBClassifier
+        return XGBClassifier(**MODEL_PARAMS[name], n_jobs=1)
+    from lightgbm import LGBMClassifier
+    return LGBMClassifier(**MODEL_PARAMS[name], n_jobs=1)
+
+
+def fit_task(name, X, y, train_idx=None, test_idx=None):
+    """
+    One unit of parallel work: a CV fold (returns its scores) or, with no
+    indexes, the final fit on the full training set (returns the model).
+    """
+    from sklearn.metrics import (recall_score, precision_score, f1_score,
+                                 roc_auc_score)
+
+    model = make_model(name)
+    if train_idx is None:
+        return model.fit(X, y)
+
+    model.fit(X[train_idx], y[train_idx])
+    proba = model.predict_proba(X[test_idx])[:, 1]
+    pred  = (proba >= 0.5).astype(int)
+    y_te  = y[test_idx]
+    return {'recall':    recall_score(y_te, pred, zero_division=0),
+            'precision': precision_score(y_te, pred, zero_division=0),
+            'f1':        f1_score(y_te, pred, zero_division=0),
+            'auc':       roc_auc_score(y_te, proba)}
+
+
+def train_models(X_train, y_train, n_jobs=-1):
+    """
+    CV folds and final fits of all three models as one parallel batch.
+    Returns (fitted models by name, per-fold CV score DataFrame).
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    cv    = StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=RANDOM_STATE)
+    folds = list(cv.split(X_train, y_train))
+
+    tasks = [(name, fold) for name in MODEL_FILES for fold in range(CV_FOLDS)]
+    tasks += [(name, None) for name in MODEL_FILES]
+
+    # Longest jobs (random forest) first keeps the cores busy to the end
+    tasks.sort(key=lambda t: t[0] != 'rf')
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(fit_task)(name, X_train, y_train,
+                          *(folds[fold] if fold is not None else ()))
+        for name, fold in tasks)
+
+    models, scores = {}, []
+    for (name, fold), res in zip(tasks, results):
+        if fold is None:
+            models[name] = res
+        else:
+            scores.append({'model': name, 'fold': fold, **res})
+    return models, pd.DataFrame(scores).sort_values(['model', 'fold'])
+
+
+# ============================================================================
+# ENSEMBLE
+# ============================================================================
+
+def triage_metrics(labels, proba, threshold):
+    """Recall, under-triage (%) and AUC at a threshold, as in Notebook 03."""
+    from sklearn.metrics import roc_auc_score
+
+    pred = proba >= threshold
+    pos  = labels == 1
+    tp   = int((pred & pos).sum())
+    fn   = int((~pred & pos).sum())
+    return {'recall':       tp / max(tp + fn, 1),
+            'under_triage': fn / max(tp + fn, 1) * 100,
+            'auc':          roc_auc_score(labels, proba)}
+
+
+def select_threshold(labels, proba, target=TARGET_RECALL):
+    """Grid threshold whose validation recall is closest to the target."""
+    recalls = [triage_metrics(labels, proba, t)['recall'] for t in THRESHOLD_GRID]
+    return float(round(THRESHOLD_GRID[int(np.argmin(np.abs(np.array(recalls) - target)))], 2))
+
+
+def build_ensemble(models, split, weights=ENSEMBLE_WEIGHTS):
+    """Ensemble config with the threshold tuned on validation, scored on test."""
+    def blend(X):
+        return sum(weights[name] * models[name].predict_proba(X)[:, 1]
+                   for name in MODEL_FILES)
+
+    val_proba  = blend(split['X_val'])
+    test_proba = blend(split['X_test'])
+    threshold  = select_threshold(split['y_val'], val_proba)
+    val        = triage_metrics(split['y_val'],  val_proba,  threshold)
+    test       = triage_metrics(split['y_test'], test_proba, threshold)
+
+    return {
+        'weights':           {k: float(v) for k, v in weights.items()},
+        'threshold':         threshold,
+        'date_saved':        datetime.now().strftime('%Y-%m-%d %H:%M'),
+        'val_recall':        round(val['recall'], 4),
+        'val_under_triage':  round(val['under_triage'], 2),
+        'test_recall':       round(test['recall'], 4),
+        'test_under_triage': round(test['under_triage'], 2),
+        'test_auc':          round(test['auc'], 4),
+    }
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def export_artifacts(out_dir, models, ensemble_config, feature_state, split):
+    """
+    Write the deployable artifact set into one directory (the layout
+    model_registry.py loads bundles from). The models and
+    ensemble_config.json mirror MODEL_DIR; feature_metadata.pkl belongs at
+    METADATA_PATH (data/features/) when a bundle is promoted. It is
+    pickled, as the utils.py loaders expect, and also carries the fitted
+    feature state, so the app computes severity rates and weather fills
+    exactly as training did.
+    """
+    feature_names = feature_state['feature_names']
+    import joblib
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, filename in MODEL_FILES.items():
+        joblib.dump(models[name], os.path.join(out_dir, filename))
+
+    with open(os.path.join(out_dir, 'ensemble_config.json'), 'w') as f:
+        json.dump(ensemble_config, f, indent=2)
+
+    feature_metadata = {
+        'feature_names':        feature_names,
+        'n_features':           len(feature_names),
+        'numeric_features':     features.NUMERIC_FEATURES,
+        'categorical_features': features.CATEGORICAL_FEATURES,
+        'n_train':              len(split['X_train']),
+        'n_val':                len(split['X_val']),
+        'n_test':               len(split['X_test']),
+        'feature_state':        feature_state,
+    }
+    with open(os.path.join(out_dir, 'feature_metadata.pkl'), 'wb') as f:
+        pickle.dump(feature_metadata, f)
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def run_pipeline(crashes_path=LABELED_CRASHES_PATH, weather_path=WEATHER_ARCHIVE_PATH,
+                 out_dir=RETRAIN_OUTPUT_DIR, cache_dir=PIPELINE_CACHE_DIR, n_jobs=-1,
+                 chunk_size=features.CHUNK_SIZE):
+    """Run every stage; returns (ensemble config, CV scores, stage timings)."""
+    runner = StageRunner(cache_dir)
+
+    use_weather  = weather_path and os.path.exists(weather_path)
+    inputs       = [file_digest(crashes_path),
+                    file_digest(weather_path) if use_weather else None]
+    features_key = cache_key('features', inputs)
+    store_path   = (runner.path('features', features_key, 'parquet') if cache_dir
+                    else os.path.join(out_dir, 'features.parquet'))
+
+    state = runner.run(
+        'features',
+        lambda: features.materialize_crashes(
+            crashes_path, store_path, weather_path if use_weather else None,
+            chunk_size),
+        features_key, outputs=[store_path])
+
+    split_key = cache_key('split', features_key, RANDOM_STATE, TEST_SIZE, VAL_SIZE)
+    split     = runner.run(
+        'split', lambda: split_and_balance(store_path, state['feature_names']),
+        split_key)
+
+    train_key = cache_key('train', split_key, MODEL_PARAMS, CV_FOLDS)
+    models, cv_scores = runner.run(
+        'train', lambda: train_models(split['X_train'], split['y_train'], n_jobs),
+        train_key)
+
+    config = runner.run('ensemble', lambda: build_ensemble(models, split))
+    runner.run('export', lambda: export_artifacts(out_dir, models, config,
+                                                  state, split))
+    return config, cv_scores, runner.timings
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Retrain the ensemble and write a deployable artifact set.")
+    parser.add_argument('--crashes', default=LABELED_CRASHES_PATH,
+                        help="Labeled crash CSV from Notebook 01")
+    parser.add_argument('--weather', default=WEATHER_ARCHIVE_PATH,
+                        help="Archived hourly weather (weather_data_raw.pkl)")
+    parser.add_argument('--out', default=RETRAIN_OUTPUT_DIR)
+    parser.add_argument('--cache-dir', default=PIPELINE_CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Rebuild every stage and write nothing to the cache")
+    parser.add_argument('--jobs', type=int, default=-1,
+                        help="Parallel fits (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=features.CHUNK_SIZE,
+                        help="Crash records featurised per chunk")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.weather):
+        print(f"No weather archive at {args.weather} — "
+              f"using weather columns from {os.path.basename(args.crashes)}")
+
+    config, cv_scores, timings = run_pipeline(
+        args.crashes, args.weather, args.out,
+        None if args.no_cache else args.cache_dir, args.jobs, args.chunk_size)
+
+    print("\nCross-validation (mean over folds, threshold 0.5):")
+    print(cv_scores.drop(columns='fold').groupby('model').mean().round(4).to_string())
+
+    print(f"\nEnsemble threshold: {config['threshold']:.2f}")
+    print(f"  Validation recall {config['val_recall']:.4f}  "
+          f"under-triage {config['val_under_triage']:.2f}%")
+    print(f"  Test recall       {config['test_recall']:.4f}  "
+          f"under-triage {config['test_under_triage']:.2f}%  "
+          f"AUC {config['test_auc']:.4f}")
+
+    print("\nStage timings:")
+    for stage, seconds, status in timings:
+        print(f"  {stage:<10} {seconds:>8.2f}s  ({status})")
+    print(f"  {'total':<10} {sum(t[1] for t in timings):>8.2f}s")
+    print(f"\nArtifacts written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Trauma Centre Travel Times — Emergency Severity Prediction System
+Mary Wangoi Mwangi (122174)
+
+get_nearest_hospital() picks the trauma centre with the smallest
+straight-line distance, which ignores the road network and traffic: across
+the Nairobi River or a highway without a crossing, the "nearest" centre can
+be the slowest to reach. This module replaces it with road travel time.
+
+  Build step (offline, once per extract):
+      python src/app/travel_time.py nairobi.osm.pbf
+    Builds a road graph from the OSM extract, runs Dijkstra from every
+    trauma centre in one call (scipy.sparse.csgraph) for each time-of-day
+    speed profile, and samples the per-centre travel time onto a grid over
+    NAIROBI_BOUNDS, saved as .npz.
+
+  Request path:
+    TravelTimeField.lookup / lookup_batch turn lat/lon into a grid cell
+    index and rank the centres stored for that cell — O(1), no graph work.
+
+Travel times are estimates from nominal speeds per road class, not live
+traffic. Roads are treated as two-way.
+"""
+
+import os, time, argparse
+import numpy as np
+
+from config import NAIROBI_HOSPITALS, TRAVEL_TIME_PATH
+from road_context import load_road_network, raster_grid, METRIC_CRS
+
+
+# Grid cell size in degrees (~220 m); travel time varies slowly in space
+GRID_RESOLUTION = 0.002
+
+# Free-flow speed per road class code (see road_context.ROAD_CLASSES)
+SPEED_KMH = np.array([20, 60, 45, 30, 20], dtype=float)
+
+# Speed for the off-network leg between a point and the nearest road node
+ACCESS_SPEED_KMH = 15
+
+# Time-of-day speed multipliers per road class code. Peak congestion hits
+# the arterials hardest; residential streets barely change.
+SPEED_PROFILES = {
+    'off_peak': np.array([1.00, 1.00, 1.00, 1.00, 1.00]),
+    'am_peak':  np.array([0.85, 0.35, 0.45, 0.60, 0.85]),
+    'pm_peak':  np.array([0.85, 0.30, 0.40, 0.55, 0.85]),
+    'night':    np.array([1.10, 1.25, 1.20, 1.15, 1.10]),
+}
+
+# Alternatives returned per lookup by default
+DEFAULT_ALTERNATIVES = 3
+
+
+def profile_for_hour(hour):
+    """
+    Speed profile name(s) for an hour or array of hours. Peak and night
+    windows match features.temporal_flags (rush hour 06-09 / 17-19,
+    night 22-04).
+    """
+    hour = np.asarray(hour)
+    names = np.select(
+        [(hour >= 6) & (hour <= 9),
+         (hour >= 17) & (hour <= 19),
+         (hour >= 22) | (hour <= 4)],
+        ['am_peak', 'pm_peak', 'night'], default='off_peak')
+    return names if names.ndim else str(names)
+
+
+# ============================================================================
+# BUILD STEP
+# ============================================================================
+
+def build_road_graph(geoms, codes):
+    """
+    Undirected road graph from projected line geometries.
+
+    Vertices are snapped to 10 cm so ways sharing an OSM node meet in one
+    graph node. Returns (node xy, edge u, edge v, edge length m, edge class).
+    """
+    import shapely
+
+    coords, idx = shapely.get_coordinates(geoms, return_index=True)
+    nodes, inverse = np.unique(np.round(coords, 1), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+
+    same   = idx[1:] == idx[:-1]                     # consecutive vertices of one way
+    u      = inverse[:-1][same]
+    v      = inverse[1:][same]
+    length = np.hypot(*(coords[1:] - coords[:-1])[same].T)
+    cls    = codes[idx[:-1][same]]
+
+    keep = u != v
+    return nodes, u[keep], v[keep], length[keep], cls[keep]
+
+
+def graph_for_profile(n_nodes, u, v, length, cls, multipliers):
+    """
+    Sparse travel-time graph (seconds) for one speed profile.
+    Parallel edges between the same node pair keep the fastest one —
+    csr_matrix would otherwise sum them.
+    """
+    from scipy.sparse import csr_matrix
+
+    seconds = np.maximum(length, 0.1) / (SPEED_KMH[cls] * multipliers[cls] / 3.6)
+    a, b    = np.minimum(u, v), np.maximum(u, v)
+    order   = np.lexsort((seconds, b, a))
+    a, b, seconds = a[order], b[order], seconds[order]
+    first   = np.r_[True, (a[1:] != a[:-1]) | (b[1:] != b[:-1])]
+    return csr_matrix((seconds[first], (a[first], b[first])),
+                      shape=(n_nodes, n_nodes))
+
+
+def build_travel_times(extract_path, out_path=TRAVEL_TIME_PATH,
+                       resolution=GRID_RESOLUTION, hospitals=NAIROBI_HOSPITALS):
+    """
+    Sample travel time from every trauma centre onto the grid, for every
+    speed profile, and save it. All graph work happens here.
+    """
+    from pyproj import Transformer
+    from scipy.spatial import cKDTree
+    from scipy.sparse.csgraph import dijkstra, connected_components
+
+    timings = {}
+
+    t0 = time.perf_counter()
+    geoms, codes = load_road_network(extract_path)
+    nodes, u, v, length, cls = build_road_graph(geoms, codes)
+    timings['load'] = time.perf_counter() - t0
+
+    # Snap hospitals and grid cells to the largest connected component only,
+    # so a stray disconnected service road cannot strand a centre
+    t0 = time.perf_counter()
+    base = graph_for_profile(len(nodes), u, v, length, cls,
+                             SPEED_PROFILES['off_peak'])
+    _, labels = connected_components(base, directed=False)
+    main      = np.flatnonzero(labels == np.bincount(labels).argmax())
+    tree      = cKDTree(nodes[main])
+
+    to_metric = Transformer.from_crs('EPSG:4326', METRIC_CRS, always_xy=True)
+    hx, hy    = to_metric.transform([h['lon'] for h in hospitals],
+                                    [h['lat'] for h in hospitals])
+    h_dist, h_near = tree.query(np.column_stack([hx, hy]))
+    h_nodes   = main[h_near]
+
+    lats, lons = raster_grid(resolution=resolution)
+    grid_lon, grid_lat = np.meshgrid(lons, lats)
+    cx, cy    = to_metric.transform(grid_lon.ravel(), grid_lat.ravel())
+    c_dist, c_near = tree.query(np.column_stack([cx, cy]))
+    c_nodes   = main[c_near]
+    timings['snap'] = time.perf_counter() - t0
+
+    # One Dijkstra call per profile with every hospital as a source.
+    # Per-source rows (not min_only) are kept so alternatives can be ranked.
+    t0 = time.perf_counter()
+    access_s = 3.6 / ACCESS_SPEED_KMH
+    eta_min  = np.empty((len(SPEED_PROFILES), len(hospitals)) + grid_lat.shape,
+                        dtype=np.float32)
+    for p, multipliers in enumerate(SPEED_PROFILES.values()):
+        graph = graph_for_profile(len(nodes), u, v, length, cls, multipliers)
+        dist  = dijkstra(graph, directed=False, indices=h_nodes)
+        dist += (h_dist * access_s)[:, None]
+        eta   = dist[:, c_nodes] + c_dist * access_s
+        eta_min[p] = (eta / 60).reshape((len(hospitals),) + grid_lat.shape)
+    timings['route'] = time.perf_counter() - t0
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    np.savez_compressed(
+        out_path,
+        eta_min=eta_min,
+        hospitals=np.array([h['name'] for h in hospitals]),
+        profiles=np.array(list(SPEED_PROFILES)),
+        lat_min=lats[0] - resolution / 2,
+        lon_min=lons[0] - resolution / 2,
+        resolution=resolution,
+        source=os.path.basename(extract_path),
+    )
+    return {'nodes': len(nodes), 'edges': len(u), 'main_component': len(main),
+            'hospital_snap_m': h_dist, 'shape': grid_lat.shape,
+            'timings': timings}
+
+
+# ============================================================================
+# REQUEST-PATH LOOKUP
+# ============================================================================
+
+class TravelTimeField:
+    """
+    Precomputed per-centre travel times on a grid.
+    lookup() / lookup_batch() only compute a cell index and rank a handful
+    of stored values.
+    """
+
+    def __init__(self, eta_min, hospitals, profiles, lat_min, lon_min, resolution):
+        self.eta_min    = eta_min             # (profile, hospital, row, col)
+        self.hospitals  = np.asarray(hospitals)
+        self.profiles   = {str(p): i for i, p in enumerate(profiles)}
+        self.lat_min    = float(lat_min)
+        self.lon_min    = float(lon_min)
+        self.resolution = float(resolution)
+
+    @classmethod
+    def load(cls, path=TRAVEL_TIME_PATH):
+        with np.load(path) as z:
+            return cls(z['eta_min'], z['hospitals'], z['profiles'],
+                       z['lat_min'], z['lon_min'], z['resolution'])
+
+    def _cells(self, lat, lon):
+        """Row/col indexes and an in-grid mask for arrays of points."""
+        rows = np.floor((np.asarray(lat, dtype=float) - self.lat_min) / self.resolution).astype(int)
+        cols = np.floor((np.asarray(lon, dtype=float) - self.lon_min) / self.resolution).astype(int)
+        n_rows, n_cols = self.eta_min.shape[2:]
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        return np.clip(rows, 0, n_rows - 1), np.clip(cols, 0, n_cols - 1), inside
+
+    def lookup_batch(self, lat, lon, hour=None, k=DEFAULT_ALTERNATIVES):
+        """
+        Fastest k trauma centres for arrays of points.
+
+        hour (scalar or per-point array) selects the speed profile;
+        None uses off-peak speeds. Returns a dict of arrays: hospital and
+        eta_min, both (n, k) fastest first, and covered (False outside the
+        grid or where no centre is reachable).
+        """
+        rows, cols, inside = self._cells(lat, lon)
+        profile = profile_for_hour(12 if hour is None else hour)
+        names, inv = np.unique(profile, return_inverse=True)
+        p_idx   = np.array([self.profiles[n] for n in names])[inv.reshape(np.shape(profile))]
+        p_idx   = np.broadcast_to(p_idx, rows.shape)
+
+        eta   = self.eta_min[p_idx, :, rows, cols]          # (n, hospitals)
+        k     = min(k, eta.shape[1])
+        order = np.argsort(eta, axis=1)[:, :k]
+        best  = np.take_along_axis(eta, order, axis=1)
+        return {
+            'hospital': self.hospitals[order],
+            'eta_min':  best,
+            'covered':  inside & np.isfinite(best[:, 0]),
+        }
+
+    def lookup(self, lat, lon, hour=None, k=DEFAULT_ALTERNATIVES):
+        """
+        Fastest k trauma centres for a single point as a list of
+        {'name', 'eta_min'} dicts, or None outside the grid.
+        """
+        res = self.lookup_batch([lat], [lon], hour, k)
+        if not res['covered'][0]:
+            return None
+        return [{'name': str(name), 'eta_min': float(eta)}
+                for name, eta in zip(res['hospital'][0], res['eta_min'][0])
+                if np.isfinite(eta)]
+
+
+def load_travel_times(path=TRAVEL_TIME_PATH):
+    """TravelTimeField if the grid has been built, else None (straight-line fallback)."""
+    return TravelTimeField.load(path) if os.path.exists(path) else None
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the trauma centre travel-time grid from a local OSM extract.")
+    parser.add_argument('extract', help="OSM extract (.osm.pbf, .gpkg, .geojson, ...)")
+    parser.add_argument('--out', default=TRAVEL_TIME_PATH)
+    parser.add_argument('--resolution', type=float, default=GRID_RESOLUTION,
+                        help="Cell size in degrees (default 0.002 ~ 220 m)")
+    args = parser.parse_args()
+
+    info = build_travel_times(args.extract, args.out, args.resolution)
+    t    = info['timings']
+    print(f"Graph: {info['nodes']:,} nodes, {info['edges']:,} edges "
+          f"({info['main_component']:,} in main component)")
+    for h, d in zip(NAIROBI_HOSPITALS, info['hospital_snap_m']):
+        if d > 500:
+            print(f"  warning: {h['name']} is {d:.0f} m from the road network")
+    print(f"Grid: {info['shape'][0]} x {info['shape'][1]} x "
+          f"{len(NAIROBI_HOSPITALS)} centres x {len(SPEED_PROFILES)} profiles")
+    print(f"Load {t['load']:.1f}s | Snap {t['snap']:.1f}s | Route {t['route']:.1f}s")
+    print(f"Saved to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,9 @@
 Utility Functions — Emergency Severity Prediction System
 Mary Wangoi Mwangi (122174) 
 
-All feature engineering here mirrors Notebook 02 exactly.
-Any divergence would cause silent prediction errors at inference time.
+Feature transforms live in features.py and are shared with the retraining
+pipeline; this module only assembles inference-time raw records
+(location, time, live weather) and hands them to features.transform.
 """
 
 import os, pickle, json
@@ -12,6 +13,8 @@ import pandas as pd
 from datetime import datetime
 import requests
 
+import features
+
 
 # ============================================================================
 # MODEL LOADING
@@ -45,7 +48,14 @@ def load_ensemble_models(rf_path, xgb_path, lgbm_path,
 # WEATHER DATA
 # ============================================================================
 
-def get_weather_data(lat, lon):
+# Forecast endpoint; set OPEN_METEO_URL to point the app at a stand-in
+# (e.g. the local fake server in loadtest.py)
+OPEN_METEO_URL    = os.environ.get('OPEN_METEO_URL',
+                                   'https://api.open-meteo.com/v1/forecast')
+WEATHER_TIMEOUT_S = 5
+
+
+def get_weather_data(lat, lon, base_url=None, timeout=WEATHER_TIMEOUT_S):
     """
     Fetch current weather from Open-Meteo API (free, no key required).
     Uses the same API and variables as training — ensures consistency.
@@ -53,14 +63,14 @@ def get_weather_data(lat, lon):
     """
     try:
         url = (
-            f"https://api.open-meteo.com/v1/forecast?"
+            f"{base_url or OPEN_METEO_URL}?"
             f"latitude={lat}&longitude={lon}"
             f"&current=temperature_2m,precipitation,"
             f"wind_speed_10m,relative_humidity_2m,"
             f"surface_pressure,weather_code"
             f"&timezone=Africa/Nairobi"
         )
-        r = requests.get(url, timeout=5)
+        r = requests.get(url, timeout=timeout)
         if r.status_code != 200:
             return None
 
@@ -101,21 +111,20 @@ def default_weather():
 
 def extract_temporal_features(dt):
     """
-    Extract temporal fields matching those computed in Notebook 02.
-    Temporal features were the strongest predictor category (51.4% importance).
-    Rush hour and night flags capture severity patterns found in EDA.
+    Temporal fields for display, from the same definitions the model
+    features use (features.temporal_flags).
     """
-    hour = dt.hour
-    dow  = dt.weekday()  # 0 = Monday, 6 = Sunday
+    dow   = dt.weekday()  # 0 = Monday, 6 = Sunday
+    flags = features.temporal_flags(dt.hour, dow)
 
     return {
-        'hour':         hour,
+        'hour':         dt.hour,
         'day_of_week':  dow,
         'month':        dt.month,
         'year':         dt.year,
-        'is_weekend':   1 if dow >= 5 else 0,
-        'is_rush_hour': 1 if (7 <= hour <= 9) or (17 <= hour <= 19) else 0,
-        'is_night':     1 if (hour >= 22 or hour <= 5) else 0,
+        'is_weekend':   int(flags['is_weekend']),
+        'is_rush_hour': int(flags['is_rush_hour']),
+        'is_night':     int(flags['is_night']),
     }
 
 
@@ -125,153 +134,83 @@ def extract_temporal_features(dt):
 
 def get_distance_from_cbd(lat, lon):
     """Distance (km) from Nairobi CBD (City Hall)."""
-    R            = 6371.0
-    cbd_lat, cbd_lon = -1.286389, 36.817223
-    dlat = np.radians(lat - cbd_lat)
-    dlon = np.radians(lon - cbd_lon)
-    a    = (np.sin(dlat/2)**2 +
-            np.cos(np.radians(cbd_lat)) *
-            np.cos(np.radians(lat))     *
-            np.sin(dlon/2)**2)
-    return R * 2 * np.arcsin(np.sqrt(a))
+    return features.cbd_distance_km(lat, lon)
 
 
 def get_geographic_zone(dist_km):
     """Map CBD distance to the four training-set zone categories."""
-    if dist_km <= 3:    return 'CBD_CORE'
-    elif dist_km <= 8:  return 'INNER_SUBURBS'
-    elif dist_km <= 15: return 'OUTER_SUBURBS'
-    else:               return 'PERIPHERAL'
+    return str(features.geographic_zone(dist_km))
 
 
-def get_road_type(lat, lon):
+# ============================================================================
+# FEATURE VECTOR BUILDERS
+# ============================================================================
+
+# Weather dict keys as returned by get_weather_data / default_weather
+WEATHER_KEYS = ['temperature', 'precipitation', 'wind_speed', 'humidity',
+                'pressure', 'weather_code', 'is_raining', 'is_adverse']
+
+
+def load_feature_state(metadata_path):
     """
-    Proxy road type from CBD distance.
-    Used because Ma3Route data does not include road classification directly.
+    Fitted feature statistics (severity-rate tables, weather fills) saved
+    by the retraining pipeline, or None for notebook-era metadata.
     """
-    dist = get_distance_from_cbd(lat, lon)
-    if dist <= 2:    return 'MAIN_ROAD'
-    elif dist <= 5:  return 'MAJOR_HIGHWAY'
-    elif dist <= 12: return 'SECONDARY_ROAD'
-    else:            return 'RESIDENTIAL'
+    with open(metadata_path, 'rb') as f:
+        return pickle.load(f).get('feature_state')
 
 
-def get_location_risk(lat, lon):
+def inference_records(incidents):
     """
-    Assign risk category from CBD proximity.
-    CBD and inner-suburb locations had higher severe crash rates in training data.
+    Raw records (features.py schema) for incidents at dispatch time.
+
+    Crash history at the location is unknown, so no history columns are
+    set: features.transform fills them from the feature state and derives
+    road type, intersection and risk category from the same values, as in
+    training. The OSM road_context raster is not used here either — the
+    models learned road type from crash volume, not mapped road class.
+    """
+    defaults = default_weather()
+    records  = pd.DataFrame({
+        'latitude':  incidents['latitude'].to_numpy(dtype=float),
+        'longitude': incidents['longitude'].to_numpy(dtype=float),
+        'datetime':  pd.to_datetime(incidents['datetime']).to_numpy(),
+    }, index=incidents.index)
+    for key in features.WEATHER_FEATURES:
+        records[key] = (incidents[key].to_numpy() if key in incidents.columns
+                        else defaults[key])
+    return records
+
+
+def prepare_features_batch(incidents, feature_names, feature_state=None):
     """
-    dist = get_distance_from_cbd(lat, lon)
-    if dist <= 2:    return 'HIGH_RISK'
-    elif dist <= 5:  return 'MEDIUM_RISK'
-    else:            return 'LOW_RISK'
+    Feature matrix for many incidents at once.
 
+    incidents is a DataFrame with 'latitude', 'longitude', 'datetime' and
+    the weather columns (missing ones fall back to default_weather).
+    Columns follow feature_names from feature_metadata.pkl.
+    """
+    records = inference_records(incidents)
+    return features.transform(records, feature_state, feature_names)
 
-# ============================================================================
-# FEATURE VECTOR BUILDER
-# ============================================================================
 
-def prepare_features(lat, lon, dt, weather, feature_names):
+def prepare_features(lat, lon, dt, weather, feature_names, feature_state=None):
     """
-    Build the exact 44-feature vector the ensemble was trained on.
-
-    This is the inference-time mirror of the Notebook 02 pipeline.
-    Features requiring the full dataset (e.g. hour_severity_rate) use
-    training-set global medians — a known limitation; production would
-    replace these with live database lookups.
+    Feature vector for a single incident — a one-row prepare_features_batch.
 
-    Column order is enforced at the end using feature_names from
-    feature_metadata.pkl to prevent train/inference mismatch.
+    Without feature_state (metadata saved by the notebooks) the historical
+    severity rates fall back to training-set medians; metadata written by
+    train_pipeline.py carries the full hour / weekday / month tables.
     """
-    t    = extract_temporal_features(dt)
-    dist = get_distance_from_cbd(lat, lon)
-    zone = get_geographic_zone(dist)
-    road = get_road_type(lat, lon)
-    risk = get_location_risk(lat, lon)
-    w    = weather if weather else default_weather()
-
-    # Risk interaction flags from feature engineering
-    dangerous_time  = 1 if t['is_rush_hour'] or t['is_night'] else 0
-    high_risk_loc   = 1 if risk in ('HIGH_RISK', 'VERY_HIGH_RISK') else 0
-    high_risk_combo = 1 if (high_risk_loc and dangerous_time) else 0
-
-    # Historical severity rates — global training-set medians as defaults
-    MEDIAN_HOUR_RATE  = 0.118
-    MEDIAN_DAY_RATE   = 0.122
-    MEDIAN_MONTH_RATE = 0.120
-    MEDIAN_CRASH_LOC  = 3.0
-    HIGH_RATE_LOC     = 0.0
-
-    daylight     = 'DAYLIGHT' if (6 <= dt.hour <= 18) else 'DARKNESS'
-    weather_cond = 'RAIN' if w['is_raining'] else 'CLEAR'
-
-    raw = {
-        # Raw location
-        'latitude':    lat,
-        'longitude':   lon,
-        # Temporal
-        'hour':                     t['hour'],
-        'day_of_week':              t['day_of_week'],
-        'month':                    t['month'],
-        'year':                     t['year'],
-        'is_weekend':               t['is_weekend'],
-        'is_night':                 t['is_night'],
-        'is_rush_hour':             t['is_rush_hour'],
-        # Historical rates (medians — top features by importance)
-        'hour_severity_rate':       MEDIAN_HOUR_RATE,
-        'day_severity_rate':        MEDIAN_DAY_RATE,
-        'month_severity_rate':      MEDIAN_MONTH_RATE,
-        # Location risk
-        'crashes_at_location':      MEDIAN_CRASH_LOC,
-        'high_rate_at_location':    HIGH_RATE_LOC,
-        'high_risk_location':       high_risk_loc,
-        'dangerous_time':           dangerous_time,
-        'high_risk_location_dangerous_time': high_risk_combo,
-        # Real-time weather from Open-Meteo API
-        'actual_temperature_c':     w['temperature'],
-        'actual_precipitation_mm':  w['precipitation'],
-        'actual_wind_speed_kmh':    w['wind_speed'],
-        'actual_humidity_percent':  w['humidity'],
-        'actual_pressure_hpa':      w['pressure'],
-        'weather_code':             w['weather_code'],
-        'is_adverse_weather':       int(w['is_adverse']),
-        # Infrastructure proxies
-        'likely_intersection':      0,
-        'high_speed_road':          1 if road == 'MAJOR_HIGHWAY' else 0,
-        'distance_from_cbd_km':     dist,
-        'high_risk_infrastructure': high_risk_loc,
-        # One-hot: location risk category
-        'location_risk_category_LOW_RISK':       1 if risk == 'LOW_RISK'       else 0,
-        'location_risk_category_MEDIUM_RISK':    1 if risk == 'MEDIUM_RISK'    else 0,
-        'location_risk_category_HIGH_RISK':      1 if risk == 'HIGH_RISK'      else 0,
-        'location_risk_category_VERY_HIGH_RISK': 1 if risk == 'VERY_HIGH_RISK' else 0,
-        # One-hot: daylight status
-        'daylight_status_DARKNESS': 1 if daylight == 'DARKNESS' else 0,
-        'daylight_status_DAYLIGHT': 1 if daylight == 'DAYLIGHT' else 0,
-        # One-hot: weather condition
-        'weather_condition_CLEAR':  1 if weather_cond == 'CLEAR' else 0,
-        'weather_condition_RAIN':   1 if weather_cond == 'RAIN'  else 0,
-        # One-hot: road type proxy
-        'road_type_proxy_MAIN_ROAD':       1 if road == 'MAIN_ROAD'       else 0,
-        'road_type_proxy_MAJOR_HIGHWAY':   1 if road == 'MAJOR_HIGHWAY'   else 0,
-        'road_type_proxy_RESIDENTIAL':     1 if road == 'RESIDENTIAL'     else 0,
-        'road_type_proxy_SECONDARY_ROAD':  1 if road == 'SECONDARY_ROAD'  else 0,
-        # One-hot: geographic zone
-        'geographic_zone_CBD_CORE':       1 if zone == 'CBD_CORE'       else 0,
-        'geographic_zone_INNER_SUBURBS':  1 if zone == 'INNER_SUBURBS'  else 0,
-        'geographic_zone_OUTER_SUBURBS':  1 if zone == 'OUTER_SUBURBS'  else 0,
-        'geographic_zone_PERIPHERAL':     1 if zone == 'PERIPHERAL'     else 0,
-    }
+    return prepare_features_batch(incident_frame(lat, lon, dt, weather),
+                                  feature_names, feature_state)
 
-    df = pd.DataFrame([raw])
 
-    # Enforce exact column order from training — prevents silent misalignment
-    for col in feature_names:
-        if col not in df.columns:
-            df[col] = 0
-    df = df[feature_names]
-
-    return df
+def incident_frame(lat, lon, dt, weather):
+    """One-row incidents DataFrame (prepare_features_batch input)."""
+    w = weather if weather else default_weather()
+    return pd.DataFrame([{'latitude': lat, 'longitude': lon, 'datetime': dt,
+                          **{k: w[k] for k in features.WEATHER_FEATURES}}])
 
 
 # ============================================================================
@@ -307,6 +246,33 @@ def ensemble_predict(rf, xgb, lgbm, features_df, weights, threshold):
     }
 
 
+def ensemble_predict_batch(rf, xgb, lgbm, features_df, weights, threshold):
+    """
+    ensemble_predict for a whole feature matrix: one predict_proba call
+    per model instead of one per incident. Returns a DataFrame aligned
+    with features_df.
+    """
+    rf_p   = rf.predict_proba(features_df)[:, 1]
+    xgb_p  = xgb.predict_proba(features_df)[:, 1]
+    lgbm_p = lgbm.predict_proba(features_df)[:, 1]
+
+    ensemble_p = (weights['rf']      * rf_p  +
+                  weights['xgboost'] * xgb_p +
+                  weights['lgbm']    * lgbm_p)
+
+    prediction = (ensemble_p >= threshold).astype(int)
+
+    return pd.DataFrame({
+        'prediction':  prediction,
+        'probability': ensemble_p,
+        'rf_prob':     rf_p,
+        'xgb_prob':    xgb_p,
+        'lgbm_prob':   lgbm_p,
+        'confidence':  np.where(prediction == 1, ensemble_p,
+                                1 - ensemble_p) * 100,
+    }, index=features_df.index)
+
+
 # ============================================================================
 # FEATURE IMPORTANCE
 # ============================================================================
@@ -0,0 +1,10 @@
+"""
+Shared pytest setup. The app modules import each other by bare name
+(`from config import ...`), as Streamlit runs them from src/app, so the
+tests put that directory on sys.path the same way.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src' / 'app'))
@@ -0,0 +1,165 @@
+"""Tests for the admission scheduler's modes, queues and deadlines (admission.py)."""
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from admission import AdmissionScheduler, Overloaded, MODES, MODE_DESCRIPTIONS
+from utils import default_weather
+
+
+FEATURES = ['hour', 'temperature']
+WEIGHTS  = {'rf': 0.25, 'xgboost': 0.25, 'lgbm': 0.5}
+DT       = datetime(2024, 3, 1, 8, 0)
+
+
+class ConstantModel:
+    """Stand-in classifier returning one probability for every row."""
+
+    def __init__(self, p):
+        self.p = p
+
+    def predict_proba(self, X):
+        return np.tile([1 - self.p, self.p], (len(X), 1))
+
+
+class ConstantLookup:
+    def lookup(self, lat, lon, dt):
+        return {'prediction': 0, 'probability': 0.05, 'confidence': 95.0}
+
+
+class RecordingWeather:
+    """fetch_weather stand-in recording the timeout it was given."""
+
+    def __init__(self, weather=None):
+        self.weather  = weather
+        self.timeouts = []
+
+    def __call__(self, lat, lon, timeout):
+        self.timeouts.append(timeout)
+        return self.weather
+
+
+def scheduler(fetch_weather=None, lookup=None, **kwargs):
+    models = (ConstantModel(0.2), ConstantModel(0.4), ConstantModel(0.8))
+    return AdmissionScheduler(models, FEATURES, WEIGHTS, 0.5, lookup=lookup,
+                              fetch_weather=fetch_weather or RecordingWeather(),
+                              **kwargs)
+
+
+def request(sched, priority='urgent', weather=None):
+    now = time.monotonic()
+    return {'lat': -1.2864, 'lon': 36.8172, 'dt': DT, 'priority': priority,
+            'weather': weather, 'submitted': now,
+            'deadline': now + sched.deadlines[priority]}
+
+
+@pytest.mark.parametrize('fill, with_lookup, expected', [
+    (0.0, True,  'full'),
+    (0.3, True,  'cached_weather'),
+    (0.6, True,  'reduced_models'),
+    (0.9, True,  'lookup'),
+    (0.9, False, 'reduced_models'),     # no lookup: reduced is the floor
+])
+def test_choose_mode_steps_down_with_queue_fill(fill, with_lookup, expected):
+    sched = scheduler(lookup=ConstantLookup() if with_lookup else None)
+    assert sched.choose_mode(slack=10.0, fill=fill) == expected
+
+
+def test_choose_mode_skips_modes_too_slow_for_the_slack():
+    sched = scheduler(lookup=ConstantLookup())
+    sched.cost.update({'full': 3.0, 'cached_weather': 0.5})
+    assert sched.choose_mode(slack=1.0, fill=0.0) == 'cached_weather'
+    assert sched.cost['full'] < 3.0         # decayed so it is retried later
+
+
+def test_submit_requires_a_running_scheduler():
+    sched = scheduler()
+    with pytest.raises(RuntimeError):
+        sched.submit(-1.2864, 36.8172, DT)
+    with sched:
+        pass
+    with pytest.raises(RuntimeError):
+        sched.submit(-1.2864, 36.8172, DT)
+
+
+def test_full_queue_without_lookup_is_overloaded():
+    sched = scheduler(workers=0, limits={'urgent': 1}).start()
+    sched.submit(-1.2864, 36.8172, DT)
+    with pytest.raises(Overloaded):
+        sched.submit(-1.2864, 36.8172, DT)
+    assert sched.stats()['rejected'] == 1
+
+
+def test_full_queue_with_lookup_answers_from_the_table():
+    sched = scheduler(lookup=ConstantLookup(), workers=0,
+                      limits={'urgent': 1}).start()
+    sched.submit(-1.2864, 36.8172, DT)
+    result = sched.submit(-1.2864, 36.8172, DT).result(timeout=1)
+    assert result['mode'] == 'lookup'
+    assert result['probability'] == 0.05
+    assert result['weather_source'] is None
+
+
+def test_queue_serves_closest_deadline_first():
+    sched = scheduler(workers=0, limits=dict.fromkeys(['critical', 'urgent', 'routine'], 4))
+    sched.start()
+    for priority in ('routine', 'urgent', 'critical', 'urgent'):
+        sched.submit(-1.2864, 36.8172, DT, priority=priority)
+    order = [r['priority'] for _, _, r in sorted(sched._heap)]
+    assert order == ['critical', 'urgent', 'urgent', 'routine']
+
+
+def test_served_request_reports_mode_and_deadline():
+    weather = {**default_weather(), 'temperature': 25.0}
+    with scheduler(RecordingWeather(weather)) as sched:
+        result = sched.predict(-1.2864, 36.8172, DT)
+    assert result['mode'] == 'full'
+    assert result['weather_source'] == 'live'
+    assert result['deadline_met']
+    assert result['probability'] == pytest.approx(0.25 * 0.2 + 0.25 * 0.4 + 0.5 * 0.8)
+    assert sched.stats()['full'] == 1
+
+
+def test_weather_timeout_is_capped_by_setting_and_deadline():
+    fetch = RecordingWeather(default_weather())
+    sched = scheduler(fetch, weather_timeout=0.3)
+    sched._score(request(sched), 'full')
+    assert fetch.timeouts[-1] == pytest.approx(0.3)
+
+    late = {**request(sched), 'deadline': time.monotonic() + 0.05}
+    sched._score(late, 'full')
+    assert fetch.timeouts[-1] == pytest.approx(0.1)     # floor, not negative
+
+
+def test_weather_sources_caller_live_cached_default():
+    live  = {**default_weather(), 'temperature': 25.0}
+    fetch = RecordingWeather()
+    sched = scheduler(fetch)
+
+    assert sched._score(request(sched), 'cached_weather')['weather_source'] == 'default'
+    assert sched._score(request(sched), 'full')['weather_source'] == 'default'
+
+    fetch.weather = live
+    assert sched._score(request(sched), 'full')['weather_source'] == 'live'
+    cached = sched._score(request(sched), 'cached_weather')
+    assert cached['weather_source'] == 'cached' and cached['weather'] == live
+    assert len(fetch.timeouts) == 2                     # cached mode never fetches
+
+    caller = sched._score(request(sched, weather=live), 'full')
+    assert caller['weather_source'] == 'caller'
+    assert len(fetch.timeouts) == 2
+
+
+def test_reduced_models_mode_uses_only_the_reduced_set():
+    sched  = scheduler(reduced_models=['xgboost'])
+    result = sched._score(request(sched), 'reduced_models')
+    assert result['probability'] == pytest.approx(0.4)
+    assert result['rf_prob'] is None and result['lgbm_prob'] is None
+    assert result['prediction'] == 0
+
+
+def test_every_mode_is_described():
+    assert set(MODE_DESCRIPTIONS) == set(MODES)
@@ -0,0 +1,57 @@
+"""Tests for the dispatch board's queue and weather refresh (dispatch_board.py)."""
+
+import threading
+import time
+from datetime import datetime
+
+from dispatch_board import DispatchBoard
+from utils import default_weather
+
+
+DT = datetime(2024, 3, 1, 8, 0)
+
+
+def board_with(points):
+    board = DispatchBoard(None, None, None, [], {}, 0.5)
+    ids = [board.add_incident(lat, lon, DT, default_weather()) for lat, lon in points]
+    board._dirty.clear()
+    return board, ids
+
+
+def test_refresh_fetches_each_cell_once_and_marks_changes():
+    board, ids = board_with([(-1.28, 36.82), (-1.28, 36.82), (-1.30, 36.80)])
+    calls = []
+
+    def fetch(lat, lon):
+        calls.append((lat, lon))
+        return {**default_weather(), 'temperature': 30.0} if lat == -1.28 else default_weather()
+
+    assert board.refresh_weather(fetch) == (2, 0)
+    assert sorted(calls) == [(-1.3, 36.8), (-1.28, 36.82)]
+    assert board._dirty == {ids[0], ids[1]}
+    assert board._incidents[ids[0]]['temperature'] == 30.0
+
+
+def test_refresh_runs_cells_in_parallel_within_budget():
+    board, ids = board_with([(-1.20 - i / 100, 36.80) for i in range(6)])
+    release = threading.Event()
+
+    def fetch(lat, lon):
+        if lat <= -1.24:
+            release.wait(5)                         # hangs past the budget
+        if lat == -1.21:
+            raise OSError("connection reset")
+        return {**default_weather(), 'precipitation': 2.0}
+
+    start = time.perf_counter()
+    changed, missed = board.refresh_weather(fetch, workers=6, budget_s=0.3)
+    release.set()
+    assert time.perf_counter() - start < 1.0
+    assert (changed, missed) == (3, 3)              # 2 hung, 1 failed
+    assert board._incidents[ids[1]]['precipitation'] == 0.0
+    assert all(board._incidents[i]['precipitation'] == 2.0 for i in (ids[0], ids[2], ids[3]))
+
+
+def test_refresh_of_empty_board():
+    board, _ = board_with([])
+    assert board.refresh_weather(lambda lat, lon: None) == (0, 0)
@@ -0,0 +1,67 @@
+"""Tests for chunked feature materialisation (features.py)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import (WEATHER_FEATURES, fit_state, load_store, materialize,
+                      read_crash_chunks, transform)
+
+
+@pytest.fixture
+def crashes_csv(tmp_path):
+    """Small labelled crash CSV in the Notebook 02 export layout."""
+    rng = np.random.default_rng(0)
+    n   = 103
+    df  = pd.DataFrame({
+        'crash_datetime':          pd.Timestamp('2023-01-01')
+                                   + pd.to_timedelta(rng.integers(0, 365 * 24, n), unit='h'),
+        'latitude':                -1.29 + rng.normal(0, 0.05, n),
+        'longitude':               36.82 + rng.normal(0, 0.05, n),
+        'crashes_at_location':     rng.integers(1, 12, n),
+        'high_rate_at_location':   rng.uniform(0, 40, n).round(1),
+        'actual_temperature_c':    rng.normal(20, 3, n).round(1),
+        'actual_precipitation_mm': rng.exponential(0.5, n).round(1),
+        'actual_wind_speed_kmh':   rng.uniform(0, 25, n).round(1),
+        'actual_humidity_percent': rng.uniform(40, 95, n).round(0),
+        'actual_pressure_hpa':     rng.normal(840, 2, n).round(1),
+        'weather_code':            rng.choice([0, 1, 3, 45, 61, 95], n),
+        'severity_binary':         np.where(rng.random(n) < 0.15, 'HIGH', 'LOW'),
+    })
+    df.loc[::11, 'actual_temperature_c'] = np.nan
+    path = tmp_path / 'crashes.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_fit_state_does_not_depend_on_chunk_size(crashes_csv):
+    whole   = fit_state(read_crash_chunks(crashes_csv, chunk_size=10_000))
+    chunked = fit_state(read_crash_chunks(crashes_csv, chunk_size=9))
+    assert chunked['feature_names'] == whole['feature_names']
+    assert chunked['weather_fill'] == whole['weather_fill']
+    for kind in ('hour', 'day', 'month'):
+        assert chunked['rates'][kind] == pytest.approx(whole['rates'][kind])
+    assert chunked['n_rows'] == whole['n_rows'] == 103
+
+
+def test_weather_fill_matches_pandas(crashes_csv):
+    state = fit_state(read_crash_chunks(crashes_csv, chunk_size=9))
+    raw   = next(read_crash_chunks(crashes_csv, chunk_size=10_000))
+    for key in WEATHER_FEATURES:
+        if key not in ('precipitation', 'weather_code'):
+            assert state['weather_fill'][key] == pytest.approx(raw[key].median())
+    assert state['weather_fill']['weather_code'] == raw['weather_code'].mode().min()
+
+
+def test_chunked_store_matches_full_transform(crashes_csv, tmp_path):
+    state = fit_state(read_crash_chunks(crashes_csv, chunk_size=9))
+    out   = str(tmp_path / 'store' / 'features.parquet')
+    assert materialize(read_crash_chunks(crashes_csv, chunk_size=9), out, state) == 103
+
+    X, y = load_store(out)
+    raw  = next(read_crash_chunks(crashes_csv, chunk_size=10_000))
+    pd.testing.assert_frame_equal(X, transform(raw, state).reset_index(drop=True))
+    np.testing.assert_array_equal(y, raw['severity_binary'].eq('HIGH').astype(np.int8))
+
+    X_sub, _ = load_store(out, columns=state['feature_names'][:3])
+    assert list(X_sub.columns) == state['feature_names'][:3]
@@ -0,0 +1,134 @@
+"""Tests for multi-caller incident merging (incident_merge.py)."""
+
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from incident_merge import (IncidentIndex, M_PER_DEG_LAT, merge_reports,
+                            score_reports)
+from dispatch_board import DispatchBoard
+
+
+T0  = datetime(2024, 3, 1, 8, 0)
+LAT = -1.2864
+LON = 36.8172
+
+
+def north(metres):
+    return LAT + metres / M_PER_DEG_LAT
+
+
+def test_report_within_radius_and_window_merges():
+    index = IncidentIndex(250, 30)
+    index.add(1, LAT, LON, T0)
+    assert index.match(north(200), LON, T0 + timedelta(minutes=20)) == 1
+
+
+@pytest.mark.parametrize('lat, minutes', [
+    (north(300), 5),        # too far
+    (north(50), 45),        # too late
+])
+def test_report_outside_radius_or_window_starts_new_incident(lat, minutes):
+    index = IncidentIndex(250, 30)
+    index.add(1, LAT, LON, T0)
+    assert index.match(lat, LON, T0 + timedelta(minutes=minutes)) is None
+
+
+def test_match_picks_closest_open_incident():
+    index = IncidentIndex(250, 30)
+    index.add(1, LAT, LON, T0)
+    index.add(2, north(300), LON, T0)
+    assert index.match(north(200), LON, T0) == 2
+    assert index.match(north(100), LON, T0) == 1
+
+
+def test_neighbour_probing_matches_brute_force():
+    """Bucket probing finds exactly what a scan of every incident finds."""
+    rng   = random.Random(0)
+    index = IncidentIndex(250, 30)
+    for incident_id in range(1, 201):
+        index.add(incident_id, LAT + rng.uniform(-0.02, 0.02),
+                  LON + rng.uniform(-0.02, 0.02),
+                  T0 + timedelta(minutes=rng.uniform(0, 240)))
+
+    for _ in range(500):
+        lat = LAT + rng.uniform(-0.02, 0.02)
+        lon = LON + rng.uniform(-0.02, 0.02)
+        dt  = T0 + timedelta(minutes=rng.uniform(0, 240))
+        candidates = [
+            (index._distance_m(lat, lon, e), i) for i, e in index._entries.items()
+            if e['first_seen'] - index.window <= dt <= e['last_seen'] + index.window
+        ]
+        in_range = [c for c in candidates if c[0] <= index.radius_m]
+        expected = min(in_range)[1] if in_range else None
+        assert index.match(lat, lon, dt) == expected
+
+
+def test_add_moves_centroid_and_counts_reports():
+    index = IncidentIndex(250, 30)
+    assert index.add(1, LAT, LON, T0) == 1
+    assert index.add(1, north(100), LON, T0 + timedelta(minutes=10)) == 2
+    assert index.n_reports(1) == 2
+    assert index._entries[1]['latitude'] == pytest.approx(north(50))
+    # Window now runs from the latest report
+    assert index.match(LAT, LON, T0 + timedelta(minutes=35)) == 1
+
+
+def test_remove_and_expire():
+    index = IncidentIndex(250, 30)
+    index.add(1, LAT, LON, T0)
+    index.add(2, north(1000), LON, T0 + timedelta(minutes=20))
+    assert index.expire(T0 + timedelta(minutes=40)) == [1]
+    assert 1 not in index and 2 in index
+    index.remove(2)
+    index.remove(2)
+    assert len(index) == 0 and not index._buckets
+
+
+def test_merge_reports_groups_and_counts():
+    reports = pd.DataFrame({
+        'latitude':  [LAT, north(1000), north(100), LAT],
+        'longitude': [LON] * 4,
+        'datetime':  [T0, T0, T0 + timedelta(minutes=5), T0 + timedelta(hours=3)],
+        'temperature': [20.0, 21.0, 22.0, 23.0],
+    })
+    linked, incidents = merge_reports(reports, 250, 30)
+    assert list(linked['incident_id']) == [1, 2, 1, 3]
+    assert list(incidents['n_reports']) == [2, 1, 1]
+    assert incidents.loc[1, 'latitude'] == pytest.approx(north(50))
+    assert incidents.loc[1, 'datetime'] == T0
+    assert incidents.loc[1, 'temperature'] == 20.0       # first report's weather
+
+
+def test_score_reports_scores_each_incident_once():
+    reports = pd.DataFrame({
+        'latitude':  [LAT, north(100), north(1000)],
+        'longitude': [LON] * 3,
+        'datetime':  [T0, T0 + timedelta(minutes=1), T0],
+    })
+    seen = []
+
+    def score(incidents):
+        seen.append(len(incidents))
+        return pd.DataFrame({'probability': [0.9, 0.1]})
+
+    scored = score_reports(reports, score, 250, 30)
+    assert seen == [2]
+    assert list(scored['probability']) == [0.9, 0.9, 0.1]
+    assert list(scored['n_reports']) == [2, 2, 1]
+
+
+def test_board_expires_on_report_time_not_wall_clock():
+    """A back-dated report still takes a second caller after a rerun."""
+    board = DispatchBoard(None, None, None, [], {}, 0.5,
+                          merge_index=IncidentIndex(250, 30))
+    first = board.add_incident(LAT, LON, T0)
+    assert board.expire_merges() == 0
+    assert board.add_incident(north(50), LON, T0 + timedelta(minutes=5)) == first
+    assert board.n_reports(first) == 2
+
+    board.add_incident(north(5000), LON, T0 + timedelta(hours=2))
+    assert board.expire_merges() == 1
+    assert board.open_incident_for(LAT, LON, T0 + timedelta(minutes=10)) is None
@@ -0,0 +1,85 @@
+"""Tests for road context raster lookups (road_context.py)."""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from road_context import RoadContext, load_road_context, NO_ROAD_LABEL
+from dispatch_board import DispatchBoard
+
+
+# 2 x 2 raster of 0.01 degree cells from (-1.30, 36.80):
+#   row 0:  off network        | MAIN_ROAD 10 m, junction 20 m
+#   row 1:  RESIDENTIAL 40 m   | code 0 with a (stale) finite distance
+ROAD_CLASS = np.array([[0, 2], [4, 0]], dtype=np.uint8)
+ROAD_DIST  = np.array([[np.inf, 10], [40, 80]], dtype=np.float32)
+JUNC_DIST  = np.array([[np.inf, 20], [np.inf, np.inf]], dtype=np.float32)
+
+OFF_ROAD    = (-1.295, 36.805)
+MAIN_ROAD   = (-1.295, 36.815)
+RESIDENTIAL = (-1.285, 36.805)
+CODE_ZERO   = (-1.285, 36.815)
+OUTSIDE     = (-1.250, 36.805)
+
+
+@pytest.fixture
+def roads():
+    return RoadContext(ROAD_CLASS, ROAD_DIST, JUNC_DIST, -1.30, 36.80, 0.01)
+
+
+def test_lookup_on_road(roads):
+    assert roads.lookup(*MAIN_ROAD) == {'road_type': 'MAIN_ROAD', 'road_dist_m': 10.0,
+                                        'likely_intersection': 1}
+    assert roads.lookup(*RESIDENTIAL) == {'road_type': 'RESIDENTIAL', 'road_dist_m': 40.0,
+                                          'likely_intersection': 0}
+
+
+@pytest.mark.parametrize('point', [OFF_ROAD, CODE_ZERO])
+def test_lookup_off_network_has_no_road(roads, point):
+    assert roads.lookup(*point) == {'road_type': None, 'road_dist_m': None,
+                                    'likely_intersection': 0}
+
+
+@pytest.mark.parametrize('point', [OUTSIDE, (-1.35, 36.805), (-1.295, 36.70), (-1.295, 36.90)])
+def test_lookup_outside_raster_is_none(roads, point):
+    assert roads.lookup(*point) is None
+
+
+def test_lower_edge_is_inside(roads):
+    assert roads.lookup(-1.30, 36.80) is not None
+
+
+def test_lookup_batch_matches_single_lookups(roads):
+    points = [OFF_ROAD, MAIN_ROAD, RESIDENTIAL, CODE_ZERO, OUTSIDE]
+    lat, lon = zip(*points)
+    ctx = roads.lookup_batch(lat, lon)
+
+    assert list(ctx['road_type']) == ['NONE', 'MAIN_ROAD', 'RESIDENTIAL', 'NONE', 'NONE']
+    assert list(ctx['on_road']) == [False, True, True, False, False]
+    assert list(ctx['covered']) == [True, True, True, True, False]
+    assert list(ctx['likely_intersection']) == [0, 1, 0, 0, 0]
+    np.testing.assert_array_equal(ctx['road_dist_m'], [np.inf, 10, 40, np.inf, np.inf])
+
+    for point, on_road in zip(points, ctx['on_road']):
+        single = roads.lookup(*point)
+        assert single is None or (single['road_type'] is not None) == on_road
+
+
+def test_load_round_trip_and_missing_file(roads, tmp_path):
+    path = tmp_path / 'road_context.npz'
+    np.savez(path, road_class=ROAD_CLASS, road_dist_m=ROAD_DIST,
+             intersection_dist_m=JUNC_DIST, lat_min=-1.30, lon_min=36.80,
+             resolution=0.01)
+    loaded = load_road_context(str(path))
+    assert loaded.lookup(*MAIN_ROAD) == roads.lookup(*MAIN_ROAD)
+    assert load_road_context(str(tmp_path / 'missing.npz')) is None
+
+
+def test_board_labels_off_network_incidents(roads):
+    board = DispatchBoard(None, None, None, [], {}, 0.5, road_context=roads)
+    dt = datetime(2024, 3, 1, 8, 0)
+    on, off, out = (board.add_incident(*p, dt) for p in (MAIN_ROAD, OFF_ROAD, OUTSIDE))
+    assert board._incidents[on]['road_class'] == 'MAIN_ROAD'
+    assert board._incidents[off]['road_class'] == NO_ROAD_LABEL
+    assert board._incidents[out]['road_class'] is None
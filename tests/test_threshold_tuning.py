@@ -0,0 +1,126 @@
+"""Tests for threshold and weight re-optimisation (threshold_tuning.py)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import precision_score, recall_score, roc_auc_score
+
+from config import ENSEMBLE_THRESHOLD, ENSEMBLE_WEIGHTS
+from threshold_tuning import (WEIGHT_KEYS, baseline_summary, build_candidate_config,
+                              fit_zone_thresholds, load_replay_log, search_weights,
+                              simplex_grid, threshold_curves, threshold_for_recall)
+
+
+@pytest.fixture
+def replay():
+    """Per-model probabilities loosely tied to the label, with some ties."""
+    rng    = np.random.default_rng(0)
+    labels = (rng.random(600) < 0.2).astype(np.int8)
+    probs  = np.clip(rng.normal(0.15 + 0.3 * labels[:, None], 0.15, (600, 3)), 0, 1)
+    probs  = np.round(probs, 2).astype(np.float32)      # rounding creates ties
+    return probs, labels
+
+
+def test_curves_match_sklearn(replay):
+    probs, labels = replay
+    scores = probs[:, 0]
+    curves = threshold_curves(scores, labels)
+
+    assert curves['auc'] == pytest.approx(roc_auc_score(labels, scores))
+    assert np.all(np.diff(curves['thresholds']) < 0)     # one point per distinct score
+    for i in range(0, len(curves['thresholds']), 7):
+        pred = scores >= curves['thresholds'][i]
+        assert curves['recall'][i] == pytest.approx(recall_score(labels, pred))
+        assert curves['precision'][i] == pytest.approx(precision_score(labels, pred))
+        assert curves['over_triage'][i] == pytest.approx(pred[labels == 0].mean() * 100)
+
+
+def test_threshold_for_recall_is_highest_meeting_target(replay):
+    probs, labels = replay
+    scores = probs[:, 1]
+    t = threshold_for_recall(scores, labels, 0.8)
+    assert recall_score(labels, scores >= t) >= 0.8
+    higher = np.unique(scores[scores > t])
+    assert len(higher) == 0 or recall_score(labels, scores >= higher[0]) < 0.8
+    assert threshold_for_recall(scores, np.zeros_like(labels)) is None
+
+
+def test_simplex_grid_covers_the_simplex():
+    grid = simplex_grid(0.1)
+    assert len(grid) == 11 * 12 // 2
+    assert np.allclose(grid.sum(axis=1), 1)
+    assert (grid >= 0).all()
+    assert len({tuple(np.round(w, 6)) for w in grid}) == len(grid)
+
+
+def test_search_weights_rows_match_direct_evaluation(replay):
+    probs, labels = replay
+    results = search_weights(probs, labels, step=0.25, target=0.8)
+    assert len(results) == len(simplex_grid(0.25))
+    assert results['over_triage'].is_monotonic_increasing
+
+    for _, row in results.iterrows():
+        w      = row[['w_rf', 'w_xgboost', 'w_lgbm']].to_numpy(dtype=np.float32)
+        scores = probs @ w
+        assert row['threshold'] == pytest.approx(threshold_for_recall(scores, labels, 0.8))
+        pred = scores >= row['threshold']
+        assert row['recall'] == pytest.approx(recall_score(labels, pred))
+        assert row['over_triage'] == pytest.approx(pred[labels == 0].mean() * 100)
+
+
+def test_search_weights_needs_positive_cases(replay):
+    probs, labels = replay
+    with pytest.raises(ValueError):
+        search_weights(probs, np.zeros_like(labels))
+
+
+def test_candidate_config_uses_best_row(replay):
+    probs, labels = replay
+    config, results = build_candidate_config(probs, labels, step=0.25, target=0.8)
+    best = results.iloc[0]
+    assert config['weights'] == {'rf': best['w_rf'], 'xgboost': best['w_xgboost'],
+                                 'lgbm': best['w_lgbm']}
+    assert config['threshold'] == round(best['threshold'], 4)
+    assert config['val_recall'] >= 0.8
+    assert config['n_samples'] == len(labels)
+
+
+def test_zone_thresholds_fall_back_for_sparse_zones(replay):
+    probs, labels = replay
+    scores = probs[:, 2]
+    zones  = np.where(np.arange(len(labels)) < 500, 'CBD', 'OUTER')
+    zone_t = fit_zone_thresholds(scores, labels, zones, 0.8, fallback=0.13,
+                                 min_positives=30)
+    cbd = zones == 'CBD'
+    assert zone_t['CBD'] == threshold_for_recall(scores[cbd], labels[cbd], 0.8)
+    assert zone_t['OUTER'] == 0.13                      # under 30 positives
+
+
+def test_baseline_summary_reports_production_threshold(replay):
+    probs, labels = replay
+    summary = baseline_summary(probs, labels, 0.8)
+    scores  = probs @ np.array([ENSEMBLE_WEIGHTS[k] for k in WEIGHT_KEYS], dtype=np.float32)
+    pred    = scores >= ENSEMBLE_THRESHOLD
+
+    assert summary['threshold'] == ENSEMBLE_THRESHOLD
+    assert summary['recall'] == pytest.approx(recall_score(labels, pred))
+    assert summary['over_triage'] == pytest.approx(pred[labels == 0].mean() * 100)
+    assert summary['auc'] == pytest.approx(roc_auc_score(labels, scores))
+    assert summary['threshold_for_target'] == threshold_for_recall(scores, labels, 0.8)
+
+
+def test_load_replay_log_recovers_one_hot_zones(tmp_path):
+    path = tmp_path / 'replay.csv'
+    pd.DataFrame({
+        'rf_prob': [0.1, 0.9], 'xgb_prob': [0.2, 0.8], 'lgbm_prob': [0.3, 0.7],
+        'severity_binary': [0, 1],
+        'geographic_zone_CBD': [1, 0], 'geographic_zone_OUTER': [0, 1],
+    }).to_csv(path, index=False)
+    probs, labels, zones = load_replay_log(path)
+    assert probs.dtype == np.float32 and probs.shape == (2, 3)
+    assert list(labels) == [0, 1]
+    assert list(zones) == ['CBD', 'OUTER']
+
+    pd.DataFrame({'rf_prob': [0.1]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match='missing columns'):
+        load_replay_log(path)
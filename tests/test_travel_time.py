@@ -0,0 +1,62 @@
+"""Tests for trauma centre travel-time lookups (travel_time.py)."""
+
+import numpy as np
+import pytest
+
+from travel_time import TravelTimeField, profile_for_hour, load_travel_times
+
+
+PROFILES  = ['off_peak', 'am_peak', 'pm_peak', 'night']
+HOSPITALS = ['KNH', 'Aga Khan', 'Nairobi Hospital', 'Mater']
+
+
+@pytest.fixture
+def field():
+    """4 profiles x 4 hospitals on a 3 x 3 grid of 0.01 degree cells."""
+    rng = np.random.default_rng(0)
+    eta = rng.uniform(5, 60, (len(PROFILES), len(HOSPITALS), 3, 3))
+    eta[:, :, 2, 2] = np.inf                    # unreachable cell
+    eta[:, 3, 0, 0] = np.inf                    # one centre unreachable
+    return TravelTimeField(eta, HOSPITALS, PROFILES, -1.32, 36.79, 0.01)
+
+
+@pytest.mark.parametrize('hour, expected', [
+    (5, 'off_peak'), (6, 'am_peak'), (9, 'am_peak'), (10, 'off_peak'),
+    (17, 'pm_peak'), (19, 'pm_peak'), (21, 'off_peak'), (22, 'night'), (4, 'night'),
+])
+def test_profile_for_hour(hour, expected):
+    assert profile_for_hour(hour) == expected
+
+
+def test_lookup_batch_top_k_matches_full_sort(field):
+    rng   = np.random.default_rng(1)
+    lat   = -1.32 + rng.uniform(0, 0.03, 200)
+    lon   = 36.79 + rng.uniform(0, 0.03, 200)
+    hours = rng.integers(0, 24, 200)
+    res   = field.lookup_batch(lat, lon, hours, k=2)
+
+    rows, cols, _ = field._cells(lat, lon)
+    for i in range(len(lat)):
+        eta   = field.eta_min[field.profiles[profile_for_hour(hours[i])], :, rows[i], cols[i]]
+        order = np.argsort(eta, kind='stable')[:2]
+        assert list(res['hospital'][i]) == [HOSPITALS[j] for j in order]
+        np.testing.assert_array_equal(res['eta_min'][i], eta[order])
+        assert res['covered'][i] == np.isfinite(eta[order[0]])
+
+
+def test_lookup_skips_unreachable_and_handles_edges(field):
+    top = field.lookup(-1.315, 36.795, hour=12, k=4)
+    assert len(top) == 3 and 'Mater' not in [h['name'] for h in top]
+    assert [h['eta_min'] for h in top] == sorted(h['eta_min'] for h in top)
+
+    assert field.lookup(-1.295, 36.815) is None         # no centre reachable
+    assert field.lookup(-1.40, 36.795) is None          # outside the grid
+    assert len(field.lookup(-1.305, 36.805, k=10)) == len(HOSPITALS)
+
+
+def test_default_hour_uses_off_peak(field):
+    assert field.lookup(-1.305, 36.805) == field.lookup(-1.305, 36.805, hour=12)
+
+
+def test_missing_grid_loads_as_none(tmp_path):
+    assert load_travel_times(str(tmp_path / 'missing.npz')) is None